@@ -0,0 +1,96 @@
+"""
+collects the model-change messages for the outbox so that an object that is saved several times in one transaction is
+only announced once, with its final state.
+
+outside a coalesce_changes() block every change writes its own outbox row straight away, in the same transaction as
+the change itself.
+a coalesce_changes() block is a transaction.atomic() block in which the first change to an object writes its outbox
+row and later changes rewrite or remove that row.  The rows are part of the transaction, so they are committed or
+rolled back together with the changes that they describe, and the relay sees only the final state once it commits.
+"""
+import threading
+from contextlib import contextmanager
+from django.db import transaction
+from gnm_deliverables.models import OutboxMessage
+
+_local = threading.local()
+
+
+def merge_actions(previous, action):
+    """
+    combines two changes to the same object into the change that consumers need to hear about
+    :param previous: the action already recorded for the object, or None if there isn't one
+    :param action: the new action, "create", "update" or "delete"
+    :return: the combined action, or None if there is nothing to tell them
+    """
+    if previous == "create":
+        if action == "update":
+            return "create"
+        if action == "delete":
+            return None
+    return action
+
+
+@contextmanager
+def coalesce_changes():
+    """
+    context manager that runs its body in a transaction, coalescing the outbox rows for the changes made in it.
+    Nested blocks are savepoints within the outermost one and share its rows.
+    """
+    if getattr(_local, "transaction_rows", None) is not None:
+        with transaction.atomic():
+            yield
+        return
+
+    _local.transaction_rows = {}
+    try:
+        with transaction.atomic():
+            yield
+    finally:
+        _local.transaction_rows = None
+
+
+def _record_in_transaction(rows:dict, key, action, message_func):
+    if key in rows:
+        row_id, previous = rows.pop(key)
+        merged = merge_actions(previous, action)
+        if merged is None:
+            if OutboxMessage.objects.filter(id=row_id).delete()[0] > 0:
+                return
+        else:
+            message = message_func(merged)
+            if message is None:
+                # there is nothing to send for the object any more, so the earlier message is out of date
+                OutboxMessage.objects.filter(id=row_id).delete()
+                return
+            if OutboxMessage.objects.filter(id=row_id).update(routing_key=message[0], payload=message[1]) > 0:
+                rows[key] = (row_id, merged)
+                return
+        # the earlier row has gone already, e.g. with a savepoint that was rolled back, so this change needs a
+        # message of its own
+        action = merged or action
+
+    message = message_func(action)
+    if message is not None:
+        rows[key] = (OutboxMessage.objects.create(routing_key=message[0], payload=message[1]).id, action)
+
+
+def record(instance, action: str, message_for):
+    """
+    records a change to a model instance in the outbox, coalescing it with earlier changes to the same object if
+    this is inside a coalesce_changes() block
+    :param instance: model instance that was changed
+    :param action: "create", "update" or "delete"
+    :param message_for: function taking (instance, action) and returning a tuple of (routing key, payload) or None
+    if no message should be sent
+    """
+    def message_func(merged_action):
+        return message_for(instance, merged_action)
+
+    rows = getattr(_local, "transaction_rows", None)
+    if rows is not None:
+        _record_in_transaction(rows, (instance._meta.label, instance.pk), action, message_func)
+    else:
+        message = message_func(action)
+        if message is not None:
+            OutboxMessage.objects.create(routing_key=message[0], payload=message[1])
@@ -84,6 +84,14 @@ DELIVERABLE_ASSET_STATUSES = (
 
 DELIVERABLE_ASSET_STATUSES_DICT = dict(DELIVERABLE_ASSET_STATUSES)
 
+# assets in any other status are shown as "invalid" on the dashboard
+DELIVERABLE_ASSET_VALID_STATUSES = (
+    DELIVERABLE_ASSET_STATUS_INGESTING,
+    DELIVERABLE_ASSET_STATUS_INGESTED,
+    DELIVERABLE_ASSET_STATUS_TRANSCODING,
+    DELIVERABLE_ASSET_STATUS_TRANSCODED
+)
+
 UPLOAD_STATUS = [
     ('Not ready', 'Not ready'),
     ('Ready for Upload', 'Ready for Upload'),
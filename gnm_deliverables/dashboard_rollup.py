@@ -0,0 +1,197 @@
+from datetime import datetime
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from gnm_deliverables.models import DashboardRollup, DeliverableAsset, GNMWebsite, Youtube, DailyMotion, Mainstream
+import logging
+
+logger = logging.getLogger(__name__)
+
+# rollup platform for the asset counts
+ASSETS_PLATFORM = ""
+
+# rollup platform for the publication counts of each syndication model
+PUBLICATION_PLATFORMS = {
+    "gnm_website": GNMWebsite,
+    "youtube": Youtube,
+    "dailymotion": DailyMotion,
+    "mainstream": Mainstream,
+}
+
+
+def day_for(timestamp: datetime):
+    """
+    returns the day of the given timestamp in the server timezone, to match TruncDate, or None if it is None
+    """
+    if timestamp is None:
+        return None
+    if timezone.is_aware(timestamp):
+        timestamp = timezone.localtime(timestamp)
+    return timestamp.date()
+
+
+def platform_for(instance):
+    """
+    returns the rollup platform of the given model instance, or None if it is not counted in the rollup
+    """
+    if isinstance(instance, DeliverableAsset):
+        return ASSETS_PLATFORM
+    for platform, model in PUBLICATION_PLATFORMS.items():
+        if isinstance(instance, model):
+            return platform
+    return None
+
+
+def key_for(platform: str, values: dict):
+    """
+    returns the rollup key for the given tracked values of an instance on the given platform, or None if the
+    instance is not counted
+    :param platform: rollup platform, see platform_for
+    :param values: dictionary of the instance's TRACKED_FIELDS values
+    :return: a dictionary of DashboardRollup field values, or None
+    """
+    if platform == ASSETS_PLATFORM:
+        return {"platform": platform, "day": day_for(values["access_dt"]), "type": values["type"],
+                "status": values["status"]}
+    elif values["publication_date"] is None:
+        # unpublished records don't appear in the publication summary
+        return None
+    else:
+        return {"platform": platform, "day": day_for(values["publication_date"]), "type": None, "status": None}
+
+
+def adjust(key: dict, delta: int):
+    """
+    adds delta to the count for the given rollup key, creating a row if there isn't one yet
+    """
+    lookup = {name + "__isnull" if value is None else name: True if value is None else value
+              for name, value in key.items()}
+    row_id = DashboardRollup.objects.filter(**lookup).order_by("id").values_list("id", flat=True).first()
+    if row_id is None:
+        DashboardRollup.objects.create(count=delta, **key)
+    else:
+        DashboardRollup.objects.filter(id=row_id).update(count=F("count") + delta)
+
+
+def instance_saved(instance, previous_values):
+    """
+    moves the given instance's count from the rollup key of its previous values to the key of its current values.
+    :param instance: saved model instance
+    :param previous_values: dictionary of the instance's TRACKED_FIELDS values before the save, or None if it was
+    newly created
+    """
+    platform = platform_for(instance)
+    if platform is None:
+        return
+    current_values = instance.tracked_values()
+    if previous_values == current_values:
+        return
+
+    if previous_values is not None and set(previous_values.keys()) != set(instance.TRACKED_FIELDS):
+        # e.g. it was loaded with only(), so we can't tell which count it has to be moved from
+        unknown_previous_values(instance)
+        return
+
+    with transaction.atomic():
+        if previous_values is not None:
+            previous_key = key_for(platform, previous_values)
+            if previous_key is not None:
+                adjust(previous_key, -1)
+        current_key = key_for(platform, current_values)
+        if current_key is not None:
+            adjust(current_key, 1)
+
+
+def unknown_previous_values(instance):
+    """
+    called when an existing instance is saved but the values that it had before are not known, so its count is left
+    where it was
+    """
+    logger.warning("Previous values of {0} {1} are not known, dashboard rollup may be out until it is rebuilt"
+                   .format(instance.__class__.__name__, instance.pk))
+
+
+def instance_deleted(instance):
+    """
+    removes the given deleted instance's count from the rollup
+    """
+    platform = platform_for(instance)
+    if platform is None:
+        return
+    values = instance.saved_values
+    if values is None or set(values.keys()) != set(instance.TRACKED_FIELDS):
+        values = instance.tracked_values()
+    key = key_for(platform, values)
+    if key is not None:
+        adjust(key, -1)
+
+
+def lock_rollup(rollup_model):
+    """
+    locks the rollup table against writes until the end of the current transaction, so that the adjustments made by
+    concurrent saves wait for a rebuild rather than being overwritten by it.  Only done on PostgreSQL
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("LOCK TABLE {0} IN SHARE ROW EXCLUSIVE MODE"
+                           .format(connection.ops.quote_name(rollup_model._meta.db_table)))
+
+
+def rebuild(apps=None):
+    """
+    replaces the contents of the rollup with counts aggregated from the asset and syndication tables.  The counts are
+    aggregated with the rollup locked, so that nothing saved while this runs is missed
+    :param apps: app registry to take the models from, when this is run from a data migration. Defaults to the
+    current models
+    :return: the number of rollup rows written
+    """
+    if apps is None:
+        rollup_model = DashboardRollup
+        asset_model = DeliverableAsset
+        publication_models = PUBLICATION_PLATFORMS
+    else:
+        rollup_model = apps.get_model("gnm_deliverables", "DashboardRollup")
+        asset_model = apps.get_model("gnm_deliverables", "DeliverableAsset")
+        publication_models = {platform: apps.get_model("gnm_deliverables", model.__name__)
+                              for platform, model in PUBLICATION_PLATFORMS.items()}
+
+    tz = timezone.get_current_timezone()
+    with transaction.atomic():
+        lock_rollup(rollup_model)
+        rows = [rollup_model(platform=ASSETS_PLATFORM, day=entry["day"], type=entry["type"], status=entry["status"],
+                             count=entry["count"])
+                for entry in asset_model.objects
+                    .annotate(day=TruncDate("access_dt", tzinfo=tz))
+                    .order_by()
+                    .values("day", "type", "status")
+                    .annotate(count=Count("id"))]
+
+        for platform, model in publication_models.items():
+            rows += [rollup_model(platform=platform, day=entry["day"], count=entry["count"])
+                     for entry in model.objects
+                         .filter(publication_date__isnull=False)
+                         .annotate(day=TruncDate("publication_date", tzinfo=tz))
+                         .order_by()
+                         .values("day")
+                         .annotate(count=Count("id"))]
+
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def asset_counts():
+    """
+    returns a queryset of the asset rows of the rollup
+    """
+    return DashboardRollup.objects.filter(platform=ASSETS_PLATFORM)
+
+
+def counts_by(queryset, field_name: str) -> dict:
+    """
+    sums the rollup counts in the given queryset, grouped on the given field
+    :return: a dictionary of field value -> count
+    """
+    return {entry[field_name]: entry["total"] for entry in
+            queryset.order_by().values(field_name).annotate(total=Sum("count"))}
@@ -0,0 +1,242 @@
+import logging
+import os
+import stat
+import time
+import typing
+
+from gnm_deliverables.files import ScanEntry, scan_directory
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+logger = logging.getLogger(__name__)
+
+# a change in a drop-folder, identified by (bundle name, path relative to the drop-folder)
+ChangeKey = typing.Tuple[str, str]
+
+
+def is_hidden(relative_path: str) -> bool:
+    """
+    returns True if the file part of the given path is a hidden file, which scan_directory would not pick up either
+    """
+    name = os.path.basename(relative_path)
+    return len(name) == 0 or name[0] == '.'
+
+
+class PollingWatcher(object):
+    """
+    detects changes in drop-folders by comparing successive snapshots of the size and mtime of every file.
+    this still walks each folder on every poll, but doesn't need any database access to do so, and works on
+    filesystems (e.g. network mounts) that don't support inotify
+    """
+    def __init__(self):
+        self.roots = {}
+        self.snapshots = {}
+        # the snapshots catch everything, so these are always empty; see InotifyWatcher
+        self.removed_directories = set()
+        self.rescans = set()
+
+    @staticmethod
+    def snapshot(root_path: str) -> dict:
+        return {entry.path: (entry.stat.st_size, entry.stat.st_mtime_ns) for entry in scan_directory(root_path)}
+
+    def add_bundle(self, name: str, root_path: str):
+        """
+        starts watching the given drop-folder.  Files that are already present are not reported as changes.
+        """
+        if name in self.roots:
+            return
+        self.roots[name] = root_path
+        self.snapshots[name] = self.snapshot(root_path)
+
+    def poll(self, timeout: float) -> typing.Set[ChangeKey]:
+        """
+        waits for `timeout` seconds then returns the files that were added, modified or removed since the last poll
+        :param timeout: time to wait, in seconds
+        :return: set of (bundle name, relative path)
+        """
+        time.sleep(timeout)
+        changes = set()
+        for name, root_path in self.roots.items():
+            previous = self.snapshots[name]
+            current = self.snapshot(root_path)
+            for relative_path, signature in current.items():
+                if previous.get(relative_path) != signature:
+                    changes.add((name, relative_path))
+            for relative_path in previous.keys():
+                if relative_path not in current:
+                    changes.add((name, relative_path))
+            self.snapshots[name] = current
+        return changes
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """
+    detects changes in drop-folders with inotify.  inotify is not recursive, so a watch is added for every directory
+    in each drop-folder and for new directories as they appear.
+    Changes that can't be reported file by file are left for the caller to pick up after each poll:
+    removed_directories holds the (bundle name, relative path) of directories that were moved out, all of whose files
+    have gone, and rescans holds the names of bundles that have to be rescanned because the kernel's event queue
+    overflowed and events were lost.  The caller should clear them once it has dealt with them.
+    requires the inotify_simple package and a local filesystem.
+    """
+    def __init__(self):
+        flags = inotify_simple.flags
+        self.mask = flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.DELETE | flags.MOVED_FROM | \
+            flags.MOVED_TO | flags.ATTRIB
+        self.inotify = inotify_simple.INotify()
+        self.roots = {}
+        self.watches = {}
+        self.removed_directories = set()
+        self.rescans = set()
+
+    def _add_watch(self, name: str, directory: str, relative_dir: str):
+        try:
+            wd = self.inotify.add_watch(directory, self.mask)
+        except OSError as e:
+            logger.warning("Could not watch {0}: {1}".format(directory, e))
+            return
+        self.watches[wd] = (name, relative_dir)
+
+    def _add_tree(self, name: str, directory: str, relative_dir: str):
+        self._add_watch(name, directory, relative_dir)
+        for current_dir, subdirs, _ in os.walk(directory):
+            subdirs[:] = [d for d in subdirs if not os.path.islink(os.path.join(current_dir, d))]
+            for d in subdirs:
+                full_path = os.path.join(current_dir, d)
+                self._add_watch(name, full_path, os.path.join(relative_dir, os.path.relpath(full_path, directory)))
+
+    def _remove_tree(self, name: str, relative_dir: str):
+        """
+        stops watching the given directory and everything under it, e.g. once it has been moved out of the drop-folder
+        """
+        prefix = relative_dir + os.sep
+        for wd, (watch_name, watch_dir) in list(self.watches.items()):
+            if watch_name == name and (watch_dir == relative_dir or watch_dir.startswith(prefix)):
+                del self.watches[wd]
+                try:
+                    self.inotify.rm_watch(wd)
+                except OSError:
+                    pass
+
+    def add_bundle(self, name: str, root_path: str):
+        """
+        starts watching the given drop-folder.  Files that are already present are not reported as changes.
+        """
+        if name in self.roots:
+            return
+        self.roots[name] = root_path
+        self._add_tree(name, root_path, "")
+
+    def poll(self, timeout: float) -> typing.Set[ChangeKey]:
+        """
+        waits up to `timeout` seconds for events and returns the files that were added, modified or removed
+        :param timeout: time to wait, in seconds
+        :return: set of (bundle name, relative path)
+        """
+        flags = inotify_simple.flags
+        changes = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                # the overflow event doesn't say which watches lost events, so every bundle has to be rescanned
+                logger.warning("inotify event queue overflowed, drop-folders will be rescanned")
+                self.rescans.update(self.roots.keys())
+                continue
+            if event.mask & flags.IGNORED:
+                self.watches.pop(event.wd, None)
+                continue
+            if event.wd not in self.watches or not event.name:
+                continue
+            name, relative_dir = self.watches[event.wd]
+            relative_path = os.path.join(relative_dir, event.name)
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    # files can be written into a new directory before its watch is added, so pick those up too
+                    full_path = os.path.join(self.roots[name], relative_path)
+                    self._add_tree(name, full_path, relative_path)
+                    for entry in scan_directory(full_path):
+                        changes.add((name, os.path.join(relative_path, entry.path)))
+                elif event.mask & flags.MOVED_FROM:
+                    # its files don't get events of their own, and any that are in it now are no longer ours
+                    self._remove_tree(name, relative_path)
+                    self.removed_directories.add((name, relative_path))
+                continue
+            changes.add((name, relative_path))
+        return changes
+
+    def close(self):
+        self.inotify.close()
+
+
+def make_watcher(force_polling=False):
+    """
+    returns an InotifyWatcher if inotify is available, otherwise a PollingWatcher
+    """
+    if force_polling or inotify_simple is None:
+        return PollingWatcher()
+    try:
+        return InotifyWatcher()
+    except OSError as e:
+        logger.warning("inotify is not available ({0}), falling back to polling".format(e))
+        return PollingWatcher()
+
+
+class Debouncer(object):
+    """
+    holds back changed files until they have stopped being written to, i.e. their size and mtime have not changed
+    for `settle_time` seconds, so that partially-copied media is not picked up.
+    """
+    def __init__(self, settle_time: float):
+        self.settle_time = settle_time
+        self.pending = {}
+
+    def touch(self, key: ChangeKey, now: float):
+        """
+        records that the given file has changed
+        """
+        signature, _ = self.pending.get(key, (None, None))
+        self.pending[key] = (signature, now)
+
+    def collect(self, roots: dict, now: float) -> (typing.List[typing.Tuple[str, ScanEntry]], typing.List[ChangeKey]):
+        """
+        returns the pending changes that are ready to be written, and forgets about them
+        :param roots: dictionary of bundle name -> drop-folder path
+        :param now: current (monotonic) time
+        :return: a tuple of (list of (bundle name, ScanEntry) for files that have settled,
+        list of (bundle name, relative path) for files that have been removed)
+        """
+        settled = []
+        removed = []
+        for key, (signature, last_changed) in list(self.pending.items()):
+            name, relative_path = key
+            root_path = roots.get(name)
+            if root_path is None or is_hidden(relative_path):
+                del self.pending[key]
+                continue
+            absolute_path = os.path.join(root_path, relative_path)
+            try:
+                stat_result = os.stat(absolute_path)
+            except FileNotFoundError:
+                removed.append(key)
+                del self.pending[key]
+                continue
+            except OSError as e:
+                logger.warning("Could not stat {0}: {1}".format(absolute_path, e))
+                del self.pending[key]
+                continue
+            if not stat.S_ISREG(stat_result.st_mode):
+                del self.pending[key]
+                continue
+
+            current_signature = (stat_result.st_size, stat_result.st_mtime_ns)
+            if current_signature != signature:
+                self.pending[key] = (current_signature, now)
+            elif now - last_changed >= self.settle_time:
+                settled.append((name, ScanEntry(absolute_path=absolute_path, path=relative_path, stat=stat_result)))
+                del self.pending[key]
+        return settled, removed
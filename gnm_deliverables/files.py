@@ -11,6 +11,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 FileInfo = namedtuple('FileInfo', 'absolute_path path size access_dt modified_dt changed_dt')
+ScanEntry = namedtuple('ScanEntry', 'absolute_path path stat')
 
 DANGEROUS_CHARS = '\\/?%*;:!|\"<>'
 FILEPATH_SANITISER = re.compile("[{0}]".format(DANGEROUS_CHARS))
@@ -72,6 +73,67 @@ def ts_to_dt(timestamp: typing.Union[float, int], millis=False) -> datetime:
         return aware_utc_dt
 
 
+def scan_directory(root_path: str) -> typing.Generator[ScanEntry, None, None]:
+    """
+    generator that walks the given directory tree with os.scandir and yields a ScanEntry for each (non-hidden) file.
+    the stat result comes from the directory entry, so no further lookups are needed for comparing sizes and times.
+    directories are not followed if they are symlinks, and files that can't be stat'd (e.g. broken links) are skipped.
+    :param root_path: directory to scan
+    :return: yields ScanEntry objects, possibly zero if there is nothing in the directory
+    """
+    pending = [(root_path, "")]
+    while len(pending) > 0:
+        current_dir, relative_dir = pending.pop()
+        try:
+            iterator = os.scandir(current_dir)
+        except OSError as e:
+            logger.warning("scan_directory: could not read {0}: {1}".format(current_dir, e))
+            continue
+
+        with iterator:
+            for entry in iterator:
+                relative_path = os.path.join(relative_dir, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((entry.path, relative_path))
+                        continue
+                    if entry.name[0] == '.' or not entry.is_file():
+                        continue
+                    stat_result = entry.stat()
+                except OSError as e:
+                    logger.warning("scan_directory: could not stat {0}: {1}".format(entry.path, e))
+                    continue
+                yield ScanEntry(absolute_path=entry.path, path=relative_path, stat=stat_result)
+
+
+def file_info_for(scan_entry: ScanEntry) -> FileInfo:
+    """
+    converts a ScanEntry into a FileInfo, with the times converted to timezone-aware datetimes
+    :param scan_entry: ScanEntry from scan_directory
+    :return: a FileInfo named tuple
+    """
+    return FileInfo(
+        absolute_path=scan_entry.absolute_path,
+        path=scan_entry.path,
+        size=scan_entry.stat.st_size,
+        access_dt=ts_to_dt(scan_entry.stat.st_atime),
+        modified_dt=ts_to_dt(scan_entry.stat.st_mtime),
+        changed_dt=ts_to_dt(scan_entry.stat.st_ctime)
+    )
+
+
+def scan_files_for_deliverable(name):
+    """
+    generator that yields a ScanEntry for each file that exists in the dropfolder corresponding to the given
+    deliverable. Use file_info_for to get the FileInfo for an entry that you are interested in.
+    :param name: deliverable bundle name, used for making the path to scan
+    :return: yields ScanEntry objects, possibly zero if there is nothing in the dropfolder.
+    """
+    deliverable_path = get_path_for_deliverable(name)
+    logger.info("scan_files_for_deliverable: scanning {0}".format(deliverable_path))
+    return scan_directory(deliverable_path)
+
+
 def find_files_for_deliverable(name):
     """
     generator that yields a FileInfo named tuple for each file that exists in the dropfolder corresponding to the
@@ -79,22 +141,8 @@ def find_files_for_deliverable(name):
     :param name: deliverable bundle name, used for making the path to scan
     :return: yields fileInfo objects, possibly zero if there is nothing in the dropfolder.
     """
-    deliverable_path = get_path_for_deliverable(name)
-    logger.info("find_files_for_deliverable: scanning {0}".format(deliverable_path))
-    for root, dirs, files in os.walk(deliverable_path):
-        for f in files:
-            if f[0] == '.':
-                continue
-            absolute_path = os.path.join(root, f)
-            stat_result = os.stat(absolute_path)
-            yield FileInfo(
-                absolute_path=absolute_path,
-                path=absolute_path.replace(deliverable_path, '').lstrip(os.path.sep),  # path relative deliverable path
-                size=stat_result.st_size,
-                access_dt=ts_to_dt(stat_result.st_atime),
-                modified_dt=ts_to_dt(stat_result.st_mtime),
-                changed_dt=ts_to_dt(stat_result.st_ctime)
-            )
+    for scan_entry in scan_files_for_deliverable(name):
+        yield file_info_for(scan_entry)
 
 
 def create_folder(path, permission=None):
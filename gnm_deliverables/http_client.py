@@ -0,0 +1,133 @@
+"""
+the client for outbound HTTP calls to other services.  Each process keeps one requests.Session per host, so that
+connections, and the TLS sessions on them, are kept alive and reused rather than being set up again for every call.
+Every request gets connect and read timeouts unless the caller gives its own, and idempotent requests are retried with
+exponential backoff when the connection fails or the server says that it is temporarily unavailable.
+
+Settings:
+HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT - default timeouts in seconds (5 and 30)
+HTTP_RETRIES - number of retries (3), HTTP_RETRY_BACKOFF - backoff factor in seconds (0.5)
+HTTP_POOL_SIZE - number of connections kept open to each host (10)
+
+get(), put(), post() and delete() take the same arguments as the requests functions of the same name.
+"""
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+RETRY_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_sessions_pid = os.getpid()
+_metrics_hooks = []
+
+
+def add_metrics_hook(hook):
+    """
+    registers a function to be called after every outbound request, with the arguments
+    (method, host, status_code, elapsed_seconds, error). If the request failed, status_code is None and error is the
+    exception; otherwise error is None
+    """
+    _metrics_hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    if hook in _metrics_hooks:
+        _metrics_hooks.remove(hook)
+
+
+def default_timeout() -> tuple:
+    return getattr(settings, "HTTP_CONNECT_TIMEOUT", 5), getattr(settings, "HTTP_READ_TIMEOUT", 30)
+
+
+def make_session() -> requests.Session:
+    retries = getattr(settings, "HTTP_RETRIES", 3)
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=getattr(settings, "HTTP_RETRY_BACKOFF", 0.5),
+                  status_forcelist=RETRY_STATUSES,
+                  allowed_methods=RETRY_METHODS,
+                  raise_on_status=False)
+    pool_size = getattr(settings, "HTTP_POOL_SIZE", 10)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def session_for(url:str) -> requests.Session:
+    """
+    returns this process's session for the host of the given url, creating it if needed
+    """
+    global _sessions_pid
+    parsed = urlparse(url)
+    key = "{0}://{1}".format(parsed.scheme, parsed.netloc)
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            # we are in a forked child, which must not share the parent's connections
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+        session = _sessions.get(key)
+        if session is None:
+            session = make_session()
+            _sessions[key] = session
+    return session
+
+
+def _report(method:str, host:str, status_code, elapsed:float, error):
+    for hook in list(_metrics_hooks):
+        try:
+            hook(method, host, status_code, elapsed, error)
+        except Exception as e:
+            logger.warning("HTTP metrics hook {0} failed: {1}".format(hook, str(e)))
+
+
+def request(method:str, url:str, **kwargs) -> requests.Response:
+    """
+    makes a request through the pooled session for the url's host
+    :param method: HTTP method
+    :param url: url to call
+    :param kwargs: anything else that requests.request takes. timeout defaults to default_timeout()
+    :return: the requests.Response. Like requests, error statuses are returned rather than raised
+    :raises: requests.RequestException if the request could not be made, once the retries are used up
+    """
+    kwargs.setdefault("timeout", default_timeout())
+    host = urlparse(url).netloc
+    started = time.monotonic()
+    try:
+        response = session_for(url).request(method, url, **kwargs)
+    except requests.RequestException as e:
+        elapsed = time.monotonic() - started
+        logger.debug("{0} {1} failed after {2:.3f}s: {3}".format(method, host, elapsed, str(e)))
+        _report(method, host, None, elapsed, e)
+        raise
+    elapsed = time.monotonic() - started
+    logger.debug("{0} {1} returned {2} in {3:.3f}s".format(method, host, response.status_code, elapsed))
+    _report(method, host, response.status_code, elapsed, None)
+    return response
+
+
+def get(url:str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def put(url:str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def post(url:str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def delete(url:str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.utils import timezone
+from gnm_deliverables.choices import DELIVERABLE_ASSET_VALID_STATUSES
+from gnm_deliverables import dashboard_rollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAYS_COUNTED = 12
+TYPES_COUNTED = range(1, 16)
+
+
+def invalid_asset_counts():
+    """
+    returns a queryset of the dashboard rollup rows for the assets that are shown as invalid on the dashboard
+    """
+    return dashboard_rollup.asset_counts().exclude(status__in=DELIVERABLE_ASSET_VALID_STATUSES)
+
+
+def count_invalid_by_day(today=None) -> list:
+    """
+    counts the invalid assets by the day they were last accessed, over the last DAYS_COUNTED days in one query
+    :param today: date to count up to, defaults to the current date in the server timezone
+    :return: a list of DAYS_COUNTED counts, oldest first and ending with today
+    """
+    if today is None:
+        today = timezone.localdate()
+    first_day = today - timedelta(days=DAYS_COUNTED - 1)
+
+    counts = dashboard_rollup.counts_by(invalid_asset_counts().filter(day__gte=first_day, day__lte=today), "day")
+    return [counts.get(first_day + timedelta(days=i), 0) for i in range(DAYS_COUNTED)]
+
+
+def count_invalid_by_type() -> list:
+    """
+    counts the invalid assets of each type in one query
+    :return: a list of counts for each asset type, in the order of the type ids
+    """
+    counts = dashboard_rollup.counts_by(invalid_asset_counts().filter(type__in=TYPES_COUNTED), "type")
+    return [counts.get(asset_type, 0) for asset_type in TYPES_COUNTED]
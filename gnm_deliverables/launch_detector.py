@@ -1,14 +1,19 @@
 import logging
-import jsonschema
 import datetime
+import json
 import dateutil.parser
 from typing import List
 from .models import *
+from .schema_validation import compiled_validator, validate
+from .change_collector import coalesce_changes
 import re
 import pytz
 
 logger = logging.getLogger(__name__)
 
+# routing key of the messages asking the responder to apply an update that could not be applied when it arrived
+DEFERRED_UPDATE_ROUTING_KEY = "deliverables.launchdetector.update"
+
 
 class InlineChangeRecord(object):
     """
@@ -210,7 +215,7 @@ class LaunchDetectorUpdate(object):
         initialise from predetermined data. Raises a ValidationError if the data is not right.
         :param raw_content:
         """
-        jsonschema.validate(raw_content, schema=self.schema)
+        validate(raw_content, schema=self.schema)
         self._content = raw_content
 
     @property
@@ -298,6 +303,10 @@ class LaunchDetectorUpdate(object):
         return YTMeta(self._content.get("ytMeta"))
 
 
+# compile the schema at startup, rather than on the first update
+compiled_validator(LaunchDetectorUpdate.schema)
+
+
 def find_asset_for(msg: LaunchDetectorUpdate) -> DeliverableAsset:
     """
     look up the DeliverableAsset for the given item. If none is found, then DeliverableAsset.DoesNotExist is raised
@@ -313,6 +322,40 @@ def find_asset_for(msg: LaunchDetectorUpdate) -> DeliverableAsset:
     return matches[0]
 
 
+def apply_update(msg: LaunchDetectorUpdate) -> DeliverableAsset:
+    """
+    updates the syndication records of the DeliverableAsset for the given item. If there is no asset for it (yet),
+    then DeliverableAsset.DoesNotExist is raised
+    :param msg: LaunchDetectorMessage containing the incoming update
+    :return: the updated DeliverableAsset
+    """
+    asset = find_asset_for(msg)
+
+    logger.info("Found asset ID {} for {}".format(asset.pk, asset.atom_id))
+    # the asset is saved after each platform, but consumers only need to hear about it once
+    with coalesce_changes():
+        update_gnmwebsite(msg, asset)
+        update_dailymotion(msg, asset)
+        update_mainstream(msg, asset)
+        update_youtube(msg, asset)
+        # save() only rebuilds the search document when a syndication record is attached or removed, not when the
+        # titles on the existing ones change
+        asset.search_document = asset.build_search_document()
+        asset.save()
+    return asset
+
+
+def defer_update(content: dict):
+    """
+    queues an update to be applied later by the responder's LaunchDetectorUpdateProcessor, which retries it until the
+    asset for the atom exists.  The message goes through the outbox, so it is only sent if the current transaction
+    commits
+    :param content: the update content, as received
+    :return:
+    """
+    OutboxMessage.objects.create(routing_key=DEFERRED_UPDATE_ROUTING_KEY, payload=json.dumps(content).encode("UTF-8"))
+
+
 def zoned_datetime() -> datetime:
     """
     Outputs a datetime value with the correct time zone.
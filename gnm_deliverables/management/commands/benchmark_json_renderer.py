@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from datetime import datetime, timedelta
+from gnm_deliverables.models import DeliverableAsset
+from gnm_deliverables.serializers import DeliverableAssetSerializer
+from gnm_deliverables.views.deliverables_dash_views import PublicationDatesSummary
+from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer, orjson
+import pytz
+import timeit
+import uuid
+
+
+class Command(BaseCommand):
+    """
+    Management command to compare the speed of the orjson and stdlib json backends of FastJSONRenderer on
+    synthetic payloads shaped like the api/dash/summary and api/deliverables responses.  Needs no database.
+    """
+    help = 'Benchmark the JSON renderer backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=3*365, help="Number of days in the summary payload")
+        parser.add_argument("--assets", type=int, default=5000, help="Number of assets in the deliverables payload")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of times to render each payload")
+
+    @staticmethod
+    def summary_payload(days: int):
+        start_date = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+        raw_data = {
+            platform: [{"day": start_date + timedelta(days=i), "count": i % 13} for i in range(0, days, 2)]
+            for platform in ["gnm_website", "youtube", "dailymotion", "mainstream"]
+        }
+        return PublicationDatesSummary.invert_data(raw_data, start_date, start_date + timedelta(days=days - 1))
+
+    @staticmethod
+    def deliverables_payload(asset_count: int):
+        timestamp = datetime(2021, 3, 4, 5, 6, 7, 123456, tzinfo=pytz.UTC)
+        assets = [DeliverableAsset(id=i, deliverable_id=1, type=1, filename="media/file{0}.mp4".format(i),
+                                   absolute_path="/srv/media/file{0}.mp4".format(i), size=1024*1024*i,
+                                   access_dt=timestamp, modified_dt=timestamp, changed_dt=timestamp,
+                                   atom_id=uuid.uuid4(), online_item_id="VX-{0}".format(i))
+                  for i in range(asset_count)]
+        return DeliverableAssetSerializer(assets, many=True).data
+
+    def time_backends(self, name, payload, repeat):
+        renderer = FastJSONRenderer()
+        results = {}
+        for backend in ["stdlib", "orjson"]:
+            if backend == "orjson" and orjson is None:
+                self.stdout.write("{0}: orjson is not installed, skipping".format(name))
+                continue
+            with override_settings(GNM_DELIVERABLES_JSON_BACKEND=backend):
+                size = len(renderer.render(payload))
+                results[backend] = min(timeit.repeat(lambda: renderer.render(payload), number=1, repeat=repeat))
+            self.stdout.write("{0}: {1} backend rendered {2} bytes in {3:.2f}ms".format(
+                name, backend, size, results[backend] * 1000))
+        if len(results) == 2:
+            self.stdout.write("{0}: orjson is {1:.1f}x faster".format(name, results["stdlib"] / results["orjson"]))
+
+    def handle(self, *args, **options):
+        self.time_backends("api/dash/summary", self.summary_payload(options["days"]), options["repeat"])
+        self.time_backends("api/deliverables", self.deliverables_payload(options["assets"]), options["repeat"])
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from gnm_deliverables.models import YouTubeCategories, Youtube, YouTubeChannels
-import requests
+from gnm_deliverables import http_client
 import os
 import logging
 import urllib.parse
@@ -16,7 +16,7 @@ class Command(BaseCommand):
     help = "Get data from YouTube"
 
     def handle(self, *args, **options):
-        response = requests.get('https://www.googleapis.com/youtube/v3/videoCategories?regionCode=uk&key={0}'.format(urllib.parse.quote(os.environ['YOUTUBE_KEY'])))
+        response = http_client.get('https://www.googleapis.com/youtube/v3/videoCategories?regionCode=uk&key={0}'.format(urllib.parse.quote(os.environ['YOUTUBE_KEY'])))
         youtube_json_data = response.json()
 
         for item in youtube_json_data['items']:
@@ -38,7 +38,7 @@ class Command(BaseCommand):
 
         for channel in youtube_channels.iterator():
             logger.info('Channel id.: {0}'.format(channel[0]))
-            channel_response = requests.get('https://www.googleapis.com/youtube/v3/channels?part=snippet&id={0}&key={1}'.format(channel[0], urllib.parse.quote(os.environ['YOUTUBE_KEY'])))
+            channel_response = http_client.get('https://www.googleapis.com/youtube/v3/channels?part=snippet&id={0}&key={1}'.format(channel[0], urllib.parse.quote(os.environ['YOUTUBE_KEY'])))
             youtube_channel_json_data = channel_response.json()
 
             try:
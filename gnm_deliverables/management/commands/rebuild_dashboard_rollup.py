@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from gnm_deliverables import dashboard_rollup
+import logging
+import time
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Management command to rebuild the dashboard statistics from the asset and syndication tables
+    """
+    help = 'Rebuild the dashboard statistics rollup from scratch'
+
+    def handle(self, *args, **options):
+        start_time = time.monotonic()
+        row_count = dashboard_rollup.rebuild()
+        self.stdout.write("Wrote {0} rollup rows in {1:.2f}s".format(row_count, time.monotonic() - start_time))
@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from gnm_deliverables.models import OutboxMessage
+from gnm_deliverables.signals import msgrelay, PUBLISH_ERRORS
+import logging
+import signal
+import time
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Management command that sends the model-change messages written to the outbox by the signal receivers on to the
+    broker, and removes them once the broker has confirmed them.
+    A single relay sends the messages in the order that they were committed.  More than one relay can run at once,
+    since each one locks the batch that it is sending and the others skip over it, but then the batches go out in
+    parallel and there is no ordering between them; so run one relay unless the consumers don't mind.
+    """
+    help = 'Send the messages in the outbox to the pluto-deliverables exchange'
+
+    def __init__(self, *args, **kwargs):
+        super(Command, self).__init__(*args, **kwargs)
+        self.running = True
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Maximum number of messages to send in one transaction (default 100)")
+        parser.add_argument("--interval", type=float, default=1.0,
+                            help="Seconds to wait before checking again when the outbox is empty (default 1)")
+        parser.add_argument("--max-backoff", type=float, default=30.0,
+                            help="Maximum seconds to wait before retrying when the broker is unavailable (default 30)")
+        parser.add_argument("--once", action="store_true", default=False,
+                            help="Exit once the outbox is empty, or the broker is unavailable")
+
+    @staticmethod
+    def relay_batch(batch_size: int) -> int:
+        """
+        sends the oldest batch of messages and deletes the ones that were sent
+        :param batch_size: maximum number of messages to send
+        :return: the number of messages sent
+        :raises: one of PUBLISH_ERRORS if the broker could not take a message. Messages sent before it are deleted.
+        """
+        sent_ids = []
+        error = None
+        with transaction.atomic():
+            batch = OutboxMessage.objects.select_for_update(skip_locked=True).order_by("id")[0:batch_size]
+            for message in batch:
+                try:
+                    msgrelay.publish(message.routing_key, bytes(message.payload))
+                except PUBLISH_ERRORS as e:
+                    error = e
+                    break
+                sent_ids.append(message.id)
+            if len(sent_ids) > 0:
+                OutboxMessage.objects.filter(id__in=sent_ids).delete()
+        if error is not None:
+            raise error
+        return len(sent_ids)
+
+    def handle(self, *args, **options):
+        def on_quit(signum, frame):
+            logger.info("Caught signal {0}, exiting after the current batch...".format(signum))
+            self.running = False
+
+        signal.signal(signal.SIGINT, on_quit)
+        signal.signal(signal.SIGTERM, on_quit)
+
+        backoff = options["interval"]
+        while self.running:
+            try:
+                sent = self.relay_batch(options["batch_size"])
+            except PUBLISH_ERRORS as e:
+                if options["once"]:
+                    raise
+                logger.warning("Could not send to the broker: {0}. Retrying in {1}s".format(str(e), backoff))
+                time.sleep(backoff)
+                backoff = min(backoff * 2, options["max_backoff"])
+                continue
+
+            backoff = options["interval"]
+            if sent > 0:
+                logger.debug("Sent {0} messages".format(sent))
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+        logger.info("terminated")
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand, CommandError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from gnm_deliverables.models import Deliverable
+from gnm_deliverables.files import find_files_for_deliverable, get_path_for_deliverable
+import logging
+import os
+import time
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+def scan_bundle(name: str) -> (list, float):
+    """
+    walks the drop-folder for the given bundle.  This is run on the thread pool so it must not touch the database.
+    :param name: bundle name
+    :return: a tuple of (list of FileInfo, time taken in seconds)
+    """
+    start_time = time.monotonic()
+    files = list(find_files_for_deliverable(name))
+    return files, time.monotonic() - start_time
+
+
+class Command(BaseCommand):
+    """
+    Management command to resync the assets of many bundles with their drop-folders, e.g. after a SAN outage
+    """
+    help = 'Rescan the drop-folders of all bundles, or the ones given, and update their assets'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bundle", type=str, action="append", dest="bundles", default=[],
+                            help="Only rescan the bundle with this name. Can be given more than once")
+        parser.add_argument("--project", type=int, action="append", dest="projects", default=[],
+                            help="Only rescan bundles belonging to this project id. Can be given more than once")
+        parser.add_argument("--contains", type=str, help="Only rescan bundles whose name contains this text")
+        parser.add_argument("--concurrency", type=int, default=8,
+                            help="Maximum number of drop-folders to scan at once (default 8)")
+
+    def get_bundles(self, options):
+        queryset = Deliverable.objects.all()
+        if options["bundles"]:
+            queryset = queryset.filter(name__in=options["bundles"])
+        if options["projects"]:
+            queryset = queryset.filter(pluto_core_project_id__in=options["projects"])
+        if options["contains"]:
+            queryset = queryset.filter(name__icontains=options["contains"])
+        return queryset.order_by("name")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        bundles = []
+        for deliverable in self.get_bundles(options):
+            # a missing drop-folder would look like an empty one and remove all the unimported assets, so leave it
+            if os.path.isdir(get_path_for_deliverable(deliverable.name)):
+                bundles.append(deliverable)
+            else:
+                self.stdout.write("Skipping {0}: drop-folder {1} does not exist".format(
+                    deliverable.name, get_path_for_deliverable(deliverable.name)))
+
+        total = len(bundles)
+        self.stdout.write("Rescanning {0} bundles with up to {1} concurrent scans".format(total, options["concurrency"]))
+
+        start_time = time.monotonic()
+        completed = 0
+        failed = 0
+        added_total = 0
+        removed_total = 0
+
+        # the directory walks are latency-bound so they run on the pool, but all database writes happen here on the
+        # main thread as each scan completes
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            futures = {executor.submit(scan_bundle, deliverable.name): deliverable for deliverable in bundles}
+            for future in as_completed(futures):
+                deliverable = futures[future]
+                completed += 1
+                try:
+                    files, scan_time = future.result()
+                    write_start = time.monotonic()
+                    result = deliverable.apply_file_scan(files)
+                    write_time = time.monotonic() - write_start
+                except Exception as e:
+                    failed += 1
+                    logger.exception("Could not rescan {0}".format(deliverable.name))
+                    self.stdout.write("[{0}/{1}] {2}: FAILED: {3}".format(completed, total, deliverable.name, e))
+                    continue
+
+                added_total += result["added"]
+                removed_total += result["removed"]
+                self.stdout.write("[{0}/{1}] {2}: {3} files scanned in {4:.2f}s, written in {5:.2f}s, "
+                                  "{6} added, {7} removed".format(completed, total, deliverable.name, len(files),
+                                                                  scan_time, write_time, result["added"],
+                                                                  result["removed"]))
+
+        self.stdout.write("Rescanned {0} bundles in {1:.2f}s: {2} added, {3} removed, {4} failed".format(
+            total - failed, time.monotonic() - start_time, added_total, removed_total, failed))
@@ -8,12 +8,11 @@ from optparse import OptionParser
 from datetime import datetime
 import base64
 from email.utils import formatdate
-import requests
+from gnm_deliverables import http_client
 from time import mktime, sleep
 from urllib.parse import urlparse
 from pprint import pprint
 import os.path
-import requests
 import sys
 
 import logging
@@ -62,7 +61,7 @@ def authenticated_request(uri:str, secret:str, verify=True, override_time:dateti
         'X-Gu-Tools-HMAC-Token': authtoken,
     }
 
-    response = requests.get(uri, headers=headers, verify=verify)
+    response = http_client.get(uri, headers=headers, verify=verify)
 
     if response.status_code==200:
         return response.json()
@@ -0,0 +1,150 @@
+from django.core.management.base import BaseCommand
+from gnm_deliverables.models import Deliverable
+from gnm_deliverables.files import get_path_for_deliverable
+from gnm_deliverables.dropfolder_watcher import make_watcher, Debouncer
+import logging
+import os
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Management command that watches the bundle drop-folders and keeps their asset records up to date as files arrive
+    """
+    help = 'Watch the drop-folders of all bundles and update their assets as files are added, changed or removed'
+
+    def __init__(self, *args, **kwargs):
+        super(Command, self).__init__(*args, **kwargs)
+        self.running = True
+        self.deliverables = {}
+        self.roots = {}
+        # bundle name -> time at which to rescan it
+        self.rescans_due = {}
+
+    def add_arguments(self, parser):
+        parser.add_argument("--settle-time", type=float, default=5.0,
+                            help="Seconds that a file's size must stay the same before it is recorded (default 5)")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Seconds to wait for events on each pass (default 2)")
+        parser.add_argument("--refresh", type=float, default=60.0,
+                            help="Seconds between checks for new bundles (default 60)")
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Maximum number of changes to write for a bundle in one transaction (default 100)")
+        parser.add_argument("--polling", action="store_true", default=False,
+                            help="Compare snapshots of the drop-folders instead of using inotify")
+
+    def refresh_bundles(self, watcher):
+        """
+        starts watching the drop-folders of any bundles that we are not watching yet, and catches up on the changes
+        made in them while we were not watching
+        """
+        for deliverable in Deliverable.objects.exclude(name__in=list(self.deliverables.keys())):
+            root_path = get_path_for_deliverable(deliverable.name)
+            if not os.path.isdir(root_path):
+                continue
+            logger.info("Watching {0} for {1}".format(root_path, deliverable.name))
+            watcher.add_bundle(deliverable.name, root_path)
+            self.deliverables[deliverable.name] = deliverable
+            self.roots[deliverable.name] = root_path
+            try:
+                deliverable.sync_assets_incrementally()
+            except Exception:
+                logger.exception("Could not sync {0}".format(deliverable.name))
+
+    def files_under(self, name: str, relative_dir: str) -> list:
+        """
+        returns the keys of every file that we have a record of under the given directory of a bundle
+        """
+        deliverable = self.deliverables[name]
+        prefix = relative_dir + os.sep
+        paths = set(deliverable.index_entries.filter(relative_path__startswith=prefix)
+                    .values_list("relative_path", flat=True))
+        paths.update(deliverable.assets.filter(filename__startswith=prefix).values_list("filename", flat=True))
+        return [(name, path) for path in sorted(paths)]
+
+    def take_watcher_updates(self, watcher, rescan_at: float) -> list:
+        """
+        picks up the changes that the watcher could not report file by file.  Bundles that need a rescan are
+        scheduled for rescan_at, which is pushed back if they need another one before then, so that a burst of
+        overflows only gives one rescan
+        :return: list of (bundle name, relative path) for the files under directories that were moved out
+        """
+        removed = []
+        for name, relative_dir in watcher.removed_directories:
+            if name in self.deliverables:
+                removed += self.files_under(name, relative_dir)
+        watcher.removed_directories.clear()
+        for name in watcher.rescans:
+            self.rescans_due[name] = rescan_at
+        watcher.rescans.clear()
+        return removed
+
+    def run_due_rescans(self, now: float):
+        for name, due in list(self.rescans_due.items()):
+            if due > now:
+                continue
+            del self.rescans_due[name]
+            deliverable = self.deliverables.get(name)
+            if deliverable is None:
+                continue
+            try:
+                deliverable.sync_assets_incrementally()
+            except Exception:
+                logger.exception("Could not sync {0}".format(name))
+
+    def write_changes(self, settled, removed, batch_size):
+        """
+        writes the settled and removed files, grouped by bundle, in batches of at most `batch_size`
+        """
+        changes_by_bundle = {}
+        for name, scan_entry in settled:
+            changes_by_bundle.setdefault(name, ([], []))[0].append(scan_entry)
+        for name, relative_path in removed:
+            changes_by_bundle.setdefault(name, ([], []))[1].append(relative_path)
+
+        for name, (changed_files, removed_paths) in changes_by_bundle.items():
+            deliverable = self.deliverables[name]
+            for i in range(0, max(len(changed_files), len(removed_paths)), batch_size):
+                try:
+                    result = deliverable.apply_file_changes(changed_files[i:i+batch_size],
+                                                            removed_paths[i:i+batch_size])
+                    logger.info("{0}: {1} added, {2} updated, {3} removed".format(
+                        name, result["added"], result["updated"], result["removed"]))
+                except Exception:
+                    logger.exception("Could not write changes for {0}".format(name))
+
+    def handle(self, *args, **options):
+        watcher = make_watcher(force_polling=options["polling"])
+        logger.info("Using {0}".format(watcher.__class__.__name__))
+        debouncer = Debouncer(options["settle_time"])
+
+        def on_quit(signum, frame):
+            logger.info("Caught signal {0}, exiting...".format(signum))
+            self.running = False
+
+        signal.signal(signal.SIGINT, on_quit)
+        signal.signal(signal.SIGTERM, on_quit)
+
+        last_refresh = None
+        try:
+            while self.running:
+                now = time.monotonic()
+                if last_refresh is None or now - last_refresh >= options["refresh"]:
+                    self.refresh_bundles(watcher)
+                    last_refresh = now
+
+                for key in watcher.poll(options["interval"]):
+                    debouncer.touch(key, time.monotonic())
+                removed_from_directories = self.take_watcher_updates(watcher,
+                                                                     time.monotonic() + options["settle_time"])
+                settled, removed = debouncer.collect(self.roots, time.monotonic())
+                removed += removed_from_directories
+                if len(settled) > 0 or len(removed) > 0:
+                    self.write_changes(settled, removed, options["batch_size"])
+                self.run_due_rescans(time.monotonic())
+        finally:
+            watcher.close()
+        logger.info("terminated")
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gnm_deliverables', '0021_manual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DropFolderIndexEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relative_path', models.TextField()),
+                ('size', models.BigIntegerField(default=0)),
+                ('mtime_ns', models.BigIntegerField(default=0)),
+                ('ctime_ns', models.BigIntegerField(default=0)),
+                ('deliverable', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_entries', to='gnm_deliverables.deliverable')),
+            ],
+            options={
+                'unique_together': {('deliverable', 'relative_path')},
+            },
+        ),
+    ]
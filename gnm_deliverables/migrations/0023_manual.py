@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gnm_deliverables', '0022_manual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(blank=True, null=True)),
+                ('type', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.IntegerField(blank=True, null=True)),
+                ('platform', models.CharField(blank=True, default='', max_length=32)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'index_together': {('platform', 'day', 'type', 'status')},
+            },
+        ),
+    ]
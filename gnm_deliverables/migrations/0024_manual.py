@@ -0,0 +1,39 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# must give the same result as DeliverableAsset.build_search_document; concat_ws skips null values
+BACKFILL_SEARCH_DOCUMENT = """
+UPDATE gnm_deliverables_deliverableasset AS asset SET search_document = concat_ws(E'\\n',
+    asset.filename,
+    (SELECT website_title FROM gnm_deliverables_gnmwebsite WHERE id=asset.gnm_website_master_id),
+    (SELECT mainstream_title FROM gnm_deliverables_mainstream WHERE id=asset.mainstream_master_id),
+    (SELECT daily_motion_title FROM gnm_deliverables_dailymotion WHERE id=asset."DailyMotion_master_id"),
+    (SELECT youtube_title FROM gnm_deliverables_youtube WHERE id=asset.youtube_master_id)
+)
+"""
+
+# icontains is done as UPPER(column) LIKE UPPER(pattern), so the index is on the same expression
+CREATE_SEARCH_INDEX = """
+CREATE INDEX gnm_deliverables_asset_search_trgm ON gnm_deliverables_deliverableasset
+    USING gin (UPPER(search_document) gin_trgm_ops)
+"""
+
+DROP_SEARCH_INDEX = "DROP INDEX IF EXISTS gnm_deliverables_asset_search_trgm"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gnm_deliverables', '0023_manual'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='deliverableasset',
+            name='search_document',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_DOCUMENT, migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_SEARCH_INDEX, DROP_SEARCH_INDEX),
+    ]
@@ -0,0 +1,35 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+# equality lookups only, and unlike a btree it has no limit on the length of the values
+CREATE_PATH_INDEX = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS gnm_asset_absolute_path_hash ON gnm_deliverables_deliverableasset
+    USING hash (absolute_path)
+"""
+
+DROP_PATH_INDEX = "DROP INDEX CONCURRENTLY IF EXISTS gnm_asset_absolute_path_hash"
+
+
+class Migration(migrations.Migration):
+    # the indexes are built without locking the table against writes, which can't be done inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('gnm_deliverables', '0025_manual'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='deliverableasset',
+            index=models.Index(fields=['job_id'], name='gnm_asset_job_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='deliverableasset',
+            index=models.Index(fields=['online_item_id'], name='gnm_asset_online_item_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='deliverableasset',
+            index=models.Index(fields=['atom_id'], name='gnm_asset_atom_id_idx'),
+        ),
+        migrations.RunSQL(CREATE_PATH_INDEX, DROP_PATH_INDEX),
+    ]
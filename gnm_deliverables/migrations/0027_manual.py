@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def populate_dashboard_rollup(apps, schema_editor):
+    # the rollup was created empty in 0023, and the dashboards read their counts from it
+    from gnm_deliverables import dashboard_rollup
+    dashboard_rollup.rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gnm_deliverables', '0026_manual'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_dashboard_rollup, migrations.RunPython.noop),
+    ]
@@ -9,8 +9,9 @@ import urllib.parse
 import urllib.request
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
+from django.db.models.signals import post_save
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from gnmvidispine.vs_item import VSItem, VSException, VSNotFound
@@ -25,9 +26,10 @@ from .choices import DELIVERABLE_ASSET_TYPE_CHOICES, DELIVERABLE_STATUS_ALL_FILE
     DELIVERABLE_ASSET_TYPE_OTHER_MISCELLANEOUS, DELIVERABLE_ASSET_TYPE_OTHER_PAC_FORMS, DELIVERABLE_ASSET_TYPE_OTHER_POST_PRODUCTION_SCRIPT
 from .exceptions import ImportFailedError, NoShapeError
 from .files import get_path_for_deliverable, find_files_for_deliverable, create_folder, \
-    get_local_path_for_deliverable, create_folder_for_deliverable
+    get_local_path_for_deliverable, create_folder_for_deliverable, scan_files_for_deliverable, file_info_for
 from .templatetags.deliverable_tags import sizeof_fmt
 from .transcodepreset import TranscodePresetFinder
+from . import vidispine_cache
 import datetime
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,29 @@ def seconds_to_timestamp(seconds):
 transcode_preset_finder = TranscodePresetFinder()
 
 
+class TracksSavedValues(object):
+    """
+    model mixin that remembers the values of the fields listed in TRACKED_FIELDS as they were loaded from the
+    database, so that signal receivers can tell whether they changed on save.
+    saved_values is None if the instance was not loaded from the database.
+    """
+    TRACKED_FIELDS = []
+    saved_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(TracksSavedValues, cls).from_db(db, field_names, values)
+        instance.saved_values = {name: value for name, value in zip(field_names, values)
+                                 if name in cls.TRACKED_FIELDS}
+        return instance
+
+    def tracked_values(self) -> dict:
+        """
+        returns the current values of the fields listed in TRACKED_FIELDS
+        """
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+
 class Deliverable(models.Model):
     project_id = models.CharField(null=True, blank=True, max_length=61)
     commission_id = models.BigIntegerField(null=False, blank=False, db_index=True)
@@ -46,56 +71,190 @@ class Deliverable(models.Model):
     name = models.CharField(null=False, blank=False, unique=True, max_length=255)
     created = models.DateTimeField(null=False, blank=False, auto_now_add=True)
 
+    @staticmethod
+    def _assets_by_path(assets) -> dict:
+        """
+        returns a dictionary of the given assets keyed on their relative path. If more than one record has the same
+        path then one that has been imported, i.e. has an online_item_id or job_id, is preferred, and then the newest
+        one, so that a scan doesn't pick an unimported duplicate over the record that the import was made for.
+        :param assets: iterable of DeliverableAsset, e.g. a queryset
+        :return: dictionary of relative path -> DeliverableAsset
+        """
+        def preference(asset):
+            return (asset.online_item_id is not None or asset.job_id is not None, asset.id)
+
+        result = {}
+        for asset in assets:
+            current = result.get(asset.filename)
+            if current is None or preference(asset) > preference(current):
+                result[asset.filename] = asset
+        return result
+
+    def _upsert_assets(self, files, existing_assets: dict) -> (list, list):
+        """
+        reconciles the given FileInfo records against the given existing assets, keyed on relative path.
+        Records are created for new files and updated for files whose stat information has changed; each is done
+        as a single bulk operation, so the caller should wrap this in a transaction.
+        :param files: iterable of FileInfo
+        :param existing_assets: dictionary of relative path -> DeliverableAsset, as returned by _assets_by_path
+        :return: a tuple of (list of created DeliverableAsset, list of updated DeliverableAsset)
+        """
+        batch_size = getattr(settings, "GNM_DELIVERABLES_SCAN_BATCH_SIZE", 500)
+        assets_to_create = []
+        assets_to_update = []
+        for f in files:
+            asset = existing_assets.get(f.path)
+            if asset is None:
+                asset = DeliverableAsset(
+                    filename=f.path,
+                    deliverable=self,
+                    size=f.size,
+                    access_dt=f.access_dt,
+                    modified_dt=f.modified_dt,
+                    changed_dt=f.changed_dt,
+                    absolute_path=f.absolute_path
+                )
+                # bulk_create doesn't call save(), so fill in the search document here
+                asset.search_document = asset.build_search_document()
+                assets_to_create.append(asset)
+            elif asset.update_stat_from(f):
+                assets_to_update.append(asset)
+
+        DeliverableAsset.objects.bulk_create(assets_to_create, batch_size=batch_size)
+        DeliverableAsset.objects.bulk_update(assets_to_update, DeliverableAsset.STAT_FIELDS, batch_size=batch_size)
+        return assets_to_create, assets_to_update
+
+    @staticmethod
+    def _notify_saved(created_assets, updated_assets):
+        """
+        bulk operations don't send signals, so send post_save here for the assets written by _upsert_assets in order
+        to keep the message queue informed
+        """
+        for asset in created_assets:
+            post_save.send(sender=DeliverableAsset, instance=asset, created=True)
+        for asset in updated_assets:
+            post_save.send(sender=DeliverableAsset, instance=asset, created=False)
+
     def sync_assets_from_file_system(self):
         """
         performs a scan of the drop-folder associated with this deliverable. If a file is found that does not correspond
-        to a DeliverableAsset record then create a record for it, if there is a corresponding record then update the ctime/
-        mtime/atime.
+        to a DeliverableAsset record then create a record for it, if there is a corresponding record then update the size/
+        ctime/mtime/atime.  Files are matched to records on their relative path.
         Also, if any asset records have NOT been imported (i.e. their type and item_id is null) and their corresponding
         files have been removed then delete those records.
+        All of the bundle's records are loaded in one query and written back in bulk within a single transaction, so
+        the number of queries does not depend on the number of files.
         :return: a dictionary with two keys, a count of "added" records and a count of "removed" records.
         """
-        assets_on_fs = []
-        added_count = 0
-        removed_count = 0
-
-        for f in find_files_for_deliverable(self.name):
-            asset, created = DeliverableAsset.objects.get_or_create(
-                filename=f.path,
-                deliverable=self,
-                size=f.size,
-                modified_dt=f.modified_dt,
-                defaults=dict(
-                    access_dt=f.access_dt,
-                    changed_dt=f.changed_dt,
-                    absolute_path=f.absolute_path
-                )
-            )
-            assets_on_fs.append(asset)
-            if created:
-                logger.info('Asset created: %s' % asset)
-                added_count += 1
+        return self.apply_file_scan(list(find_files_for_deliverable(self.name)))
+
+    def apply_file_scan(self, files):
+        """
+        reconciles this deliverable's asset records against the given list of files from the drop-folder, as described
+        in sync_assets_from_file_system.  This only touches the database, so the (slow) directory walk can be done
+        elsewhere, e.g. on another thread.
+        :param files: list of FileInfo for every file currently in the drop-folder
+        :return: a dictionary with two keys, a count of "added" records and a count of "removed" records.
+        """
+        paths_on_fs = set([f.path for f in files])
+
+        with transaction.atomic():
+            all_assets = list(self.assets.order_by("id"))
+            existing_assets = self._assets_by_path(all_assets)
+            created_assets, updated_assets = self._upsert_assets(files, existing_assets)
+
+            # Remove assets rows that are not found on the FS and does not have an item tied to it
+            ids_to_delete = [asset.id for asset in all_assets
+                             if asset.type is None and asset.online_item_id is None and
+                             (asset.filename not in paths_on_fs or existing_assets.get(asset.filename) is not asset)]
+            removed_count = 0
+            if len(ids_to_delete) > 0:
+                _, deleted_by_model = self.assets.filter(id__in=ids_to_delete).delete()
+                removed_count = deleted_by_model.get(DeliverableAsset._meta.label, 0)
+                logger.info('Deleted %s asset rows' % removed_count)
+
+        self._notify_saved(created_assets, updated_assets)
+        logger.info("Scan of {0}: {1} added, {2} updated, {3} removed".format(
+            self.name, len(created_assets), len(updated_assets), removed_count))
+        return {"added": len(created_assets), "removed": removed_count}
+
+    def sync_assets_incrementally(self):
+        """
+        performs an incremental scan of the drop-folder associated with this deliverable.
+        the size, mtime and ctime of each file are compared against the DropFolderIndexEntry records written by the
+        previous scan, and only files that have been added, changed or removed since then are written to the database.
+        Asset records are matched to files on their relative path.  As with sync_assets_from_file_system, records for
+        removed files are only deleted if they have not been imported.
+        :return: a dictionary with counts of "added", "updated" and "removed" records and of files "skipped" as unchanged
+        """
+        index = {entry.relative_path: entry for entry in self.index_entries.all()}
+
+        changed_files = []
+        seen_paths = set()
+        skipped_count = 0
+        for scan_entry in scan_files_for_deliverable(self.name):
+            seen_paths.add(scan_entry.path)
+            index_entry = index.get(scan_entry.path)
+            if index_entry is not None and index_entry.matches(scan_entry.stat):
+                skipped_count += 1
             else:
-                logger.info('Asset already existed: %s' % asset)
-                # Update defaults
-                asset.access_dt = f.access_dt
-                asset.changed_dt = f.changed_dt
-                asset.absolute_path = f.absolute_path
-                asset.save()
-
-        # Remove assets rows that are not found on the FS and does not have an item tied to it
-        assets_to_delete = self.assets.filter(
-            type__isnull=True,
-            online_item_id__isnull=True
-        ).exclude(
-            id__in=[a.id for a in assets_on_fs]
-        )
-        delete_count = assets_to_delete.count()
-        if delete_count > 0:
-            assets_to_delete.delete()
-            removed_count += 1
-            logger.info('Deleted %s asset rows' % delete_count)
-        return {"added": added_count, "removed": removed_count}
+                changed_files.append(scan_entry)
+        removed_paths = [path for path in index.keys() if path not in seen_paths]
+
+        result = self.apply_file_changes(changed_files, removed_paths, index=index)
+        logger.info("Incremental scan of {0}: {1} added, {2} updated, {3} removed, {4} unchanged".format(
+            self.name, result["added"], result["updated"], result["removed"], skipped_count))
+        result["skipped"] = skipped_count
+        return result
+
+    def apply_file_changes(self, changed_files, removed_paths, index=None):
+        """
+        writes the given changes in the drop-folder to the asset records and the DropFolderIndexEntry records of
+        this deliverable, in a single transaction.  Used by sync_assets_incrementally and the drop-folder watcher.
+        :param changed_files: list of ScanEntry for files that have been added or modified
+        :param removed_paths: list of relative paths of files that have been removed
+        :param index: optional dictionary of relative path -> DropFolderIndexEntry, if the caller has already loaded it.
+        if not given then the entries for the changed files are loaded here
+        :return: a dictionary with counts of "added", "updated" and "removed" records
+        """
+        batch_size = getattr(settings, "GNM_DELIVERABLES_SCAN_BATCH_SIZE", 500)
+
+        with transaction.atomic():
+            if index is None:
+                index = {entry.relative_path: entry for entry in
+                         self.index_entries.filter(relative_path__in=[f.path for f in changed_files])}
+            existing_assets = self._assets_by_path(
+                self.assets.filter(filename__in=[f.path for f in changed_files])
+            )
+            created_assets, updated_assets = self._upsert_assets([file_info_for(f) for f in changed_files],
+                                                                 existing_assets)
+
+            index_to_create = []
+            index_to_update = []
+            for scan_entry in changed_files:
+                index_entry = index.get(scan_entry.path)
+                if index_entry is None:
+                    index_entry = DropFolderIndexEntry(deliverable=self, relative_path=scan_entry.path)
+                    index_to_create.append(index_entry)
+                else:
+                    index_to_update.append(index_entry)
+                index_entry.update_from(scan_entry.stat)
+            DropFolderIndexEntry.objects.bulk_create(index_to_create, batch_size=batch_size)
+            DropFolderIndexEntry.objects.bulk_update(index_to_update, ["size", "mtime_ns", "ctime_ns"],
+                                                     batch_size=batch_size)
+
+            removed_count = 0
+            if len(removed_paths) > 0:
+                _, deleted_by_model = self.assets.filter(
+                    filename__in=removed_paths,
+                    type__isnull=True,
+                    online_item_id__isnull=True
+                ).delete()
+                removed_count = deleted_by_model.get(DeliverableAsset._meta.label, 0)
+                self.index_entries.filter(relative_path__in=removed_paths).delete()
+
+        self._notify_saved(created_assets, updated_assets)
+        return {"added": len(created_assets), "updated": len(updated_assets), "removed": removed_count}
 
     @cached_property
     def path(self):
@@ -193,7 +352,7 @@ class Deliverable(models.Model):
         pass
 
 
-class DeliverableAsset(models.Model):
+class DeliverableAsset(TracksSavedValues, models.Model):
     type = models.PositiveIntegerField(null=True, blank=True,
                                        choices=DELIVERABLE_ASSET_TYPE_CHOICES)
 
@@ -238,10 +397,101 @@ class DeliverableAsset(models.Model):
     oovvuu_master = models.ForeignKey("Oovvuu", on_delete=models.SET_NULL, null=True)
     reutersconnect_master = models.ForeignKey("ReutersConnect", on_delete=models.SET_NULL, null=True)
 
+    # Denormalised text searched by GenericAssetSearchAPI, maintained by save() and update_search_documents.
+    # It has a trigram index on upper(search_document), to match the SQL that icontains generates
+    search_document = models.TextField(null=False, blank=True, default="")
+
     def __init__(self, *args, **kwargs):
         super(DeliverableAsset, self).__init__(*args, **kwargs)
         self.__item = None
         self.__job = None
+        self._search_sources = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(DeliverableAsset, cls).from_db(db, field_names, values)
+        if all(name in field_names for name in cls.SEARCH_SOURCE_FIELDS):
+            instance._search_sources = instance.search_sources()
+        return instance
+
+    # fields that the dashboard statistics are grouped on
+    TRACKED_FIELDS = ["status", "type", "access_dt"]
+
+    # fields that are set from the drop-folder file by Deliverable.sync_assets_from_file_system
+    STAT_FIELDS = ["size", "access_dt", "modified_dt", "changed_dt", "absolute_path"]
+
+    # syndication records whose titles are included in the search document, and the name of their title field
+    SEARCH_MASTERS = {
+        "gnm_website_master": "website_title",
+        "mainstream_master": "mainstream_title",
+        "DailyMotion_master": "daily_motion_title",
+        "youtube_master": "youtube_title",
+    }
+
+    # fields of this model that the search document is built from
+    SEARCH_SOURCE_FIELDS = ["filename"] + [name + "_id" for name in SEARCH_MASTERS.keys()]
+
+    def search_sources(self) -> tuple:
+        """
+        returns the current values of the fields that the search document is built from
+        """
+        return tuple(getattr(self, name) for name in self.SEARCH_SOURCE_FIELDS)
+
+    def build_search_document(self) -> str:
+        """
+        builds the text that GenericAssetSearchAPI searches, from the filename and the titles of the syndication
+        records.  This has to give the same result as the backfill in migration 0024.
+        :return: the search document, lines of text with no empty values
+        """
+        parts = [self.filename]
+        for field_name, title_field in self.SEARCH_MASTERS.items():
+            if getattr(self, field_name + "_id") is not None:
+                parts.append(getattr(getattr(self, field_name), title_field))
+        return "\n".join([part for part in parts if part is not None])
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        sources = self.search_sources()
+        rebuild_search = sources != self._search_sources and \
+            (update_fields is None or any(name in update_fields for name in self.SEARCH_SOURCE_FIELDS))
+        if rebuild_search:
+            self.search_document = self.build_search_document()
+            if update_fields is not None:
+                kwargs["update_fields"] = list(update_fields) + ["search_document"]
+        super(DeliverableAsset, self).save(*args, **kwargs)
+        if rebuild_search:
+            self._search_sources = sources
+
+    @classmethod
+    def update_search_documents(cls, queryset):
+        """
+        rebuilds the search documents of the assets in the given queryset, for when the title of a syndication record
+        changes.  These are written with a bulk update, so no signals are sent.
+        :param queryset: DeliverableAsset queryset
+        :return: the number of assets whose search document changed
+        """
+        assets_to_update = []
+        for asset in queryset.select_related(*cls.SEARCH_MASTERS.keys()):
+            document = asset.build_search_document()
+            if document != asset.search_document:
+                asset.search_document = document
+                assets_to_update.append(asset)
+        cls.objects.bulk_update(assets_to_update, ["search_document"])
+        return len(assets_to_update)
+
+    def update_stat_from(self, file_info) -> bool:
+        """
+        sets the stat fields of this asset from the given FileInfo. Does not save the model.
+        :param file_info: FileInfo describing the file on disk
+        :return: True if any of the fields changed, otherwise False
+        """
+        changed = False
+        for field_name in self.STAT_FIELDS:
+            new_value = getattr(file_info, field_name)
+            if getattr(self, field_name) != new_value:
+                setattr(self, field_name, new_value)
+                changed = True
+        return changed
 
     def update_metadata(self, user):
         """
@@ -375,6 +625,8 @@ class DeliverableAsset(models.Model):
                                         "asset_id": str(self.id)
                                     })
 
+        # the item is getting a new shape
+        vidispine_cache.cache.invalidate(self.online_item_id)
         self.job_id = job_id
         self.status = DELIVERABLE_ASSET_STATUS_TRANSCODING
         self.save()
@@ -423,7 +675,8 @@ class DeliverableAsset(models.Model):
         """
         returns a gnmvidispine VSItem object representing the vidispine item associated with this deliverable.
         the first time it is called (this happens internally) the data is lifted from the VS server and thereafter
-        it is cached
+        it is cached on this instance.  It is not taken from the process-wide cache in vidispine_cache, because the
+        callers decide what to do to the item from its current state, e.g. whether it has a shape yet
         the item_id must be set for this to work.  None is returned if the item id is not set; VSNotFound is raised
         if the item does not exist, or another VSException is raised if server communication fails
         :param user: username to run the metadata get as
@@ -462,6 +715,7 @@ class DeliverableAsset(models.Model):
                 ).exists()
                 if not self.created_from_existing_item and not exists_in_other_deliverable:
                     self.item(user).delete()
+                    vidispine_cache.cache.invalidate(self.online_item_id)
 
             except VSException:
                 logger.exception(
@@ -498,8 +752,51 @@ class DeliverableAsset(models.Model):
     def __str__(self):
         return '{name}'.format(name=self.filename)
 
+    class Meta:
+        # the message consumers look assets up by these. absolute_path has a hash index instead, created in
+        # migration 0026, because paths can be too long for a btree entry
+        indexes = [
+            models.Index(fields=["job_id"], name="gnm_asset_job_id_idx"),
+            models.Index(fields=["online_item_id"], name="gnm_asset_online_item_id_idx"),
+            models.Index(fields=["atom_id"], name="gnm_asset_atom_id_idx"),
+        ]
+
+
+class DropFolderIndexEntry(models.Model):
+    """
+    records the stat information of a file in a deliverable's drop-folder as of the last incremental scan, so that
+    the next scan can skip the files that have not changed
+    """
+    deliverable = models.ForeignKey(Deliverable, related_name='index_entries', on_delete=models.CASCADE)
+    relative_path = models.TextField(null=False, blank=False)
+    size = models.BigIntegerField(null=False, default=0)
+    mtime_ns = models.BigIntegerField(null=False, default=0)
+    ctime_ns = models.BigIntegerField(null=False, default=0)
+
+    def matches(self, stat_result: os.stat_result) -> bool:
+        """
+        returns True if the given stat result has the same size, mtime and ctime as this index entry
+        """
+        return self.size == stat_result.st_size and \
+            self.mtime_ns == stat_result.st_mtime_ns and \
+            self.ctime_ns == stat_result.st_ctime_ns
+
+    def update_from(self, stat_result: os.stat_result):
+        """
+        sets the size, mtime and ctime of this index entry from the given stat result. Does not save the model.
+        """
+        self.size = stat_result.st_size
+        self.mtime_ns = stat_result.st_mtime_ns
+        self.ctime_ns = stat_result.st_ctime_ns
+
+    def __str__(self):
+        return '{0}/{1}'.format(self.deliverable_id, self.relative_path)
+
+    class Meta:
+        unique_together = ('deliverable', 'relative_path')
 
-class GNMWebsite(models.Model):
+
+class GNMWebsite(TracksSavedValues, models.Model):
     media_atom_id = models.UUIDField(null=True, blank=True)
     upload_status = models.TextField(null=True, blank=True,
                                      choices=UPLOAD_STATUS, db_index=True)
@@ -515,8 +812,10 @@ class GNMWebsite(models.Model):
     etag = models.DateTimeField(null=False, blank=False, auto_now_add=True)
     source = models.TextField(null=True, blank=True)
 
+    TRACKED_FIELDS = ["publication_date"]
+
 
-class Mainstream(models.Model):
+class Mainstream(TracksSavedValues, models.Model):
     mainstream_title = models.TextField(null=False, blank=False)
     mainstream_description = models.TextField(null=True, blank=True)
     mainstream_tags = ArrayField(models.CharField(null=False, max_length=255), null=True, blank=True)
@@ -527,8 +826,10 @@ class Mainstream(models.Model):
     routename = models.TextField(null=True, blank=True)
     job_id = models.TextField(null=True, blank=True)
 
+    TRACKED_FIELDS = ["publication_date"]
 
-class Youtube(models.Model):
+
+class Youtube(TracksSavedValues, models.Model):
     youtube_id = models.TextField(null=False, blank=False, db_index=True)
     youtube_title = models.TextField(null=False, blank=False)
     youtube_description = models.TextField(null=True, blank=True)
@@ -538,11 +839,13 @@ class Youtube(models.Model):
     publication_date = models.DateTimeField(null=True, blank=True)
     etag = models.DateTimeField(null=False, blank=False, auto_now_add=True)
 
+    TRACKED_FIELDS = ["publication_date"]
+
     def __str__(self):
         return '{title}'.format(title=self.youtube_title)
 
 
-class DailyMotion(models.Model):
+class DailyMotion(TracksSavedValues, models.Model):
     daily_motion_url = models.TextField(null=True, blank=True)
     daily_motion_title = models.TextField(null=False, blank=False)
     daily_motion_description = models.TextField(null=True, blank=True)
@@ -556,6 +859,8 @@ class DailyMotion(models.Model):
     routename = models.TextField(null=True, blank=True)
     job_id = models.TextField(null=True, blank=True)
 
+    TRACKED_FIELDS = ["publication_date"]
+
 
 class Oovvuu(models.Model):
     seen_on_channel = models.BooleanField(default=False)
@@ -588,6 +893,40 @@ class SyndicationNotes(models.Model):
     deliverable_asset = models.ForeignKey(DeliverableAsset, on_delete=models.CASCADE, db_index=True)
 
 
+class DashboardRollup(models.Model):
+    """
+    pre-aggregated counts for the dashboard statistics, maintained by the receivers in signals.py and rebuilt with
+    the rebuild_dashboard_rollup command.  Asset counts have an empty platform and are keyed on the day of the
+    access time, type and status; publication counts are keyed on the platform and day of publication only.
+    there may be more than one row for the same key, so always sum the counts.
+    """
+    day = models.DateField(null=True, blank=True)
+    type = models.PositiveIntegerField(null=True, blank=True)
+    status = models.IntegerField(null=True, blank=True)
+    platform = models.CharField(null=False, blank=True, default="", max_length=32)
+    count = models.BigIntegerField(null=False, default=0)
+
+    def __str__(self):
+        return '{0} {1} {2} {3}: {4}'.format(self.platform, self.day, self.type, self.status, self.count)
+
+    class Meta:
+        index_together = [('platform', 'day', 'type', 'status')]
+
+
+class OutboxMessage(models.Model):
+    """
+    a model-change message waiting to be sent to the broker.  The receivers in signals.py write these in the same
+    transaction as the change, so they are only sent if it commits, and the relay_outbox command sends them in
+    order of id and deletes them.
+    """
+    routing_key = models.CharField(null=False, blank=False, max_length=255)
+    payload = models.BinaryField(null=False)
+    created = models.DateTimeField(null=False, blank=False, auto_now_add=True)
+
+    def __str__(self):
+        return '{0} at {1}'.format(self.routing_key, self.created)
+
+
 class YouTubeCategories(models.Model):
     title = models.CharField(max_length=1024)
     identity = models.CharField(max_length=64, blank=True, null=True)
@@ -0,0 +1,203 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from collections import OrderedDict
+from functools import reduce
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, FloatField, Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def cursor_value_default(obj):
+    """
+    json encoder for the sort values in cursors.  Unlike DjangoJSONEncoder this keeps the full precision of
+    times, since the value has to match the row exactly
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, uuid.UUID)):
+        return str(obj)
+    raise TypeError("Can't put a {0} into a cursor".format(obj.__class__.__name__))
+
+
+class KeysetPagination(BasePagination):
+    """
+    pagination that seeks to the position after the last row of the previous page, keyed on the queryset's first
+    ordering column plus id, instead of counting through an OFFSET.  Every page costs the same as the first one
+    and rows added or removed while a client pages through don't make it skip or repeat rows.
+    The response is {"next": url, "previous": url, "results": [...]}, the urls carrying opaque cursor tokens.
+    Nulls in the sort column always come last, going forwards.  Only scalar columns can be sorted on, see
+    check_sort_field.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "pageSize"
+    page_size = 50
+    max_page_size = 1000
+
+    def __init__(self):
+        self.base_url = None
+        self.next_position = None
+        self.previous_position = None
+
+    @classmethod
+    def requested(cls, request) -> bool:
+        """
+        keyset pagination is opt-in, by passing the cursor parameter.  An empty cursor gets the first page.
+        """
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(position: dict) -> str:
+        content = json.dumps(position, default=cursor_value_default)
+        return base64.urlsafe_b64encode(content.encode("UTF-8")).decode("ASCII")
+
+    def decode_cursor(self, request):
+        """
+        returns the position encoded in the request's cursor parameter, or None for the first page
+        :raises NotFound: if the cursor is not one that we issued
+        """
+        token = request.query_params.get(self.cursor_query_param, "")
+        if token == "":
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(token.encode("ASCII")))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, dict) or not {"v", "id", "r"}.issubset(position.keys()):
+            raise NotFound("Invalid cursor")
+        return position
+
+    @staticmethod
+    def sort_field_of(queryset) -> (str, bool):
+        """
+        returns the name of the first ordering column of the queryset, and whether it is sorted descending.
+        Querysets with no ordering are sorted on id.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if len(ordering) == 0 or not isinstance(ordering[0], str):
+            return "id", False
+        if ordering[0].startswith("-"):
+            return ordering[0][1:], True
+        return ordering[0], False
+
+    @staticmethod
+    def check_sort_field(queryset, field: str):
+        """
+        checks that the queryset can be paged through on the given column.  The cursor has to hold the exact value of
+        the column in the last row, so it must be a concrete column of the model, or an annotation, that is not a
+        relation.  Floats aren't allowed either, as they don't always come back from the database exactly.
+        :raises ParseError: if it can't be sorted on
+        """
+        if field in queryset.query.annotations:
+            output_field = queryset.query.annotations[field].output_field
+        else:
+            try:
+                output_field = queryset.model._meta.get_field(field)
+            except FieldDoesNotExist:
+                output_field = None
+            if output_field is not None and (output_field.is_relation or not output_field.concrete):
+                output_field = None
+        if output_field is None or isinstance(output_field, FloatField):
+            raise ParseError("Results can't be paged through when sorted on {0}".format(field))
+
+    @staticmethod
+    def after_position(field: str, value, pk, ascending: bool, nulls_last: bool) -> Q:
+        """
+        builds the filter for the rows that come after (value, pk) when sorted on field then id, both ascending or
+        both descending, with nulls last or first
+        """
+        lookup = "gt" if ascending else "lt"
+        if value is None:
+            condition = Q(**{field + "__isnull": True, "id__" + lookup: pk})
+            if not nulls_last:
+                condition |= Q(**{field + "__isnull": False})
+        else:
+            condition = Q(**{field + "__" + lookup: value}) | Q(**{field: value, "id__" + lookup: pk})
+            if nulls_last:
+                condition |= Q(**{field + "__isnull": True})
+        return condition
+
+    @staticmethod
+    def ordered(queryset, field: str, ascending: bool, nulls_last: bool):
+        direction = "asc" if ascending else "desc"
+        nulls = {"nulls_last": True} if nulls_last else {"nulls_first": True}
+        return queryset.order_by(getattr(F(field), direction)(**nulls), getattr(F("id"), direction)())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        field, descending = self.sort_field_of(queryset)
+        self.check_sort_field(queryset, field)
+
+        # going backwards is going forwards through the reverse of the ordering
+        reverse = position is not None and position["r"]
+        ascending = descending if reverse else not descending
+        page_queryset = self.ordered(queryset, field, ascending, nulls_last=not reverse)
+        if position is not None:
+            page_queryset = page_queryset.filter(
+                self.after_position(field, position["v"], position["id"], ascending, nulls_last=not reverse))
+
+        # fetch one extra row to find out whether there is another page in this direction
+        results = list(page_queryset[0:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[0:page_size]
+        if reverse:
+            results.reverse()
+
+        def position_of(instance, reverse_flag):
+            value = reduce(getattr, field.split("__"), instance)
+            return {"v": value, "id": instance.pk, "r": reverse_flag}
+
+        self.next_position = None
+        self.previous_position = None
+        if len(results) > 0:
+            if has_more or reverse:
+                self.next_position = position_of(results[-1], False)
+            if position is not None and (has_more or not reverse):
+                self.previous_position = position_of(results[0], True)
+        return results
+
+    def get_link(self, position):
+        if position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_link(self.next_position)),
+            ("previous", self.get_link(self.previous_position)),
+            ("results", data),
+        ]))
+
+
+class KeysetPaginationMixin(object):
+    """
+    generic view mixin that uses KeysetPagination for requests that pass the cursor parameter, and the view's
+    normal pagination otherwise.
+    Views that slice their own queryset should check keyset_requested() and not slice.
+    """
+    def keyset_requested(self) -> bool:
+        return KeysetPagination.requested(self.request)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.keyset_requested():
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = None if self.pagination_class is None else self.pagination_class()
+        return self._paginator
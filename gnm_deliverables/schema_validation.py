@@ -0,0 +1,49 @@
+"""
+a registry of compiled json schema validators.  jsonschema.validate() checks the schema against the metaschema and
+builds a new validator every time that it is called, which costs more than validating a small message does.  Here
+each schema is checked and compiled once, the first time it is seen, and the validator is kept for the life of the
+process.
+Schemas are always validated as Draft 7, whatever their $schema says.
+"""
+import threading
+import jsonschema
+from jsonschema.exceptions import best_match
+
+_validators = {}
+_lock = threading.Lock()
+
+
+def compiled_validator(schema: dict) -> jsonschema.Draft7Validator:
+    """
+    returns the cached Draft7Validator for the given schema, compiling it if this is the first time it has been seen.
+    Schemas are looked up by identity, so they should be defined once (e.g. as class attributes) and not modified
+    afterwards.
+    :param schema: the schema dictionary
+    :return: a Draft7Validator instance
+    :raises jsonschema.SchemaError: if the schema itself is not valid
+    """
+    validator = _validators.get(id(schema))
+    if validator is not None and validator.schema is schema:
+        return validator
+
+    with _lock:
+        validator = _validators.get(id(schema))
+        if validator is None or validator.schema is not schema:
+            jsonschema.Draft7Validator.check_schema(schema)
+            validator = jsonschema.Draft7Validator(schema)
+            _validators[id(schema)] = validator
+    return validator
+
+
+def validate(content, schema: dict):
+    """
+    drop-in replacement for jsonschema.validate that uses the cached validator for the schema
+    :param content: decoded json content to validate
+    :param schema: the schema dictionary
+    :return: None
+    :raises jsonschema.ValidationError: if the content does not validate. Like jsonschema.validate, this is the most
+    relevant of the errors
+    """
+    error = best_match(compiled_validator(schema).iter_errors(content))
+    if error is not None:
+        raise error
@@ -7,7 +7,21 @@ from .models import DeliverableAsset, Deliverable, GNMWebsite, Youtube, Mainstre
     LogEntry, SyndicationNotes, Oovvuu, ReutersConnect
 
 
-class DeliverableAssetSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin(object):
+    """
+    serializers that traverse relations declare them here, so that views can load the related rows along with the
+    main query instead of one query per row.  Call setup_eager_loading on the queryset before it is sliced.
+    """
+    select_related_fields = []
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if len(cls.select_related_fields) > 0:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        return queryset
+
+
+class DeliverableAssetSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     type_string = serializers.CharField(read_only=True)
     size_string = serializers.CharField(read_only=True)
     status_string = serializers.SerializerMethodField('get_status_string')
@@ -38,6 +52,10 @@ class DeliverableAssetSerializer(serializers.ModelSerializer):
 
 
 class DenormalisedAssetSerializer(DeliverableAssetSerializer):
+    # depth = 1 expands every foreign key on the asset
+    select_related_fields = ['deliverable', 'gnm_website_master', 'youtube_master', 'DailyMotion_master',
+                             'mainstream_master', 'oovvuu_master', 'reutersconnect_master']
+
     class Meta(DeliverableAssetSerializer.Meta):
         depth = 1
 
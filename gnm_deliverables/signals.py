@@ -1,22 +1,39 @@
 from django.db.models.signals import post_save, post_delete
-from .models import Deliverable, DeliverableAsset
+from .models import Deliverable, DeliverableAsset, OutboxMessage, DashboardRollup, TracksSavedValues
 from django.dispatch import receiver
 import logging
 from rest_framework.renderers import JSONRenderer
 import pika
 import pika.exceptions
 from django.conf import settings
-from time import sleep
+import threading
 from rabbitmq.declaration import declare_rabbitmq_setup
+from . import change_collector, dashboard_rollup
 import os
 
 logger = logging.getLogger(__name__)
 
 
+# errors from pika that mean the message was not accepted by the broker
+PUBLISH_ERRORS = (pika.exceptions.AMQPError, )
+
+
 class MessageRelay(object):
     """
-    MessageRelay encapsulates the logic that sends messages to rabbitmq. This is done to lazily initialize the connection.
+    MessageRelay encapsulates the logic that sends messages to rabbitmq. The connection is opened lazily on the first
+    publish() and then kept open for the life of the process, shared between threads, with publisher confirms turned
+    on.  publish() returns once the broker has accepted the message and raises if it can't be sent, so the caller
+    decides what to do about it: relay_outbox leaves the message in the outbox to be tried again, and views report
+    the error.  Model changes are not published from here directly but recorded in the outbox by relay_message.
     """
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._channel = None
+        self._publish_lock = threading.Lock()
+
     @staticmethod
     def setup_connection():
         connection = pika.BlockingConnection(
@@ -32,30 +49,60 @@ class MessageRelay(object):
         )
         channel = connection.channel()
         declare_rabbitmq_setup(channel)
+        # basic_publish now waits for the broker to acknowledge, and raises NackError if it doesn't accept the message
+        channel.confirm_delivery()
         return channel
 
-    def send_content(self, routing_key:str, payload:bytes, connect_attempt=0):
-        max_attempts = getattr(settings,"RABBITMQ_MAX_SEND_ATTEMPTS",10)
-        try:
-            channel = MessageRelay.setup_connection()
-            channel.basic_publish(
-                exchange='pluto-deliverables',
-                routing_key=routing_key,
-                body=payload
-            )
-        except (pika.exceptions.ChannelWrongStateError, pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
-            if "CI" in os.environ:
-                logger.warning("Ignoring connection error as we are in CI mode")
+    def _close_channel(self):
+        channel = self._channel
+        self._channel = None
+        if channel is not None:
+            try:
+                channel.connection.close()
+            except Exception:
+                pass
+
+    def _publish(self, routing_key:str, payload:bytes):
+        """
+        publishes on the shared channel, connecting if there isn't one.  If the send fails on an existing connection,
+        e.g. because the broker dropped it while it was idle, reconnects and tries once more.
+        Must be called with _publish_lock held.
+        :raises: one of PUBLISH_ERRORS if the message could not be sent
+        """
+        if self._channel is not None:
+            try:
+                self._channel.basic_publish(exchange='pluto-deliverables', routing_key=routing_key, body=payload)
                 return
-            if connect_attempt>max_attempts:
-                logger.error("Could not re-establish broker connection after {0} attempts, giving up")
-                raise
-            else:
-                sleep(2*connect_attempt)
-                logger.warning("Message queue connection was lost: {0}. Attempting to reconnect, attempt {1}".format(str(e), connect_attempt))
-                self.send_content(routing_key, payload, connect_attempt+1)
+            except PUBLISH_ERRORS as e:
+                logger.info("Message queue connection was lost: {0}. Reconnecting".format(str(e)))
+                self._close_channel()
 
-    def relay_message(self, affected_model, action):
+        self._channel = MessageRelay.setup_connection()
+        try:
+            self._channel.basic_publish(exchange='pluto-deliverables', routing_key=routing_key, body=payload)
+        except PUBLISH_ERRORS:
+            self._close_channel()
+            raise
+
+    def publish(self, routing_key:str, payload:bytes):
+        """
+        sends a message on the shared connection, waiting for the broker to confirm it
+        :raises: one of PUBLISH_ERRORS if the message could not be sent
+        """
+        if self._pid != os.getpid():
+            # we are in a forked child, which can't use the parent's connection
+            self._reset()
+        with self._publish_lock:
+            self._publish(routing_key, payload)
+
+    @staticmethod
+    def message_for(affected_model, action):
+        """
+        builds the message describing a change to the given model instance
+        :param affected_model: model instance that was changed
+        :param action: "create", "update" or "delete"
+        :return: a tuple of (routing key, payload), or None if no message is sent for this kind of model
+        """
         from .serializers import DeliverableSerializer, DeliverableAssetSerializer
 
         try:
@@ -65,6 +112,8 @@ class MessageRelay(object):
             elif isinstance(affected_model, DeliverableAsset):
                 logger.info("{0} an instance of DeliverableAsset with id {1} at {2}".format(action, affected_model.pk, affected_model.absolute_path))
                 content = DeliverableAssetSerializer(affected_model)
+            elif isinstance(affected_model, (OutboxMessage, DashboardRollup)):
+                content = None
             elif affected_model.__class__.__name__=="Migration": #silently ignore this one
                 content = None
             elif affected_model.__class__.__name__=="User": #silently ignore this one
@@ -83,12 +132,23 @@ class MessageRelay(object):
 
             if content:
                 routing_key = "deliverables.{0}.{1}".format(affected_model.__class__.__name__.lower(), action)
-                payload = JSONRenderer().render(content.data)
-                self.send_content(routing_key, payload)
+                return routing_key, JSONRenderer().render(content.data)
 
         except Exception as e:
             logger.error("Could not relay message of {0} on {1}: {2}".format(action, affected_model, str(e)))
             logger.exception(e) #we don't want to bring down the app here, log it out and hope somebody sees
+        return None
+
+    def relay_message(self, affected_model, action):
+        """
+        records a message about the change to affected_model in the outbox.  It is written in the current
+        transaction, so it is only sent by the relay_outbox command if the change is committed.
+        Repeated changes to the same object in a coalesce_changes() block become a single message with its final
+        state, see change_collector.
+        """
+        if isinstance(affected_model, (OutboxMessage, DashboardRollup)):
+            return
+        change_collector.record(affected_model, action, self.message_for)
 
 
 
@@ -109,3 +169,30 @@ def model_saved(sender, **kwargs):
 def model_deleted(sender, **kwargs):
     return msgrelay.relay_message(kwargs.get("instance"), "delete")
 
+
+@receiver(post_save)
+def rollup_saved(sender, instance=None, created=False, **kwargs):
+    """
+    keeps the dashboard statistics up to date when an asset or syndication record is saved
+    """
+    if not isinstance(instance, TracksSavedValues):
+        return
+    if not created and instance.saved_values is None:
+        # an existing record saved from an instance that was not loaded from the database
+        dashboard_rollup.unknown_previous_values(instance)
+        instance.saved_values = instance.tracked_values()
+        return
+    previous_values = None if created else instance.saved_values
+    if previous_values != instance.tracked_values():
+        dashboard_rollup.instance_saved(instance, previous_values)
+    instance.saved_values = instance.tracked_values()
+
+
+@receiver(post_delete)
+def rollup_deleted(sender, instance=None, **kwargs):
+    """
+    keeps the dashboard statistics up to date when an asset or syndication record is deleted
+    """
+    if not isinstance(instance, TracksSavedValues):
+        return
+    dashboard_rollup.instance_deleted(instance)
@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.db import connection
+from gnm_deliverables.models import DeliverableAsset
+import unittest
+import uuid
+
+
+class TestAssetLookupIndexes(TestCase):
+    """
+    the message consumers look assets up by these columns, so their queries must be able to use an index rather than
+    scanning the table
+    """
+    def assertUsesIndex(self, queryset, index_name:str):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # with a near-empty table the planner would rather scan it; this only lasts until the test rolls back
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_job_id(self):
+        self.assertUsesIndex(DeliverableAsset.objects.filter(job_id="VX-123"), "gnm_asset_job_id_idx")
+        self.assertUsesIndex(DeliverableAsset.objects.filter(job_id__in=["VX-123", "VX-456"]), "gnm_asset_job_id_idx")
+
+    def test_online_item_id(self):
+        self.assertUsesIndex(DeliverableAsset.objects.filter(online_item_id="VX-123"), "gnm_asset_online_item_id_idx")
+
+    def test_atom_id(self):
+        self.assertUsesIndex(DeliverableAsset.objects.filter(atom_id=uuid.uuid4()), "gnm_asset_atom_id_idx")
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "the absolute_path index is created by a postgres migration")
+    def test_absolute_path(self):
+        self.assertUsesIndex(DeliverableAsset.objects.filter(absolute_path="/path/to/file.mxf"),
+                             "gnm_asset_absolute_path_hash")
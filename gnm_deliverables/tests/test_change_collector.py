@@ -0,0 +1,132 @@
+from django.test import TestCase
+import json
+
+
+class TestChangeCollector(TestCase):
+    def setUp(self) -> None:
+        import gnm_deliverables.signals  # connects the receivers
+        from gnm_deliverables.models import Deliverable, OutboxMessage
+        self.bundle = Deliverable.objects.create(name="collector test", commission_id=1, pluto_core_project_id=1234)
+        OutboxMessage.objects.all().delete()
+
+    @staticmethod
+    def outbox():
+        from gnm_deliverables.models import OutboxMessage
+        return [(message.routing_key, json.loads(bytes(message.payload)))
+                for message in OutboxMessage.objects.order_by("id")]
+
+    def test_coalesce_changes(self):
+        """
+        an object saved several times in a coalesce_changes block should get one message with its final state,
+        and an object created and deleted in it should get none
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.change_collector import coalesce_changes
+
+        with coalesce_changes():
+            asset = DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4", status=0)
+            asset.status = 1
+            asset.save()
+            with coalesce_changes():
+                asset.status = 2
+                asset.save()
+            temporary = DeliverableAsset.objects.create(deliverable=self.bundle, filename="temp.mp4")
+            temporary.delete()
+
+        messages = self.outbox()
+        self.assertEqual([routing_key for routing_key, _ in messages], ["deliverables.deliverableasset.create"])
+        self.assertEqual(messages[0][1]["id"], asset.pk)
+        self.assertEqual(messages[0][1]["status"], 2)
+
+    def test_outside_block(self):
+        """
+        outside a coalesce_changes block, every change should be written to the outbox straight away
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        asset = DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4", status=0)
+        self.assertEqual(len(self.outbox()), 1)
+        asset.status = 3
+        asset.save()
+
+        messages = self.outbox()
+        self.assertEqual([routing_key for routing_key, _ in messages],
+                         ["deliverables.deliverableasset.create", "deliverables.deliverableasset.update"])
+        self.assertEqual(messages[1][1]["status"], 3)
+
+    def test_update_then_delete(self):
+        """
+        an update followed by a delete should be sent as just the delete
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset, OutboxMessage
+        from gnm_deliverables.change_collector import coalesce_changes
+        asset = DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4")
+        asset_id = asset.pk
+        OutboxMessage.objects.all().delete()
+
+        with coalesce_changes():
+            asset.status = 3
+            asset.save()
+            asset.delete()
+
+        messages = self.outbox()
+        self.assertEqual([routing_key for routing_key, _ in messages], ["deliverables.deliverableasset.delete"])
+        self.assertEqual(messages[0][1]["id"], asset_id)
+
+    def test_rolled_back_savepoint(self):
+        """
+        a change made inside a nested atomic block that is rolled back should not be announced, whether or not it is
+        in a coalesce_changes block
+        :return:
+        """
+        from django.db import transaction
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.change_collector import coalesce_changes
+
+        class Abandoned(Exception):
+            pass
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    DeliverableAsset.objects.create(deliverable=self.bundle, filename="abandoned.mp4")
+                    raise Abandoned()
+            except Abandoned:
+                pass
+        self.assertEqual(self.outbox(), [])
+
+        with coalesce_changes():
+            asset = DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4", status=0)
+            try:
+                with transaction.atomic():
+                    asset.status = 5
+                    asset.save()
+                    raise Abandoned()
+            except Abandoned:
+                pass
+
+        messages = self.outbox()
+        self.assertEqual([routing_key for routing_key, _ in messages], ["deliverables.deliverableasset.create"])
+        self.assertEqual(messages[0][1]["status"], 0)
+
+    def test_no_message_for_final_state(self):
+        """
+        if no message can be built for the final state of an object, the message for its earlier state should not be
+        sent either
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.change_collector import coalesce_changes, record
+
+        asset = DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4", status=0)
+        self.assertEqual(len(self.outbox()), 1)
+        messages = [("deliverables.deliverableasset.update", b'{"status": 1}'), None]
+
+        with coalesce_changes():
+            record(asset, "update", lambda instance, action: messages.pop(0))
+            self.assertEqual(len(self.outbox()), 2)
+            record(asset, "update", lambda instance, action: messages.pop(0))
+
+        self.assertEqual([routing_key for routing_key, _ in self.outbox()], ["deliverables.deliverableasset.create"])
@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.core.management import call_command
+import mock
+import pika.exceptions
+
+
+class TestCommandRelayOutbox(TestCase):
+    def setUp(self) -> None:
+        from gnm_deliverables.models import OutboxMessage
+        self.messages = [OutboxMessage.objects.create(routing_key="deliverables.test.{0}".format(n),
+                                                      payload="message {0}".format(n).encode("UTF-8"))
+                         for n in range(5)]
+
+    def test_relay_outbox(self):
+        """
+        relay_outbox should send every message in order, in batches, and remove them from the outbox
+        :return:
+        """
+        from gnm_deliverables.models import OutboxMessage
+        with mock.patch("gnm_deliverables.signals.MessageRelay.publish") as mock_publish:
+            call_command("relay_outbox", "--once", "--batch-size", "2")
+
+        self.assertEqual(mock_publish.call_args_list,
+                         [mock.call("deliverables.test.{0}".format(n), "message {0}".format(n).encode("UTF-8"))
+                          for n in range(5)])
+        self.assertEqual(OutboxMessage.objects.count(), 0)
+
+    def test_relay_outbox_broker_unavailable(self):
+        """
+        messages that the broker didn't take should stay in the outbox, and the ones before them should be removed
+        :return:
+        """
+        from gnm_deliverables.models import OutboxMessage
+        with mock.patch("gnm_deliverables.signals.MessageRelay.publish",
+                        side_effect=[None, None, pika.exceptions.AMQPConnectionError()]):
+            with self.assertRaises(pika.exceptions.AMQPConnectionError):
+                call_command("relay_outbox", "--once")
+
+        self.assertEqual(list(OutboxMessage.objects.order_by("id").values_list("id", flat=True)),
+                         [message.id for message in self.messages[2:]])
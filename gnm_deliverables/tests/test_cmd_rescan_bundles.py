@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from io import StringIO
+import os
+import tempfile
+
+
+class TestCommandRescanBundles(TestCase):
+    def test_rescan_bundles(self):
+        """
+        rescan_bundles should sync the assets of every bundle whose drop-folder exists, and leave the others alone
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+
+        with tempfile.TemporaryDirectory() as san_root:
+            for bundle_name, filenames in [("bundle one", ["file1.mp4", "file2.mp4"]), ("bundle two", ["file3.mxf"])]:
+                os.makedirs(os.path.join(san_root, bundle_name))
+                for f in filenames:
+                    with open(os.path.join(san_root, bundle_name, f), "wb") as fp:
+                        fp.write(b"x")
+
+            one = Deliverable.objects.create(name="bundle one", commission_id=1, pluto_core_project_id=101)
+            two = Deliverable.objects.create(name="bundle two", commission_id=1, pluto_core_project_id=102)
+            missing = Deliverable.objects.create(name="bundle missing", commission_id=1, pluto_core_project_id=103)
+            DeliverableAsset.objects.create(deliverable=missing, filename="keepme.mp4", size=1)
+
+            out = StringIO()
+            with override_settings(GNM_DELIVERABLES_SAN_ROOT=san_root):
+                call_command("rescan_bundles", "--concurrency", "2", stdout=out)
+
+            self.assertEqual(sorted([a.filename for a in DeliverableAsset.objects.filter(deliverable=one)]),
+                             ["file1.mp4", "file2.mp4"])
+            self.assertEqual([a.filename for a in DeliverableAsset.objects.filter(deliverable=two)], ["file3.mxf"])
+            self.assertEqual([a.filename for a in DeliverableAsset.objects.filter(deliverable=missing)], ["keepme.mp4"])
+            self.assertIn("Skipping bundle missing", out.getvalue())
+            self.assertIn("Rescanned 2 bundles", out.getvalue())
+
+    def test_rescan_bundles_filtered(self):
+        """
+        rescan_bundles should only sync the bundles matching the given filters
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+
+        with tempfile.TemporaryDirectory() as san_root:
+            for bundle_name in ["bundle one", "bundle two"]:
+                os.makedirs(os.path.join(san_root, bundle_name))
+                with open(os.path.join(san_root, bundle_name, "file.mp4"), "wb") as fp:
+                    fp.write(b"x")
+
+            Deliverable.objects.create(name="bundle one", commission_id=1, pluto_core_project_id=101)
+            two = Deliverable.objects.create(name="bundle two", commission_id=1, pluto_core_project_id=102)
+
+            with override_settings(GNM_DELIVERABLES_SAN_ROOT=san_root):
+                call_command("rescan_bundles", "--project", "102", stdout=StringIO())
+
+            self.assertEqual(list(DeliverableAsset.objects.values_list("deliverable_id", flat=True)), [two.id])
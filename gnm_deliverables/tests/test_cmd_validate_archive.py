@@ -20,7 +20,7 @@ class TestCommandValidateArchive(TestCase):
         mocked_response.json = MagicMock(return_value={"some":"key","someother":"value"})
         mocked_time = datetime(2020,1,2,3,4,5,6)
 
-        with patch("requests.get", return_value=mocked_response) as mocked_get:
+        with patch("gnm_deliverables.http_client.get", return_value=mocked_response) as mocked_get:
             from gnm_deliverables.management.commands.validate_archive import authenticated_request
 
             result = authenticated_request("https://some-server/some/path","rubbish-secret",True, override_time=mocked_time)
@@ -42,7 +42,7 @@ class TestCommandValidateArchive(TestCase):
         mocked_response.json = MagicMock(return_value={"some":"key","someother":"value"})
         mocked_time = datetime(2020,1,2,3,4,5,6)
 
-        with patch("requests.get", return_value=mocked_response) as mocked_get:
+        with patch("gnm_deliverables.http_client.get", return_value=mocked_response) as mocked_get:
             from gnm_deliverables.management.commands.validate_archive import authenticated_request, NotFoundResponse
 
             with self.assertRaises(NotFoundResponse):
@@ -64,7 +64,7 @@ class TestCommandValidateArchive(TestCase):
         mocked_response.json = MagicMock(return_value={"some":"key","someother":"value"})
         mocked_time = datetime(2020,1,2,3,4,5,6)
 
-        with patch("requests.get", return_value=mocked_response) as mocked_get:
+        with patch("gnm_deliverables.http_client.get", return_value=mocked_response) as mocked_get:
             from gnm_deliverables.management.commands.validate_archive import authenticated_request, ServerErrorResponse
 
             with self.assertRaises(ServerErrorResponse):
@@ -86,7 +86,7 @@ class TestCommandValidateArchive(TestCase):
         mocked_response.json = MagicMock(return_value={"some":"key","someother":"value"})
         mocked_time = datetime(2020,1,2,3,4,5,6)
 
-        with patch("requests.get", return_value=mocked_response) as mocked_get:
+        with patch("gnm_deliverables.http_client.get", return_value=mocked_response) as mocked_get:
             from gnm_deliverables.management.commands.validate_archive import authenticated_request, ForbiddenResponse
 
             with self.assertRaises(ForbiddenResponse):
@@ -0,0 +1,166 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory, force_authenticate
+from datetime import date, datetime
+import pytz
+from gnm_deliverables.choices import DELIVERABLE_ASSET_STATUS_NOT_INGESTED, DELIVERABLE_ASSET_STATUS_INGESTED, \
+    DELIVERABLE_ASSET_STATUS_INGEST_FAILED
+
+
+class TestDashboardRollup(TestCase):
+    def setUp(self) -> None:
+        from gnm_deliverables.models import Deliverable
+        self.bundle = Deliverable.objects.create(name="rollup test", commission_id=1, pluto_core_project_id=1234)
+
+    def make_asset(self, day, status, asset_type=1):
+        from gnm_deliverables.models import DeliverableAsset
+        return DeliverableAsset.objects.create(deliverable=self.bundle, filename="file.mp4", status=status,
+                                               type=asset_type,
+                                               access_dt=datetime(2021, 3, day, 12, 0, 0, tzinfo=pytz.UTC))
+
+    @staticmethod
+    def rollup_totals():
+        from gnm_deliverables.models import DashboardRollup
+        totals = {}
+        for row in DashboardRollup.objects.all():
+            key = (row.platform, row.day, row.type, row.status)
+            totals[key] = totals.get(key, 0) + row.count
+        return {key: count for key, count in totals.items() if count != 0}
+
+    def test_rebuild(self):
+        """
+        rebuild should aggregate the assets and publications into the rollup
+        :return:
+        """
+        from gnm_deliverables.models import Youtube
+        from gnm_deliverables import dashboard_rollup
+        self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.make_asset(2, DELIVERABLE_ASSET_STATUS_INGESTED, asset_type=None)
+        Youtube.objects.create(youtube_id="abc", youtube_title="test", youtube_category="1", youtube_channel="1",
+                               publication_date=datetime(2021, 3, 4, 23, 0, 0, tzinfo=pytz.UTC))
+        Youtube.objects.create(youtube_id="def", youtube_title="test", youtube_category="1", youtube_channel="1")
+
+        self.assertEqual(dashboard_rollup.rebuild(), 3)
+        self.assertEqual(self.rollup_totals(), {
+            ("", date(2021, 3, 1), 1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED): 2,
+            ("", date(2021, 3, 2), None, DELIVERABLE_ASSET_STATUS_INGESTED): 1,
+            ("youtube", date(2021, 3, 4), None, None): 1,
+        })
+
+    def test_maintained_from_signals(self):
+        """
+        the rollup should be kept the same as a rebuild as records are created, changed and deleted
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset, GNMWebsite
+        from gnm_deliverables import dashboard_rollup
+        import gnm_deliverables.signals  # connects the receivers
+
+        dashboard_rollup.rebuild()
+        first = self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        second = self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.make_asset(3, DELIVERABLE_ASSET_STATUS_INGEST_FAILED)
+        website = GNMWebsite.objects.create(publication_date=datetime(2021, 3, 5, 10, 0, 0, tzinfo=pytz.UTC))
+
+        loaded = DeliverableAsset.objects.get(pk=first.pk)
+        loaded.status = DELIVERABLE_ASSET_STATUS_INGESTED
+        loaded.save()
+        loaded.filename = "renamed.mp4"
+        loaded.save()
+        second.access_dt = datetime(2021, 3, 2, 12, 0, 0, tzinfo=pytz.UTC)
+        second.save()
+        DeliverableAsset.objects.filter(status=DELIVERABLE_ASSET_STATUS_INGEST_FAILED).delete()
+        website.publication_date = datetime(2021, 3, 6, 10, 0, 0, tzinfo=pytz.UTC)
+        website.save()
+        GNMWebsite.objects.create()
+
+        incremental = self.rollup_totals()
+        dashboard_rollup.rebuild()
+        self.assertEqual(incremental, self.rollup_totals())
+        self.assertEqual(incremental, {
+            ("", date(2021, 3, 1), 1, DELIVERABLE_ASSET_STATUS_INGESTED): 1,
+            ("", date(2021, 3, 2), 1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED): 1,
+            ("gnm_website", date(2021, 3, 6), None, None): 1,
+        })
+
+    def test_unknown_previous_values(self):
+        """
+        saving an existing record whose previous values are not known should leave the rollup alone rather than
+        counting it again
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables import dashboard_rollup
+        import gnm_deliverables.signals  # connects the receivers
+
+        asset = self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        dashboard_rollup.rebuild()
+        before = self.rollup_totals()
+
+        unloaded = DeliverableAsset(pk=asset.pk, deliverable=self.bundle, filename="file.mp4", type=1,
+                                    status=DELIVERABLE_ASSET_STATUS_NOT_INGESTED, access_dt=asset.access_dt)
+        partial = DeliverableAsset.objects.only("id", "status").get(pk=asset.pk)
+        with self.assertLogs("gnm_deliverables.dashboard_rollup", level="WARNING"):
+            unloaded.save()
+            partial.save()
+        self.assertEqual(self.rollup_totals(), before)
+
+    def test_rebuild_from_migration(self):
+        """
+        rebuild should work with the historical models that a data migration gives it
+        :return:
+        """
+        from django.apps import apps
+        from gnm_deliverables import dashboard_rollup
+        self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.assertEqual(dashboard_rollup.rebuild(apps), 1)
+        self.assertEqual(self.rollup_totals(), {("", date(2021, 3, 1), 1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED): 1})
+
+    def test_count_invalid_by_status(self):
+        """
+        CountInvalidByStatus should read the counts for each status from the rollup
+        :return:
+        """
+        from gnm_deliverables.views.views import CountInvalidByStatus
+        from gnm_deliverables import dashboard_rollup
+        self.make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.make_asset(2, DELIVERABLE_ASSET_STATUS_NOT_INGESTED)
+        self.make_asset(2, DELIVERABLE_ASSET_STATUS_INGEST_FAILED)
+        dashboard_rollup.rebuild()
+
+        user = User.objects.create_user('user01', 'user01@example.com', 'user01P4ssw0rD')
+        request = APIRequestFactory().get("/api/invalid/countbystatus")
+        force_authenticate(request, user=user)
+        with self.assertNumQueries(1):
+            response = CountInvalidByStatus.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{"status": DELIVERABLE_ASSET_STATUS_NOT_INGESTED, "id__count": 2},
+                                         {"status": DELIVERABLE_ASSET_STATUS_INGEST_FAILED, "id__count": 1}])
+
+    def test_publication_dates_summary(self):
+        """
+        PublicationDatesSummary should read the publication counts for every platform from the rollup in one query
+        :return:
+        """
+        from gnm_deliverables.models import GNMWebsite, DailyMotion
+        from gnm_deliverables.views.deliverables_dash_views import PublicationDatesSummary
+        from gnm_deliverables import dashboard_rollup
+        GNMWebsite.objects.create(publication_date=datetime(2021, 3, 2, 10, 0, 0, tzinfo=pytz.UTC))
+        GNMWebsite.objects.create(publication_date=datetime(2021, 3, 2, 18, 0, 0, tzinfo=pytz.UTC))
+        DailyMotion.objects.create(daily_motion_title="test", daily_motion_no_mobile_access=False,
+                                   daily_motion_contains_adult_content=False,
+                                   publication_date=datetime(2021, 3, 3, 10, 0, 0, tzinfo=pytz.UTC))
+        dashboard_rollup.rebuild()
+
+        user = User.objects.create_user('user01', 'user01@example.com', 'user01P4ssw0rD')
+        request = APIRequestFactory().get("/api/pubdates?startDate=2021-03-01T00:00:00Z&endDate=2021-03-03T00:00:00Z")
+        force_authenticate(request, user=user)
+        with self.assertNumQueries(1):
+            response = PublicationDatesSummary.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data["dates"]), ["2021-03-01T00:00:00+00:00", "2021-03-02T00:00:00+00:00",
+                                                        "2021-03-03T00:00:00+00:00"])
+        platforms = {entry["name"]: list(entry["data"]) for entry in response.data["platforms"]}
+        self.assertEqual(platforms, {"gnm_website": [0, 2, 0], "youtube": [0, 0, 0], "dailymotion": [0, 0, 1],
+                                     "mainstream": [0, 0, 0]})
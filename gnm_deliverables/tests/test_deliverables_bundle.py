@@ -1,11 +1,13 @@
 import json
+import os
+import tempfile
 from collections import namedtuple
 from datetime import datetime
 
 import mock
 import pytz
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
@@ -74,6 +76,127 @@ class TestDeliverablesBundle(TestCase):
             self.assertEqual(check_item.modified_dt, files_date)
             self.assertEqual(check_item.changed_dt, files_date)
 
+    def test_sync_assets_rewritten_in_place(self):
+        """
+        sync_assets_from_filesystem should update the existing record when a file is rewritten in place rather than
+        creating a duplicate, and should remove unimported duplicates left behind by earlier scans
+        :return:
+        """
+        FileInfo = namedtuple('FileInfo',
+                              'absolute_path path size access_dt modified_dt changed_dt')
+        old_date = datetime(2020, 4, 5, 6, 7, 8, tzinfo=pytz.UTC)
+        new_date = datetime(2020, 4, 6, 6, 7, 8, tzinfo=pytz.UTC)
+
+        def mock_find_files(for_name):
+            yield FileInfo(absolute_path="/path/to/media/file1.mp4", path="file1.mp4", size=2048,
+                           access_dt=new_date, modified_dt=new_date, changed_dt=new_date)
+            yield FileInfo(absolute_path="/path/to/media/file2.jpg", path="file2.jpg", size=100,
+                           access_dt=old_date, modified_dt=old_date, changed_dt=old_date)
+
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+        d = Deliverable(project_id=4569, name="rewrite test", commission_id=7654, pluto_core_project_id=9897)
+        d.save()
+        DeliverableAsset(deliverable=d, filename="file1.mp4", absolute_path="/path/to/media/file1.mp4",
+                         size=1024, access_dt=old_date, modified_dt=old_date, changed_dt=old_date).save()
+        newest = DeliverableAsset(deliverable=d, filename="file1.mp4", absolute_path="/path/to/media/file1.mp4",
+                                  size=1024, access_dt=old_date, modified_dt=old_date, changed_dt=old_date)
+        newest.save()
+        DeliverableAsset(deliverable=d, filename="gone.mxf", absolute_path="/path/to/media/gone.mxf",
+                         size=1, access_dt=old_date, modified_dt=old_date, changed_dt=old_date).save()
+
+        with mock.patch("gnm_deliverables.models.find_files_for_deliverable", side_effect=mock_find_files):
+            result = d.sync_assets_from_file_system()
+
+        self.assertEqual(result, {"added": 1, "removed": 2})
+        self.assertEqual(sorted([a.filename for a in DeliverableAsset.objects.filter(deliverable=d)]),
+                         ["file1.mp4", "file2.jpg"])
+        updated = DeliverableAsset.objects.get(deliverable=d, filename="file1.mp4")
+        self.assertEqual(updated.id, newest.id)
+        self.assertEqual(updated.size, 2048)
+        self.assertEqual(updated.modified_dt, new_date)
+
+    def test_sync_assets_keeps_imported_duplicate(self):
+        """
+        when there are duplicate records for a file, sync_assets_from_filesystem should keep and update the one that
+        has been imported even if it is not the newest, and remove the unimported ones
+        :return:
+        """
+        FileInfo = namedtuple('FileInfo',
+                              'absolute_path path size access_dt modified_dt changed_dt')
+        old_date = datetime(2020, 4, 5, 6, 7, 8, tzinfo=pytz.UTC)
+        new_date = datetime(2020, 4, 6, 6, 7, 8, tzinfo=pytz.UTC)
+
+        def mock_find_files(for_name):
+            yield FileInfo(absolute_path="/path/to/media/file1.mp4", path="file1.mp4", size=2048,
+                           access_dt=new_date, modified_dt=new_date, changed_dt=new_date)
+
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+        d = Deliverable(project_id=4570, name="imported duplicate test", commission_id=7654,
+                        pluto_core_project_id=9896)
+        d.save()
+
+        def make_asset(**kwargs):
+            asset = DeliverableAsset(deliverable=d, filename="file1.mp4", absolute_path="/path/to/media/file1.mp4",
+                                     size=1024, access_dt=old_date, modified_dt=old_date, changed_dt=old_date,
+                                     **kwargs)
+            asset.save()
+            return asset
+
+        make_asset()
+        importing = make_asset(job_id="VX-1234")
+        make_asset()
+
+        with mock.patch("gnm_deliverables.models.find_files_for_deliverable", side_effect=mock_find_files):
+            result = d.sync_assets_from_file_system()
+
+        self.assertEqual(result, {"added": 0, "removed": 2})
+        remaining = list(DeliverableAsset.objects.filter(deliverable=d))
+        self.assertEqual([a.id for a in remaining], [importing.id])
+        self.assertEqual(remaining[0].size, 2048)
+        self.assertEqual(remaining[0].job_id, "VX-1234")
+
+    def test_sync_assets_incrementally(self):
+        """
+        sync_assets_incrementally should only write records for files that were added, changed or removed since the
+        previous scan and report the unchanged ones as skipped
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+
+        with tempfile.TemporaryDirectory() as san_root:
+            bundle_path = os.path.join(san_root, "incremental test")
+            os.makedirs(os.path.join(bundle_path, "subdir"))
+            for f in ["file1.mp4", "file2.jpg", os.path.join("subdir", "file3.mxf"), ".hidden"]:
+                with open(os.path.join(bundle_path, f), "wb") as fp:
+                    fp.write(b"x" * 10)
+
+            with override_settings(GNM_DELIVERABLES_SAN_ROOT=san_root):
+                d = Deliverable(project_id=4568, name="incremental test", commission_id=7654,
+                                pluto_core_project_id=9899)
+                d.save()
+
+                result = d.sync_assets_incrementally()
+                self.assertEqual(result, {"added": 3, "updated": 0, "removed": 0, "skipped": 0})
+                self.assertEqual(3, DeliverableAsset.objects.filter(deliverable=d).count())
+                check_item = DeliverableAsset.objects.get(deliverable=d, filename=os.path.join("subdir", "file3.mxf"))
+                self.assertEqual(check_item.absolute_path, os.path.join(bundle_path, "subdir", "file3.mxf"))
+                self.assertEqual(check_item.size, 10)
+
+                result = d.sync_assets_incrementally()
+                self.assertEqual(result, {"added": 0, "updated": 0, "removed": 0, "skipped": 3})
+
+                with open(os.path.join(bundle_path, "file1.mp4"), "ab") as fp:
+                    fp.write(b"more content")
+                os.remove(os.path.join(bundle_path, "file2.jpg"))
+                with open(os.path.join(bundle_path, "file4.aiff"), "wb") as fp:
+                    fp.write(b"y")
+
+                result = d.sync_assets_incrementally()
+                self.assertEqual(result, {"added": 1, "updated": 1, "removed": 1, "skipped": 1})
+                self.assertEqual(sorted([a.filename for a in DeliverableAsset.objects.filter(deliverable=d)]),
+                                 ["file1.mp4", "file4.aiff", os.path.join("subdir", "file3.mxf")])
+                self.assertEqual(DeliverableAsset.objects.get(deliverable=d, filename="file1.mp4").size, 22)
+
     def test_count_assets(self):
         deliverable = mock.Mock(Deliverable, project_id=2, name='test', pk=1)
 
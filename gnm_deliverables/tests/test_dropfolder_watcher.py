@@ -0,0 +1,188 @@
+from django.test import TestCase
+import os
+import tempfile
+import unittest
+
+
+class TestPollingWatcher(TestCase):
+    def test_poll(self):
+        """
+        PollingWatcher.poll should report files that were added, modified or removed since the previous poll
+        :return:
+        """
+        from gnm_deliverables.dropfolder_watcher import PollingWatcher
+
+        with tempfile.TemporaryDirectory() as root_path:
+            for f in ["existing.mp4", "changing.mp4", "removed.mp4"]:
+                with open(os.path.join(root_path, f), "wb") as fp:
+                    fp.write(b"x")
+
+            watcher = PollingWatcher()
+            watcher.add_bundle("test bundle", root_path)
+            self.assertEqual(watcher.poll(0), set())
+
+            with open(os.path.join(root_path, "changing.mp4"), "ab") as fp:
+                fp.write(b"more")
+            os.remove(os.path.join(root_path, "removed.mp4"))
+            with open(os.path.join(root_path, "new.mp4"), "wb") as fp:
+                fp.write(b"x")
+
+            self.assertEqual(watcher.poll(0), {("test bundle", "changing.mp4"), ("test bundle", "removed.mp4"),
+                                               ("test bundle", "new.mp4")})
+            self.assertEqual(watcher.poll(0), set())
+
+
+class TestInotifyWatcher(TestCase):
+    def test_poll(self):
+        """
+        InotifyWatcher.poll should report files written to the drop-folder, including ones in new subdirectories
+        :return:
+        """
+        from gnm_deliverables import dropfolder_watcher
+        if dropfolder_watcher.inotify_simple is None:
+            raise unittest.SkipTest("inotify_simple is not installed")
+
+        with tempfile.TemporaryDirectory() as root_path:
+            watcher = dropfolder_watcher.InotifyWatcher()
+            try:
+                watcher.add_bundle("test bundle", root_path)
+                with open(os.path.join(root_path, "new.mp4"), "wb") as fp:
+                    fp.write(b"x")
+                os.makedirs(os.path.join(root_path, "subdir"))
+                with open(os.path.join(root_path, "subdir", "nested.mp4"), "wb") as fp:
+                    fp.write(b"x")
+
+                changes = watcher.poll(0.5)
+                self.assertIn(("test bundle", "new.mp4"), changes)
+                self.assertIn(("test bundle", os.path.join("subdir", "nested.mp4")), changes)
+            finally:
+                watcher.close()
+
+
+    def test_directory_moved_out(self):
+        """
+        a directory moved out of the drop-folder should be reported in removed_directories, and its watches dropped
+        :return:
+        """
+        from gnm_deliverables import dropfolder_watcher
+        if dropfolder_watcher.inotify_simple is None:
+            raise unittest.SkipTest("inotify_simple is not installed")
+
+        with tempfile.TemporaryDirectory() as root_path, tempfile.TemporaryDirectory() as elsewhere:
+            os.makedirs(os.path.join(root_path, "subdir", "nested"))
+            watcher = dropfolder_watcher.InotifyWatcher()
+            try:
+                watcher.add_bundle("test bundle", root_path)
+                self.assertEqual(len(watcher.watches), 3)
+                os.rename(os.path.join(root_path, "subdir"), os.path.join(elsewhere, "subdir"))
+                watcher.poll(0.5)
+                self.assertEqual(watcher.removed_directories, {("test bundle", "subdir")})
+                self.assertEqual(list(watcher.watches.values()), [("test bundle", "")])
+
+                with open(os.path.join(elsewhere, "subdir", "nested", "file.mp4"), "wb") as fp:
+                    fp.write(b"x")
+                self.assertEqual(watcher.poll(0.2), set())
+            finally:
+                watcher.close()
+
+    def test_queue_overflow(self):
+        """
+        if the event queue overflows, every bundle should be marked for a rescan
+        :return:
+        """
+        from gnm_deliverables import dropfolder_watcher
+        if dropfolder_watcher.inotify_simple is None:
+            raise unittest.SkipTest("inotify_simple is not installed")
+        from mock import patch
+        inotify_simple = dropfolder_watcher.inotify_simple
+
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            watcher = dropfolder_watcher.InotifyWatcher()
+            try:
+                watcher.add_bundle("first", first)
+                watcher.add_bundle("second", second)
+                overflow = inotify_simple.Event(wd=-1, mask=inotify_simple.flags.Q_OVERFLOW, cookie=0, name="")
+                with patch.object(watcher.inotify, "read", return_value=[overflow]):
+                    self.assertEqual(watcher.poll(0), set())
+                self.assertEqual(watcher.rescans, {"first", "second"})
+            finally:
+                watcher.close()
+
+
+class TestWatchDropfoldersCommand(TestCase):
+    def test_take_watcher_updates(self):
+        """
+        the files under a directory that was moved out should be removed, and rescans should be put off until the
+        last request for one has settled
+        :return:
+        """
+        from mock import MagicMock
+        from gnm_deliverables.dropfolder_watcher import PollingWatcher
+        from gnm_deliverables.management.commands.watch_dropfolders import Command
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+
+        bundle = Deliverable.objects.create(name="watched bundle", commission_id=1, pluto_core_project_id=1234)
+        for filename in [os.path.join("subdir", "a.mp4"), os.path.join("subdir", "nested", "b.mp4"),
+                         "subdir.mp4", "other.mp4"]:
+            DeliverableAsset.objects.create(deliverable=bundle, filename=filename)
+        command = Command()
+        command.deliverables = {bundle.name: bundle}
+
+        watcher = PollingWatcher()
+        watcher.removed_directories.add((bundle.name, "subdir"))
+        watcher.rescans.add(bundle.name)
+        removed = command.take_watcher_updates(watcher, 105)
+        self.assertEqual(removed, [(bundle.name, os.path.join("subdir", "a.mp4")),
+                                   (bundle.name, os.path.join("subdir", "nested", "b.mp4"))])
+        self.assertEqual(watcher.removed_directories, set())
+        self.assertEqual(watcher.rescans, set())
+
+        watcher.rescans.add(bundle.name)
+        command.take_watcher_updates(watcher, 110)
+        mock_bundle = MagicMock()
+        command.deliverables = {bundle.name: mock_bundle}
+        command.run_due_rescans(106)
+        mock_bundle.sync_assets_incrementally.assert_not_called()
+        command.run_due_rescans(110)
+        mock_bundle.sync_assets_incrementally.assert_called_once_with()
+        command.run_due_rescans(120)
+        self.assertEqual(mock_bundle.sync_assets_incrementally.call_count, 1)
+
+
+class TestDebouncer(TestCase):
+    def test_collect(self):
+        """
+        Debouncer.collect should only return a file once its size has stopped changing for the settle time, and
+        should report files that have gone as removed
+        :return:
+        """
+        from gnm_deliverables.dropfolder_watcher import Debouncer
+
+        with tempfile.TemporaryDirectory() as root_path:
+            roots = {"test bundle": root_path}
+            with open(os.path.join(root_path, "growing.mp4"), "wb") as fp:
+                fp.write(b"x")
+
+            debouncer = Debouncer(settle_time=5)
+            debouncer.touch(("test bundle", "growing.mp4"), 100)
+            debouncer.touch(("test bundle", "gone.mp4"), 100)
+            debouncer.touch(("test bundle", ".hidden"), 100)
+
+            settled, removed = debouncer.collect(roots, 100)
+            self.assertEqual(settled, [])
+            self.assertEqual(removed, [("test bundle", "gone.mp4")])
+
+            with open(os.path.join(root_path, "growing.mp4"), "ab") as fp:
+                fp.write(b"more")
+            settled, removed = debouncer.collect(roots, 104)
+            self.assertEqual(settled, [])
+
+            settled, removed = debouncer.collect(roots, 108)
+            self.assertEqual(settled, [])
+
+            settled, removed = debouncer.collect(roots, 109)
+            self.assertEqual(len(settled), 1)
+            self.assertEqual(settled[0][0], "test bundle")
+            self.assertEqual(settled[0][1].path, "growing.mp4")
+            self.assertEqual(settled[0][1].stat.st_size, 5)
+            self.assertEqual(debouncer.pending, {})
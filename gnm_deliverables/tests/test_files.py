@@ -1,4 +1,6 @@
 import errno
+import os
+import tempfile
 
 from django.test import TestCase
 from mock import MagicMock, patch
@@ -69,3 +71,31 @@ class TestCreateFolder(TestCase):
                     result = gnm_deliverables.files.create_folder("/tmp/some/path", permission=755)
                 mock_makedirs.assert_called_once_with("/tmp/some/path")
                 mock_chmod.assert_not_called()
+
+
+class TestScanDirectory(TestCase):
+    def test_scan_directory(self):
+        """
+        scan_directory should yield an entry for every non-hidden file in the tree, with its path relative to the root
+        :return:
+        """
+        import gnm_deliverables.files
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "a", "b"))
+            for f in ["top.mp4", os.path.join("a", "middle.mxf"), os.path.join("a", "b", "bottom.wav"), ".DS_Store"]:
+                with open(os.path.join(root, f), "wb") as fp:
+                    fp.write(b"1234")
+
+            result = sorted(gnm_deliverables.files.scan_directory(root), key=lambda entry: entry.path)
+            self.assertEqual([entry.path for entry in result],
+                             [os.path.join("a", "b", "bottom.wav"), os.path.join("a", "middle.mxf"), "top.mp4"])
+            self.assertEqual(result[2].absolute_path, os.path.join(root, "top.mp4"))
+            self.assertEqual(result[2].stat.st_size, 4)
+
+    def test_scan_directory_missing(self):
+        """
+        scan_directory should yield nothing if the directory does not exist
+        :return:
+        """
+        import gnm_deliverables.files
+        self.assertEqual(list(gnm_deliverables.files.scan_directory("/path/that/does/not/exist")), [])
@@ -0,0 +1,73 @@
+from django.test import TestCase
+from mock import MagicMock, patch
+import requests
+from gnm_deliverables import http_client
+
+
+class TestHttpClient(TestCase):
+    def tearDown(self):
+        http_client._sessions.clear()
+
+    def test_session_per_host(self):
+        """
+        session_for should give the same session for every url on a host, and a different one for another host
+        """
+        first = http_client.session_for("https://some-server/some/path")
+        self.assertIs(http_client.session_for("https://some-server/other/path?q=1"), first)
+        self.assertIsNot(http_client.session_for("https://other-server/some/path"), first)
+        self.assertIsNot(http_client.session_for("http://some-server/some/path"), first)
+
+    def test_session_after_fork(self):
+        """
+        a forked process should not reuse its parent's sessions
+        """
+        first = http_client.session_for("https://some-server/some/path")
+        with patch("os.getpid", return_value=-1):
+            self.assertIsNot(http_client.session_for("https://some-server/some/path"), first)
+
+    def test_retry_policy(self):
+        adapter = http_client.session_for("https://some-server/").get_adapter("https://some-server/")
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertNotIn("POST", adapter.max_retries.allowed_methods)
+
+    def test_request(self):
+        """
+        request should apply the default timeout, unless one is given, and report the result to the metrics hooks
+        """
+        response = requests.Response()
+        response.status_code = 201
+        hook = MagicMock()
+        http_client.add_metrics_hook(hook)
+        try:
+            with patch("requests.Session.request", return_value=response) as mock_request:
+                self.assertIs(http_client.put("https://some-server/some/path", json={"a": 1}), response)
+                mock_request.assert_called_once_with("PUT", "https://some-server/some/path", json={"a": 1},
+                                                     timeout=(5, 30))
+                http_client.get("https://some-server/some/path", timeout=1)
+                self.assertEqual(mock_request.call_args[1]["timeout"], 1)
+        finally:
+            http_client.remove_metrics_hook(hook)
+
+        self.assertEqual(hook.call_count, 2)
+        method, host, status_code, elapsed, error = hook.call_args_list[0][0]
+        self.assertEqual((method, host, status_code, error), ("PUT", "some-server", 201, None))
+        self.assertGreaterEqual(elapsed, 0)
+
+    def test_request_error(self):
+        """
+        request should report a failed request to the metrics hooks and raise the error
+        """
+        hook = MagicMock()
+        http_client.add_metrics_hook(hook)
+        error = requests.ConnectionError("no route to host")
+        try:
+            with patch("requests.Session.request", side_effect=error):
+                with self.assertRaises(requests.ConnectionError):
+                    http_client.get("https://some-server/some/path")
+        finally:
+            http_client.remove_metrics_hook(hook)
+
+        method, host, status_code, elapsed, reported_error = hook.call_args[0]
+        self.assertEqual((method, host, status_code), ("GET", "some-server", None))
+        self.assertIs(reported_error, error)
@@ -0,0 +1,65 @@
+from django.test import TestCase
+from datetime import date, datetime
+import pytz
+from gnm_deliverables.choices import DELIVERABLE_ASSET_STATUS_NOT_INGESTED, DELIVERABLE_ASSET_STATUS_INGESTED, \
+    DELIVERABLE_ASSET_STATUS_INGEST_FAILED, DELIVERABLE_ASSET_TYPE_VIDEO_FULL_MASTER, \
+    DELIVERABLE_ASSET_TYPE_OTHER_SUBTITLE
+
+
+class TestInvalidCounts(TestCase):
+    def setUp(self) -> None:
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+        bundle = Deliverable.objects.create(name="invalid test", commission_id=1, pluto_core_project_id=1234)
+
+        def make_asset(day, status, asset_type):
+            return DeliverableAsset.objects.create(deliverable=bundle, filename="file.mp4", status=status,
+                                                   type=asset_type,
+                                                   access_dt=datetime(2021, 3, day, 12, 0, 0, tzinfo=pytz.UTC))
+
+        self.assets = [
+            make_asset(1, DELIVERABLE_ASSET_STATUS_NOT_INGESTED, DELIVERABLE_ASSET_TYPE_VIDEO_FULL_MASTER),
+            make_asset(10, DELIVERABLE_ASSET_STATUS_NOT_INGESTED, DELIVERABLE_ASSET_TYPE_VIDEO_FULL_MASTER),
+            make_asset(10, DELIVERABLE_ASSET_STATUS_INGEST_FAILED, DELIVERABLE_ASSET_TYPE_OTHER_SUBTITLE),
+            make_asset(10, DELIVERABLE_ASSET_STATUS_INGESTED, DELIVERABLE_ASSET_TYPE_OTHER_SUBTITLE),
+            make_asset(12, DELIVERABLE_ASSET_STATUS_INGEST_FAILED, None),
+        ]
+        from gnm_deliverables import dashboard_rollup
+        dashboard_rollup.rebuild()
+
+    def test_count_invalid_by_day(self):
+        """
+        count_invalid_by_day should return the invalid assets for each of the last 12 days from a single query
+        :return:
+        """
+        from gnm_deliverables.invalid_counts import count_invalid_by_day
+        with self.assertNumQueries(1):
+            result = count_invalid_by_day(today=date(2021, 3, 13))
+        self.assertEqual(result, [0, 0, 0, 0, 0, 0, 0, 0, 2, 0, 1, 0])
+
+    def test_count_invalid_by_type(self):
+        """
+        count_invalid_by_type should return the invalid assets of each type from a single query
+        :return:
+        """
+        from gnm_deliverables.invalid_counts import count_invalid_by_type
+        with self.assertNumQueries(1):
+            result = count_invalid_by_type()
+        self.assertEqual(len(result), 15)
+        self.assertEqual(result[DELIVERABLE_ASSET_TYPE_VIDEO_FULL_MASTER - 1], 2)
+        self.assertEqual(result[DELIVERABLE_ASSET_TYPE_OTHER_SUBTITLE - 1], 1)
+        self.assertEqual(sum(result), 3)
+
+    def test_status_change(self):
+        """
+        the counts should follow a change to an asset's status straight away
+        :return:
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.invalid_counts import count_invalid_by_type
+        import gnm_deliverables.signals  # connects the receivers
+
+        self.assertEqual(sum(count_invalid_by_type()), 3)
+        asset = DeliverableAsset.objects.get(pk=self.assets[1].pk)
+        asset.status = DELIVERABLE_ASSET_STATUS_INGESTED
+        asset.save()
+        self.assertEqual(sum(count_invalid_by_type()), 2)
@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from datetime import datetime
+from decimal import Decimal
+import json
+import numpy
+import pytz
+import uuid
+
+
+class TestFastJSONRenderer(TestCase):
+    payload = {
+        "dates": numpy.array([datetime(2021, 3, 1, tzinfo=pytz.UTC), datetime(2021, 3, 2, tzinfo=pytz.UTC)]),
+        "platforms": [{"name": "youtube", "data": numpy.array([0, 2], dtype=numpy.int64)}],
+        "total": numpy.int64(2),
+        "ratio": numpy.float64(0.5),
+        "price": Decimal("1.25"),
+        "atom_id": uuid.UUID("5a8bb4b8-0d2c-4b3b-9e0e-21a4c2f1a6de"),
+        "modified": datetime(2021, 3, 4, 5, 6, 7, 123456, tzinfo=pytz.UTC),
+        "title": "line\u2028separator",
+    }
+
+    expected = {
+        "dates": ["2021-03-01T00:00:00Z", "2021-03-02T00:00:00Z"],
+        "platforms": [{"name": "youtube", "data": [0, 2]}],
+        "total": 2,
+        "ratio": 0.5,
+        "price": 1.25,
+        "atom_id": "5a8bb4b8-0d2c-4b3b-9e0e-21a4c2f1a6de",
+        "modified": "2021-03-04T05:06:07.123456Z",
+        "title": "line\u2028separator",
+    }
+
+    def test_render_orjson(self):
+        """
+        the orjson backend should render the same content as the rest_framework renderer, including numpy values
+        :return:
+        """
+        from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer, orjson
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+        result = FastJSONRenderer().render(self.payload)
+        self.assertEqual(json.loads(result), self.expected)
+        self.assertIn(b"\\u2028", result)
+
+        plain = {key: value for key, value in self.expected.items()}
+        self.assertEqual(json.loads(FastJSONRenderer().render(plain)), json.loads(JSONRenderer().render(plain)))
+
+    @override_settings(GNM_DELIVERABLES_JSON_BACKEND="stdlib")
+    def test_render_stdlib(self):
+        """
+        the stdlib backend should render numpy values through NumpyEncoder
+        :return:
+        """
+        from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer
+        result = FastJSONRenderer().render(self.payload)
+        self.assertEqual(json.loads(result), self.expected)
+        self.assertIn(b"\\u2028", result)
+
+    def test_render_none(self):
+        from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -134,6 +134,96 @@ class TestLaunchDetectorUpdate(TestCase):
         self.assertEqual(updated_item.youtube_master.youtube_id, "999xyz")
         self.assertEqual(updated_item.youtube_master.youtube_tags, ["a","b","c"])
 
+    def test_launchdetector_updates_search(self):
+        """
+        an update that changes the titles on existing syndication records should be findable through the asset search
+        :return:
+        """
+        content = {
+            'title': 'first website title',
+            'category': 'News',
+            'atomId': 'ed94ddcb-1a9a-4081-89c2-432c7db123d9',
+            'duration': 75,
+            'source': None,
+            'description': None,
+            'posterImage': None,
+            'trailText': None,
+            'byline': [],
+            'keywords': [],
+            'trailImage': None,
+            'commissionId': '10',
+            'projectId': '60',
+            'masterId': None,
+            'published': None,
+            'lastModified': None,
+            'ytMeta': {
+                'categoryId': '73',
+                'channelId': 'abcdefg',
+                'expiryDate': None,
+                'keywords': [],
+                'privacyStatus': 'Public',
+                'license': None,
+                'title': "first youtube title",
+                'description': None
+            },
+            'assets': [],
+        }
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(username='peter'))
+        url = reverse('atom_update', kwargs={'atom_id': 'ed94ddcb-1a9a-4081-89c2-432c7db123d9'})
+        self.assertEqual(client.post(url, data=content, format='json').status_code, 200)
+
+        content["title"] = "Replacement website title"
+        content["ytMeta"]["title"] = "Replacement youtube title"
+        self.assertEqual(client.post(url, data=content, format='json').status_code, 200)
+
+        for title in ["replacement website", "replacement youtube"]:
+            response = client.post(reverse('asset-search'), {"title": title}, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([entry["id"] for entry in response.data], [674])
+
+    def test_launchdetector_unknown_atom(self):
+        """
+        an update for an atom that has no asset yet should be deferred to the responder through the outbox, rather
+        than waiting for the asset to turn up
+        :return:
+        """
+        from gnm_deliverables.models import OutboxMessage
+        import json
+
+        content = {
+            'title': 'not here yet',
+            'category': 'News',
+            'atomId': '1d2fa1ae-6f63-4e5c-9b67-3d0c5b8e2f11',
+            'duration': 75,
+            'source': None,
+            'description': None,
+            'posterImage': None,
+            'trailText': None,
+            'byline': [],
+            'keywords': [],
+            'trailImage': None,
+            'commissionId': '10',
+            'projectId': '60',
+            'masterId': None,
+            'published': None,
+            'lastModified': None,
+        }
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(username='peter'))
+        response = client.post(
+            reverse('atom_update', kwargs={'atom_id': '1d2fa1ae-6f63-4e5c-9b67-3d0c5b8e2f11'}),
+            data=content,
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        messages = OutboxMessage.objects.filter(routing_key="deliverables.launchdetector.update")
+        self.assertEqual(messages.count(), 1)
+        self.assertEqual(json.loads(bytes(messages[0].payload)), content)
+
 class TestUpdateMainstream(TestCase):
     fixtures = [
         "assets",
@@ -0,0 +1,110 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from django.urls import reverse
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self) -> None:
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+        self.bundle = Deliverable.objects.create(name="paging test", commission_id=1, pluto_core_project_id=1234)
+        # duplicate and null sort values, to check that id breaks the ties
+        filenames = ["b.mp4", "a.mp4", None, "c.mp4", "b.mp4", None, "d.mp4", "b.mp4"]
+        self.assets = [DeliverableAsset.objects.create(deliverable=self.bundle, filename=filename)
+                       for filename in filenames]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('user01', 'user01@example.com', 'user01P4ssw0rD'))
+
+    def walk(self, url, link_name, key="id"):
+        pages = []
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([entry[key] for entry in response.data["results"]])
+            url = response.data[link_name]
+        return pages
+
+    def expected_order(self, descending: bool):
+        with_names = sorted([asset for asset in self.assets if asset.filename is not None],
+                            key=lambda asset: (asset.filename, asset.id), reverse=descending)
+        nulls = sorted([asset for asset in self.assets if asset.filename is None],
+                       key=lambda asset: asset.id, reverse=descending)
+        return [asset.id for asset in with_names + nulls]
+
+    def test_walk_forwards_and_backwards(self):
+        """
+        following the next links should return every asset once in order, nulls last, and following the previous
+        links from the last page should come back the same way
+        :return:
+        """
+        for sort_order in ["asc", "desc"]:
+            expected = self.expected_order(sort_order == "desc")
+            url = reverse("new-asset-list") + "?project_id=1234&sortBy=filename&sortOrder={0}&pageSize=3&cursor=" \
+                .format(sort_order)
+            forward_pages = self.walk(url, "next")
+            self.assertEqual([len(page) for page in forward_pages], [3, 3, 2])
+            self.assertEqual(sum(forward_pages, []), expected)
+
+            last_page = self.client.get(url)
+            while last_page.data["next"] is not None:
+                last_page = self.client.get(last_page.data["next"])
+            backward_pages = self.walk(last_page.data["previous"], "previous")
+            self.assertEqual(backward_pages, [forward_pages[1], forward_pages[0]])
+
+    def test_not_requested(self):
+        """
+        without the cursor parameter the list should be returned as before
+        :return:
+        """
+        response = self.client.get(reverse("new-asset-list") + "?project_id=1234&sortBy=filename&sortOrder=asc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted([entry["id"] for entry in response.data]), [asset.id for asset in self.assets])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("new-asset-list") + "?project_id=1234&cursor=notacursor")
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsortable_field(self):
+        """
+        paging through results sorted on a relation or a float should be refused rather than failing to encode the
+        cursor
+        :return:
+        """
+        for sort_by in ["deliverable", "gnm_website_master"]:
+            response = self.client.get(reverse("new-asset-list") +
+                                       "?project_id=1234&sortBy={0}&pageSize=3&cursor=".format(sort_by))
+            self.assertEqual(response.status_code, 400)
+
+    def test_float_field(self):
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.pagination import KeysetPagination
+        from django.db.models import FloatField, Value
+        from rest_framework.exceptions import ParseError
+        queryset = DeliverableAsset.objects.annotate(score=Value(0.5, output_field=FloatField()))
+        with self.assertRaises(ParseError):
+            KeysetPagination.check_sort_field(queryset, "score")
+        KeysetPagination.check_sort_field(queryset, "filename")
+
+    def test_bundle_list(self):
+        """
+        the bundle list should page through on the requested sort column
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable
+        for n in range(4):
+            Deliverable.objects.create(name="bundle {0}".format(n), commission_id=1, pluto_core_project_id=n)
+        pages = self.walk(reverse("new-api-list") + "?sortBy=name&sortOrder=asc&pageSize=2&cursor=", "next",
+                          key="name")
+        expected = list(Deliverable.objects.order_by("name").values_list("name", flat=True))
+        self.assertEqual(pages, [expected[0:2], expected[2:4], expected[4:5]])
+
+    def test_search_start_at(self):
+        """
+        the search API should treat limit as a page size when slicing from startAt
+        :return:
+        """
+        response = self.client.post(reverse("asset-search") + "?startAt=2&limit=3", {"order_by": "id"},
+                                    format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["id"] for entry in response.data["results"]],
+                         [asset.id for asset in self.assets[2:5]])
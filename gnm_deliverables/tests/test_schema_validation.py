@@ -0,0 +1,54 @@
+from django.test import TestCase
+import jsonschema
+
+
+class TestSchemaValidation(TestCase):
+    schema = {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+        },
+        "required": ["title"],
+    }
+
+    def test_compiled_once(self):
+        """
+        compiled_validator should compile a schema as Draft 7 the first time it sees it and then return the same
+        validator
+        """
+        from gnm_deliverables.schema_validation import compiled_validator
+        first = compiled_validator(self.schema)
+        self.assertIsInstance(first, jsonschema.Draft7Validator)
+        self.assertIs(compiled_validator(self.schema), first)
+        self.assertIsNot(compiled_validator(dict(self.schema)), first)
+
+    def test_validate(self):
+        """
+        validate should pass valid content and raise a ValidationError for invalid content, like jsonschema.validate
+        """
+        from gnm_deliverables.schema_validation import validate
+        validate({"title": "something"}, self.schema)
+        with self.assertRaises(jsonschema.ValidationError):
+            validate({"title": 1234}, self.schema)
+        with self.assertRaises(jsonschema.ValidationError):
+            validate({}, self.schema)
+
+    def test_invalid_schema(self):
+        """
+        an invalid schema should be rejected when it is compiled
+        """
+        from gnm_deliverables.schema_validation import compiled_validator
+        with self.assertRaises(jsonschema.SchemaError):
+            compiled_validator({"type": "not-a-type"})
+
+    def test_processor_compiled_at_definition(self):
+        """
+        a MessageProcessor's schema should be compiled when the class is defined
+        """
+        from gnm_deliverables.schema_validation import _validators
+        from rabbitmq.MessageProcessor import MessageProcessor
+
+        class TestProcessor(MessageProcessor):
+            schema = {"type": "object"}
+
+        self.assertIs(_validators[id(TestProcessor.schema)].schema, TestProcessor.schema)
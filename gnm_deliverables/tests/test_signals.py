@@ -51,18 +51,15 @@ class TestModelSignals(TestCase):
 class TestRelayMessage(TestCase):
     def test_relay_message_asset(self):
         """
-        relay_message should send out a serialized version of a DeliverableAsset to the queue
+        relay_message should write a serialized version of a DeliverableAsset to the outbox
         :return:
         """
-        import pika.channel
         from gnm_deliverables.serializers import DeliverableAssetSerializer
         from rest_framework.renderers import JSONRenderer
         from gnm_deliverables.signals import MessageRelay
+        from gnm_deliverables.models import OutboxMessage
 
-        mock_channel = mock.MagicMock(pika.channel)
-        mock_channel.basic_publish = mock.MagicMock()
-
-        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection", return_value=mock_channel):
+        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection") as mock_setup:
             fake_instance=DeliverableAsset(
                 type=1,
                 filename='/path/to/somefile',
@@ -77,57 +74,111 @@ class TestRelayMessage(TestCase):
             r.relay_message(fake_instance,"create")
 
             expected_output = JSONRenderer().render(DeliverableAssetSerializer(fake_instance).data)
-            mock_channel.basic_publish.assert_called_once_with(
-                exchange='pluto-deliverables',
-                routing_key='deliverables.deliverableasset.create',
-                body=expected_output
-            )
+            mock_setup.assert_not_called()
+            self.assertEqual([(m.routing_key, bytes(m.payload)) for m in OutboxMessage.objects.all()],
+                             [('deliverables.deliverableasset.create', expected_output)])
 
     def test_relay_message_bundle(self):
         """
-        relay_message should send out a serialized version of a Deliverable to the queue
+        relay_message should write a serialized version of a Deliverable to the outbox
         :return:
         """
-        import pika.channel
         from gnm_deliverables.serializers import DeliverableSerializer
         from rest_framework.renderers import JSONRenderer
+        from gnm_deliverables.signals import MessageRelay
+        from gnm_deliverables.models import OutboxMessage
 
-        mock_channel = mock.MagicMock(pika.channel)
-        mock_channel.basic_publish = mock.MagicMock()
+        fake_instance=Deliverable(
+            name="test bundle",
+            project_id="VX-1234"
+        )
 
-        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection", return_value=mock_channel):
-            from gnm_deliverables.signals import MessageRelay
-            fake_instance=Deliverable(
-                name="test bundle",
-                project_id="VX-1234"
-            )
+        r = MessageRelay()
+        r.relay_message(fake_instance,"create")
 
-            r = MessageRelay()
-            r.relay_message(fake_instance,"create")
+        expected_output = JSONRenderer().render(DeliverableSerializer(fake_instance).data)
+        self.assertEqual([(m.routing_key, bytes(m.payload)) for m in OutboxMessage.objects.all()],
+                         [('deliverables.deliverable.create', expected_output)])
+
+    def test_relay_message_random(self):
+        """
+        relay_message should not write any message for an unrecognised model
+        :return:
+        """
+        from gnm_deliverables.signals import MessageRelay
+        from gnm_deliverables.models import OutboxMessage
 
-            expected_output = JSONRenderer().render(DeliverableSerializer(fake_instance).data)
+        fake_instance=User()
 
-            mock_channel.basic_publish.assert_called_once_with(
-                exchange='pluto-deliverables',
-                routing_key='deliverables.deliverable.create',
-                body=expected_output
-            )
+        r = MessageRelay()
+        r.relay_message(fake_instance,"create")
 
-    def test_relay_message_random(self):
+        self.assertEqual(OutboxMessage.objects.count(), 0)
+
+    def test_relay_message_rolled_back(self):
         """
-        relay_message should not send out any message for an unrecognised model
+        messages written in a transaction that rolls back should be discarded with it
         :return:
         """
-        import pika.channel
+        from django.db import transaction
+        from gnm_deliverables.signals import MessageRelay
+        from gnm_deliverables.models import OutboxMessage
 
-        mock_channel = mock.MagicMock(pika.channel)
-        mock_channel.basic_publish = mock.MagicMock()
+        r = MessageRelay()
+        try:
+            with transaction.atomic():
+                r.relay_message(Deliverable(name="test bundle", project_id="VX-1234"), "create")
+                raise ValueError("test rollback")
+        except ValueError:
+            pass
+        self.assertEqual(OutboxMessage.objects.count(), 0)
 
-        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection", return_value=mock_channel):
-            from gnm_deliverables.signals import MessageRelay
-            fake_instance=User()
 
+class TestMessageRelayConnection(TestCase):
+    def test_connection_reused(self):
+        """
+        publish should keep the channel open between messages, and reconnect once if the send fails on it
+        :return:
+        """
+        import pika.channel
+        import pika.exceptions
+        from gnm_deliverables.signals import MessageRelay
+
+        first_channel = mock.MagicMock(pika.channel)
+        first_channel.basic_publish = mock.MagicMock(side_effect=[None, None, pika.exceptions.StreamLostError()])
+        second_channel = mock.MagicMock(pika.channel)
+        second_channel.basic_publish = mock.MagicMock()
+
+        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection",
+                        side_effect=[first_channel, second_channel]) as mock_setup:
             r = MessageRelay()
-            r.relay_message(fake_instance,"create")
+            r.publish("deliverables.test.one", b"one")
+            r.publish("deliverables.test.two", b"two")
+            self.assertEqual(mock_setup.call_count, 1)
 
-            mock_channel.basic_publish.assert_not_called()
+            r.publish("deliverables.test.three", b"three")
+            self.assertEqual(mock_setup.call_count, 2)
+            second_channel.basic_publish.assert_called_once_with(exchange='pluto-deliverables',
+                                                                 routing_key='deliverables.test.three',
+                                                                 body=b"three")
+
+    def test_publish_broker_unavailable(self):
+        """
+        publish should raise if the broker can't be reached, and connect again on the next call
+        :return:
+        """
+        import pika.channel
+        import pika.exceptions
+        from gnm_deliverables.signals import MessageRelay
+
+        channel = mock.MagicMock(pika.channel)
+        channel.basic_publish = mock.MagicMock()
+
+        with mock.patch("gnm_deliverables.signals.MessageRelay.setup_connection",
+                        side_effect=[pika.exceptions.AMQPConnectionError(), channel]):
+            r = MessageRelay()
+            with self.assertRaises(pika.exceptions.AMQPConnectionError):
+                r.publish("deliverables.test.one", b"one")
+            r.publish("deliverables.test.two", b"two")
+        channel.basic_publish.assert_called_once_with(exchange='pluto-deliverables',
+                                                      routing_key='deliverables.test.two', body=b"two")
@@ -0,0 +1,139 @@
+from django.test import TestCase
+from mock import MagicMock, patch
+import xml.etree.ElementTree as ET
+from gnm_deliverables import vidispine_cache
+from gnm_deliverables.vidispine_cache import ItemMetadataCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestItemMetadataCache(TestCase):
+    def test_lru(self):
+        """
+        the cache should drop the least recently used entry once it is full
+        """
+        cache = ItemMetadataCache(max_entries=2, ttl=60)
+        cache.put("VX-1", "a", 1)
+        cache.put("VX-2", "a", 2)
+        self.assertEqual(cache.get("VX-1", "a"), 1)
+        cache.put("VX-3", "a", 3)
+        self.assertIsNone(cache.get("VX-2", "a"))
+        self.assertEqual(cache.get("VX-1", "a"), 1)
+        self.assertEqual(cache.get("VX-3", "a"), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl(self):
+        """
+        entries should expire after the ttl
+        """
+        clock = FakeClock()
+        cache = ItemMetadataCache(max_entries=10, ttl=60, clock=clock)
+        cache.put("VX-1", "a", 1)
+        clock.now += 59
+        self.assertEqual(cache.get("VX-1", "a"), 1)
+        clock.now += 1
+        self.assertIsNone(cache.get("VX-1", "a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        """
+        invalidate should drop every entry for the item, and nothing else
+        """
+        cache = ItemMetadataCache(max_entries=10, ttl=60)
+        cache.put("VX-1", "a", 1)
+        cache.put("VX-1", "b", 2)
+        cache.put("VX-2", "a", 3)
+        cache.invalidate("VX-1")
+        self.assertIsNone(cache.get("VX-1", "a"))
+        self.assertIsNone(cache.get("VX-1", "b"))
+        self.assertEqual(cache.get("VX-2", "a"), 3)
+
+    def test_disabled(self):
+        cache = ItemMetadataCache(max_entries=0, ttl=60)
+        cache.put("VX-1", "a", 1)
+        self.assertIsNone(cache.get("VX-1", "a"))
+
+
+class TestItemMetadata(TestCase):
+    item_list = """<ItemListDocument xmlns="http://xml.vidispine.com/schema/vidispine">
+        <hits>2</hits>
+        <item id="VX-1"><metadata><timespan start="-INF" end="+INF">
+            <field><name>durationSeconds</name><value>12.5</value></field>
+            <field><name>__version</name><value>3</value></field>
+        </timespan></metadata></item>
+        <item id="VX-2"><metadata><timespan start="-INF" end="+INF">
+            <field><name>__version</name><value>1</value><value>2</value></field>
+        </timespan></metadata></item>
+    </ItemListDocument>"""
+
+    def setUp(self):
+        vidispine_cache.cache.clear()
+
+    def tearDown(self):
+        vidispine_cache.cache.clear()
+
+    def test_item_metadata_cached(self):
+        """
+        item_metadata should only go to Vidispine once for the same item and fields, until the item is invalidated
+        """
+        mock_item = MagicMock()
+        mock_item.get = MagicMock(side_effect=lambda name, allowArray=False: {"durationSeconds": "12.5", "__version": "3"}[name])
+        with patch("gnm_deliverables.vidispine_cache.VSItem", return_value=mock_item) as mock_item_class:
+            first = vidispine_cache.item_metadata("VX-1", ["durationSeconds", "__version"])
+            second = vidispine_cache.item_metadata("VX-1", ["__version", "durationSeconds"])
+            self.assertEqual(first, {"durationSeconds": "12.5", "__version": "3"})
+            self.assertEqual(second, first)
+            self.assertEqual(mock_item_class.call_count, 1)
+            mock_item.populate.assert_called_once_with("VX-1", specificFields=["__version", "durationSeconds"])
+
+            vidispine_cache.cache.invalidate("VX-1")
+            vidispine_cache.item_metadata("VX-1", ["durationSeconds", "__version"])
+            self.assertEqual(mock_item_class.call_count, 2)
+
+    def test_items_metadata(self):
+        """
+        items_metadata should fetch the items that are not cached with one search, and cache them
+        """
+        mock_api = MagicMock()
+        mock_api.request = MagicMock(return_value=ET.fromstring(self.item_list))
+        vidispine_cache.cache.put("VX-3", ("__version", "durationSeconds"), {"durationSeconds": None, "__version": "7"})
+
+        with patch("gnm_deliverables.vidispine_cache.VSApi", return_value=mock_api):
+            result = vidispine_cache.items_metadata(["VX-1", "VX-2", "VX-3"], ["durationSeconds", "__version"])
+
+        self.assertEqual(result, {
+            "VX-1": {"durationSeconds": "12.5", "__version": "3"},
+            "VX-2": {"durationSeconds": None, "__version": ["1", "2"]},
+            "VX-3": {"durationSeconds": None, "__version": "7"},
+        })
+        mock_api.request.assert_called_once()
+        body = mock_api.request.call_args[1]["body"]
+        self.assertIn("VX-1", body)
+        self.assertIn("VX-2", body)
+        self.assertNotIn("VX-3", body)
+        self.assertEqual(mock_api.request.call_args[1]["matrix"], {"field": "__version,durationSeconds", "number": 2})
+
+        with patch("gnm_deliverables.vidispine_cache.VSItem") as mock_item_class:
+            self.assertEqual(vidispine_cache.item_metadata("VX-1", ["durationSeconds", "__version"]),
+                             {"durationSeconds": "12.5", "__version": "3"})
+            mock_item_class.assert_not_called()
+
+    def test_asset_item_not_cached(self):
+        """
+        DeliverableAsset.item() should fetch the item from Vidispine every time, since create_proxy decides whether to
+        transcode from its current shapes
+        """
+        from gnm_deliverables.models import DeliverableAsset
+        mock_item = MagicMock()
+        with patch("gnm_deliverables.models.VSItem", return_value=mock_item) as mock_item_class:
+            DeliverableAsset(online_item_id="VX-1").item(None)
+            DeliverableAsset(online_item_id="VX-1").item(None)
+        self.assertEqual(mock_item_class.call_count, 2)
+        self.assertEqual(mock_item.populate.call_count, 2)
+        self.assertEqual(len(vidispine_cache.cache), 0)
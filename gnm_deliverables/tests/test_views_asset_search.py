@@ -66,4 +66,50 @@ class TestAssetSearchView(APITestCase):
         client.force_authenticate(User.objects.get(pk=1))
         response = client.post(reverse('asset-search'), {"atom_id":"not-a-uuid"}, format="json")
 
-        self.assertEqual(400, response.status_code)
\ No newline at end of file
+        self.assertEqual(400, response.status_code)
+
+class TestAssetSearchDocument(APITestCase):
+    fixtures = [
+        "bundles",
+    ]
+
+    def test_search_document_maintained_on_save(self):
+        """
+        saving an asset should rebuild its search document when the filename or a syndication record changes,
+        so that it can be found by platform title
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable, DeliverableAsset, Youtube
+        asset = DeliverableAsset.objects.create(deliverable=Deliverable.objects.first(), filename="upload.mp4")
+        self.assertEqual("upload.mp4", DeliverableAsset.objects.get(pk=asset.pk).search_document)
+
+        asset = DeliverableAsset.objects.get(pk=asset.pk)
+        asset.youtube_master = Youtube.objects.create(youtube_id="abc", youtube_title="Unusual youtube title",
+                                                      youtube_category="1", youtube_channel="1")
+        asset.save()
+        self.assertEqual("upload.mp4\nUnusual youtube title", DeliverableAsset.objects.get(pk=asset.pk).search_document)
+
+        Youtube.objects.filter(pk=asset.youtube_master_id).update(youtube_title="Changed title")
+        self.assertEqual(1, DeliverableAsset.update_search_documents(DeliverableAsset.objects.filter(pk=asset.pk)))
+        self.assertEqual("upload.mp4\nChanged title", DeliverableAsset.objects.get(pk=asset.pk).search_document)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("searcher", "searcher@example.com", "s3archP4ss"))
+        response = client.post(reverse('asset-search'), {"title": "changed TITLE"}, format="json")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([asset.pk], [entry["id"] for entry in response.data])
+
+    def test_save_without_search_fields(self):
+        """
+        saving an asset with update_fields that don't include the search fields should not rebuild the document
+        :return:
+        """
+        from gnm_deliverables.models import Deliverable, DeliverableAsset
+        asset = DeliverableAsset.objects.create(deliverable=Deliverable.objects.first(), filename="upload.mp4")
+        asset = DeliverableAsset.objects.get(pk=asset.pk)
+        asset.filename = "renamed.mp4"
+        asset.status = 2
+        asset.save(update_fields=["status"])
+        self.assertEqual("upload.mp4", DeliverableAsset.objects.get(pk=asset.pk).search_document)
+        asset.save()
+        self.assertEqual("renamed.mp4", DeliverableAsset.objects.get(pk=asset.pk).search_document)
@@ -43,3 +43,23 @@ class TestPublicationDatesSummary(TestCase):
         self.assertEqual(list(result["platforms"][1]["data"]), [0, 0, 0, 0])
         self.assertEqual(result["platforms"][2]["name"], "platform3")
         self.assertEqual(list(result["platforms"][2]["data"]), [0, 0, 9, 0])
+
+    def test_invert_data_bucketing(self):
+        """
+        invert_data should add entries into the day that they fall in and ignore any outside of the range
+        :return:
+        """
+        from gnm_deliverables.views.deliverables_dash_views import PublicationDatesSummary
+        raw_content = {
+            "platform1": [
+                {"day": parse("2020-04-13T23:00:00Z"), "count": 7},
+                {"day": parse("2020-04-14T00:00:00Z"), "count": 2},
+                {"day": parse("2020-04-14T13:00:00Z"), "count": 3},
+                {"day": parse("2020-04-16T23:59:59Z"), "count": 1},
+                {"day": parse("2020-04-17T00:00:00Z"), "count": 6},
+            ],
+        }
+
+        result = PublicationDatesSummary.invert_data(raw_content, parse("2020-04-14T00:00:00Z"), parse("2020-04-16T00:00:00Z"))
+        self.assertEqual(len(result["dates"]), 3)
+        self.assertEqual(list(result["platforms"][0]["data"]), [5, 0, 1])
@@ -178,10 +178,52 @@ class TestResyncMetadataView(TestCase):
         ld_response.status_code = 200
         ld_response.json = MagicMock(return_value="""{"status": "ok"}""")
 
-        with patch("requests.put", return_value=ld_response) as mock_put:
+        with patch("gnm_deliverables.http_client.put", return_value=ld_response) as mock_put:
             self.client.force_login(User.objects.get(pk=2))
             response = self.client.post(reverse('resync',
                                                 kwargs={'project_id': self.deliverable.pluto_core_project_id,
                                                         'asset_id': 1}))
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             mock_put.assert_called_once_with('launch-detector-not-set/update/{0}'.format(str(self.uid)))
+
+
+class TestTriggerOutputView(TestCase):
+    def setUp(self) -> None:
+        from django.contrib.auth.models import User
+        self.deliverable = Deliverable.objects.create(pluto_core_project_id=1, commission_id=1)
+        self.asset = DeliverableAsset.objects.create(deliverable=self.deliverable, filename="file.mp4")
+        self.user = User.objects.create_user('user01', 'user01@example.com', 'user01P4ssw0rD')
+
+    def post(self):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from gnm_deliverables.views.metadata_views import TriggerOutputView
+        request = APIRequestFactory().post("/api/bundle/1/asset/{0}/youtube/send".format(self.asset.pk))
+        force_authenticate(request, user=self.user)
+        with self.settings(CDS_ROUTE_MAP={"youtube": "youtube.xml"}), \
+                patch("gnm_deliverables.views.metadata_views.inmeta_to_string", return_value="<meta/>"):
+            return TriggerOutputView.as_view()(request, project_id=1, platform="youtube", asset_id=self.asset.pk)
+
+    def test_send(self):
+        """
+        the message should be published straight to the broker, and the send noted once it has been
+        :return:
+        """
+        from gnm_deliverables.models import SyndicationNotes
+        with patch("gnm_deliverables.signals.MessageRelay.publish") as mock_publish:
+            response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_publish.call_args[0][0], "deliverables.syndication.youtube.upload")
+        self.assertEqual(SyndicationNotes.objects.filter(deliverable_asset=self.asset).count(), 1)
+
+    def test_broker_unavailable(self):
+        """
+        if the broker can't take the message, the request should fail without noting a send
+        :return:
+        """
+        import pika.exceptions
+        from gnm_deliverables.models import SyndicationNotes
+        with patch("gnm_deliverables.signals.MessageRelay.publish",
+                   side_effect=pika.exceptions.AMQPConnectionError("down")):
+            response = self.post()
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(SyndicationNotes.objects.filter(deliverable_asset=self.asset).count(), 0)
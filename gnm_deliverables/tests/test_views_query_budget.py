@@ -0,0 +1,79 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory, force_authenticate
+from datetime import datetime
+import pytz
+
+
+class TestQueryBudget(TestCase):
+    """
+    the endpoints using DenormalisedAssetSerializer should take a constant number of queries however many assets
+    they return, i.e. the related rows must not be loaded one asset at a time
+    """
+    def setUp(self) -> None:
+        from gnm_deliverables.models import Deliverable
+        self.user = User.objects.create_user('user01', 'user01@example.com', 'user01P4ssw0rD')
+        self.bundle = Deliverable.objects.create(name="query test", commission_id=1, pluto_core_project_id=1234)
+        self.factory = APIRequestFactory()
+
+    def make_assets(self, count):
+        from gnm_deliverables.models import DeliverableAsset, GNMWebsite, Youtube, DailyMotion, Mainstream, Oovvuu, \
+            ReutersConnect
+        changed = datetime(2021, 3, 4, 5, 6, 7, tzinfo=pytz.UTC)
+        for i in range(count):
+            DeliverableAsset.objects.create(
+                deliverable=self.bundle,
+                filename="file{0}.mp4".format(i),
+                changed_dt=changed,
+                gnm_website_master=GNMWebsite.objects.create(),
+                youtube_master=Youtube.objects.create(),
+                DailyMotion_master=DailyMotion.objects.create(daily_motion_no_mobile_access=False,
+                                                              daily_motion_contains_adult_content=False),
+                mainstream_master=Mainstream.objects.create(mainstream_rules_contains_adult_content=False),
+                oovvuu_master=Oovvuu.objects.create(),
+                reutersconnect_master=ReutersConnect.objects.create(),
+            )
+
+    def test_dashboard_asset_list(self):
+        from gnm_deliverables.views.deliverables_dash_views import DeliverableAssetsList
+        view = DeliverableAssetsList.as_view()
+
+        # the paginator counts the rows even when no limit is given, then one query fetches them along with all of
+        # their relations
+        for new_assets, expected_count in [(1, 1), (4, 5)]:
+            self.make_assets(new_assets)
+            request = self.factory.get("/api/dash/assets?startDate=2021-03-01T00:00:00Z&endDate=2021-03-31T00:00:00Z")
+            force_authenticate(request, user=self.user)
+            with self.assertNumQueries(2):
+                response = view(request)
+                response.render()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), expected_count)
+            self.assertEqual(response.data[0]["deliverable"]["name"], "query test")
+            self.assertIsNotNone(response.data[0]["reutersconnect_master"])
+
+    def test_get_asset(self):
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables.views.views import GetAssetView
+        self.make_assets(1)
+        asset = DeliverableAsset.objects.get(deliverable=self.bundle)
+
+        request = self.factory.get("/api/asset/{0}".format(asset.pk))
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(1):
+            response = GetAssetView.as_view()(request, pk=asset.pk)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["youtube_master"]["id"], asset.youtube_master_id)
+
+    def test_search_by_filename(self):
+        from gnm_deliverables.views.views import SearchForDeliverableAPIView
+        self.make_assets(1)
+
+        request = self.factory.get("/api/asset/byFileName?filename=file0.mp4")
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(1):
+            response = SearchForDeliverableAPIView.as_view()(request)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["deliverable"]["name"], "query test")
@@ -0,0 +1,184 @@
+"""
+a process-level cache of Vidispine item metadata, so that the same item isn't fetched again every time that a message
+or request needs something from it.  Entries are keyed on the item id and the fields that were asked for, expire after
+VIDISPINE_ITEM_CACHE_TTL seconds, and the least recently used ones are dropped once there are more than
+VIDISPINE_ITEM_CACHE_SIZE of them.  Setting VIDISPINE_ITEM_CACHE_SIZE to 0 turns caching off.
+
+The responder drops an item's entries when it receives a vidispine.item.* event for it. Other processes, e.g. the web
+workers, don't see those events and rely on the TTL, so only metadata that is read for display or bookkeeping goes
+through here.  Anything that decides what to do to an item, e.g. whether it needs a transcode, fetches it fresh.
+"""
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from django.conf import settings
+from gnmvidispine.vs_item import VSItem
+from gnmvidispine.vidispine_api import VSApi
+
+logger = logging.getLogger(__name__)
+
+VS_NAMESPACE = "http://xml.vidispine.com/schema/vidispine"
+# maximum number of items to ask for in one search request
+SEARCH_PAGE_SIZE = 100
+
+
+class ItemMetadataCache(object):
+    """
+    thread-safe LRU cache with a time-to-live, holding values for (item id, key) pairs so that everything cached for
+    an item can be dropped at once
+    """
+    def __init__(self, max_entries:int=None, ttl:float=None, clock=time.monotonic):
+        self.max_entries = max_entries if max_entries is not None else getattr(settings, "VIDISPINE_ITEM_CACHE_SIZE", 1000)
+        self.ttl = ttl if ttl is not None else getattr(settings, "VIDISPINE_ITEM_CACHE_TTL", 300)
+        self._clock = clock
+        self._entries = OrderedDict()   # (item_id, key) -> (expiry time, value), least recently used first
+        self._keys_for_item = {}        # item_id -> set of keys cached for it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry_key):
+        del self._entries[entry_key]
+        item_id, key = entry_key
+        keys = self._keys_for_item.get(item_id)
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._keys_for_item[item_id]
+
+    def get(self, item_id:str, key):
+        """
+        returns the cached value, or None if there isn't one or it has expired
+        """
+        entry_key = (item_id, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                self._remove(entry_key)
+                return None
+            self._entries.move_to_end(entry_key)
+            return entry[1]
+
+    def put(self, item_id:str, key, value):
+        if self.max_entries <= 0:
+            return
+        entry_key = (item_id, key)
+        with self._lock:
+            self._entries[entry_key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(entry_key)
+            self._keys_for_item.setdefault(item_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, item_id:str):
+        """
+        drops everything cached for the given item
+        """
+        with self._lock:
+            for key in list(self._keys_for_item.get(item_id, [])):
+                self._remove((item_id, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_for_item.clear()
+
+
+cache = ItemMetadataCache()
+
+
+def fields_key(fields:list) -> tuple:
+    return tuple(sorted(set(fields)))
+
+
+def item_metadata(item_id:str, fields:list) -> dict:
+    """
+    returns the values of the given fields of an item, from the cache if possible.
+    VSNotFound is raised if the item does not exist, or another VSException if server communication fails
+    :param item_id: Vidispine item id
+    :param fields: list of field names
+    :return: dictionary of field name to value. A field with more than one value has a list, and a missing field is None
+    """
+    key = fields_key(fields)
+    values = cache.get(item_id, key)
+    if values is None:
+        item = VSItem(url=settings.VIDISPINE_URL, user=settings.VIDISPINE_USER, passwd=settings.VIDISPINE_PASSWORD)
+        item.populate(item_id, specificFields=list(key))
+        values = dict([(name, item.get(name, allowArray=True)) for name in key])
+        cache.put(item_id, key, values)
+    return values
+
+
+def items_metadata(item_ids:list, fields:list) -> dict:
+    """
+    batch version of item_metadata. The items that aren't cached are fetched with one search request for every
+    SEARCH_PAGE_SIZE of them, rather than one request each.
+    A VSException is raised if server communication fails
+    :param item_ids: list of Vidispine item ids
+    :param fields: list of field names
+    :return: dictionary of item id to the dictionary of field values. Items that were not found are left out
+    """
+    key = fields_key(fields)
+    results = {}
+    to_fetch = []
+    for item_id in set(item_ids):
+        values = cache.get(item_id, key)
+        if values is None:
+            to_fetch.append(item_id)
+        else:
+            results[item_id] = values
+
+    if len(to_fetch) > 0:
+        api = VSApi(url=settings.VIDISPINE_URL, user=settings.VIDISPINE_USER, passwd=settings.VIDISPINE_PASSWORD)
+        for start in range(0, len(to_fetch), SEARCH_PAGE_SIZE):
+            page = to_fetch[start:start + SEARCH_PAGE_SIZE]
+            response = api.request("/item", method="PUT", matrix={"field": ",".join(key), "number": len(page)},
+                                   body=search_document(page))
+            for item_id, values in parse_item_list(response, key).items():
+                cache.put(item_id, key, values)
+                results[item_id] = values
+        logger.debug("Fetched metadata for {0} of {1} items from Vidispine".format(len(to_fetch), len(item_ids)))
+    return results
+
+
+def search_document(item_ids:list) -> str:
+    """
+    builds an ItemSearchDocument matching any of the given item ids
+    """
+    ET.register_namespace("", VS_NAMESPACE)
+    root = ET.Element("{{{0}}}ItemSearchDocument".format(VS_NAMESPACE))
+    field = ET.SubElement(root, "{{{0}}}field".format(VS_NAMESPACE))
+    ET.SubElement(field, "{{{0}}}name".format(VS_NAMESPACE)).text = "itemId"
+    for item_id in item_ids:
+        ET.SubElement(field, "{{{0}}}value".format(VS_NAMESPACE)).text = item_id
+    return ET.tostring(root, encoding="unicode")
+
+
+def parse_item_list(response:ET.Element, fields:tuple) -> dict:
+    """
+    reads the requested fields of each item from an ItemListDocument, in the same form as item_metadata gives them
+    """
+    ns = {"vs": VS_NAMESPACE}
+    results = {}
+    for item in response.findall("vs:item", ns):
+        found = {}
+        for field in item.findall("vs:metadata/vs:timespan/vs:field", ns):
+            name = field.findtext("vs:name", namespaces=ns)
+            if name in fields:
+                found.setdefault(name, []).extend([value.text for value in field.findall("vs:value", ns)])
+        values = {}
+        for name in fields:
+            field_values = found.get(name, [])
+            if len(field_values) == 0:
+                values[name] = None
+            elif len(field_values) == 1:
+                values[name] = field_values[0]
+            else:
+                values[name] = field_values
+        results[item.get("id")] = values
+    return results
@@ -1,5 +1,4 @@
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from rest_framework.renderers import JSONRenderer
 from dateutil.parser import parse as parse_date
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -9,23 +8,23 @@ from gnm_deliverables.parsers import PlainTextParser
 from gnm_deliverables.serializers import DenormalisedAssetSerializer, SyndicationNoteSerializer
 from gnm_deliverables.jwt_auth_backend import JwtRestAuth
 from datetime import datetime, timedelta
-from .numpy_json_rendered import NumpyJSONRenderer
+from .numpy_json_rendered import FastJSONRenderer
+from .eager_loading import EagerLoadingViewMixin
 import numpy
 import logging
-from gnm_deliverables.models import DeliverableAsset, GNMWebsite, SyndicationNotes, Youtube, DailyMotion, Mainstream, ReutersConnect, Oovvuu
+from gnm_deliverables.models import DeliverableAsset, GNMWebsite, SyndicationNotes, ReutersConnect, Oovvuu, DashboardRollup
+from gnm_deliverables import dashboard_rollup, http_client
 import gnm_deliverables.choices as choices
-import requests
 from django.conf import settings
 import urllib.parse
-from django.db.models.functions import TruncDay
-from django.db.models import Count
+from django.db.models import Sum
 
 logger = logging.getLogger(__name__)
 logger.level = logging.DEBUG
 
 
-class DeliverableAssetsList(ListAPIView):
-    renderer_classes = (JSONRenderer,)
+class DeliverableAssetsList(EagerLoadingViewMixin, ListAPIView):
+    renderer_classes = (FastJSONRenderer,)
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     serializer_class = DenormalisedAssetSerializer
@@ -60,8 +59,8 @@ class DeliverableAssetsList(ListAPIView):
             except Exception as err:
                 logger.warning("Could not parse provided string {0} as a date: {1}".format(end_date, err))
 
-        queryset = DeliverableAsset.objects.select_related().filter(changed_dt__gte=start_date,
-                                                                    changed_dt__lte=end_date)
+        queryset = self.eager_load(DeliverableAsset.objects.filter(changed_dt__gte=start_date,
+                                                                   changed_dt__lte=end_date))
 
         if "types" in self.request.GET and self.request.GET["types"] != "all":
             queryset = queryset.filter(type=self.typeForString(self.request.GET["types"]))
@@ -84,7 +83,7 @@ class DeliverableAssetsList(ListAPIView):
 
 
 class ListSyndicationNotes(ListAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     serializer_class = SyndicationNoteSerializer
@@ -95,7 +94,7 @@ class ListSyndicationNotes(ListAPIView):
 
 
 class AddSyndicationNote(APIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     serializer_class = SyndicationNoteSerializer
@@ -122,7 +121,7 @@ class AddSyndicationNote(APIView):
 
 
 class GNMWebsiteSearch(APIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
 
@@ -196,7 +195,7 @@ class GNMWebsiteSearch(APIView):
                                                                                     base=settings.CAPI_BASE,
                                                                                     key=settings.CAPI_KEY)
             logger.info("CAPI url for {0} is {1}".format(request.GET["url"], url_to_call))
-            response = requests.get(url_to_call)
+            response = http_client.get(url_to_call)
             logger.info("CAPI response was {0}".format(response.status_code))
             if response.status_code == 200:
                 capi_content = self.validate_capi_content(response.json())
@@ -238,27 +237,37 @@ class GNMWebsiteSearch(APIView):
 
 
 class PublicationDatesSummary(APIView):
-    renderer_classes = (NumpyJSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
 
-    # with thanks to https://stackoverflow.com/questions/8746014/django-group-by-date-day-month-year
     @staticmethod
-    def build_dataset(queryset, start_date:datetime, end_date:datetime) -> dict:
+    def build_dataset(platforms, start_date:datetime, end_date:datetime) -> dict:
         """
-        builds a dictionary that contains the "bucketed aggregate" information for the given queryset.
-        We ask the database to give us the total count for each day value within the date range provided
-        and return this as a dictionary with a key "day" for the date and "count" for the count
-        :param queryset: base queryset to aggregate
+        builds a dictionary that contains the "bucketed aggregate" information for each of the given platforms.
+        We read the total count for each platform and day within the date range provided from the dashboard rollup,
+        in a single query, and return this as a list of dictionaries with a key "day" for the date and "count" for
+        the count for each platform
+        :param platforms: list of rollup platform names, from dashboard_rollup.PUBLICATION_PLATFORMS
         :param start_date: datetime indicating the earliest result to return
         :param end_date: datetime indicating the latest result to return
-        :return: a dictionary of data
+        :return: a dictionary of platform name -> list of dictionaries, ordered by day
         """
-        return queryset.filter(publication_date__gte=start_date, publication_date__lte=end_date). \
-            annotate(day=TruncDay("publication_date")). \
-            order_by("day"). \
-            values("day"). \
-            annotate(count=Count("id"))
+        first_day = dashboard_rollup.day_for(start_date)
+        rows = DashboardRollup.objects.filter(platform__in=platforms,
+                                              day__gte=first_day,
+                                              day__lte=dashboard_rollup.day_for(end_date)). \
+            order_by("platform", "day"). \
+            values("platform", "day"). \
+            annotate(count=Sum("count"))
+
+        result = {platform: [] for platform in platforms}
+        for row in rows:
+            if row["count"] > 0:
+                # invert_data counts days from start_date, so give the days in the same form
+                result[row["platform"]].append({"day": start_date + timedelta(days=(row["day"] - first_day).days),
+                                                "count": row["count"]})
+        return result
 
     @staticmethod
     def invert_data(raw_response:dict, start_date:datetime, end_date: datetime) -> dict:
@@ -270,44 +279,36 @@ class PublicationDatesSummary(APIView):
         :param end_date: ending date of the requested range
         :return: a dictionary of data
         """
-        current_date = start_date
         day_count = (end_date - start_date).days + 1
         logger.debug("day_count is {0}".format(day_count))
-        platform_count = len(raw_response.keys())
-        i=0
+        platform_names = list(raw_response.keys())
 
-        content = {
-            "dates": numpy.empty(day_count, dtype=datetime),
-            "platforms": numpy.empty(platform_count, dtype=object)
-        }
+        # flatten every entry into parallel arrays of (platform index, seconds since start_date, count), then find
+        # the day that each one falls into and add them all into a (platforms x days) matrix in one go
+        platform_index = numpy.array([i for i, platform in enumerate(platform_names)
+                                      for _ in raw_response[platform]], dtype=numpy.intp)
+        offsets = numpy.array([(entry["day"] - start_date).total_seconds() for platform in platform_names
+                               for entry in raw_response[platform]], dtype=numpy.float64)
+        counts = numpy.array([entry["count"] for platform in platform_names
+                              for entry in raw_response[platform]], dtype=numpy.int64)
+
+        day_starts = numpy.arange(day_count, dtype=numpy.float64) * 86400
+        day_index = numpy.searchsorted(day_starts, offsets, side="right") - 1
+        in_range = (offsets >= 0) & (offsets < day_count * 86400)
 
-        #set up date index
-        while True:
-            content["dates"][i] = current_date.isoformat("T")
-            i += 1
-            current_date = current_date + timedelta(days=1)
-            if current_date > end_date:
-                break
+        matrix = numpy.zeros((len(platform_names), day_count), dtype=numpy.int64)
+        numpy.add.at(matrix, (platform_index[in_range], day_index[in_range]), counts[in_range])
 
-        i = 0
-        for platform, entries in raw_response.items():
+        content = {
+            "dates": numpy.array([(start_date + timedelta(days=i)).isoformat("T") for i in range(day_count)],
+                                 dtype=object),
+            "platforms": numpy.empty(len(platform_names), dtype=object)
+        }
+        for i, platform in enumerate(platform_names):
             content["platforms"][i] = {
                 "name": platform,
-                "data": numpy.zeros(day_count, dtype=numpy.int)
+                "data": matrix[i]
             }
-            entry_count = len(entries)
-            dest_ctr = 0
-            src_ctr  = 0
-            current_date = start_date
-            while src_ctr<entry_count and dest_ctr<day_count:
-                if entries[src_ctr]["day"] == current_date:
-                    content["platforms"][i]["data"][dest_ctr] = entries[src_ctr]["count"]
-                    src_ctr += 1
-                else:
-                    content["platforms"][i]["data"][dest_ctr] = 0
-                dest_ctr += 1
-                current_date = current_date + timedelta(days=1)
-            i += 1
         return content
 
     def get(self, request):
@@ -334,12 +335,9 @@ class PublicationDatesSummary(APIView):
                 except ValueError: #we get this if the timezone is already tz-aware
                     pass
 
-            data = self.invert_data({
-                "gnm_website": self.build_dataset(GNMWebsite.objects.all(), start_date, end_date),
-                "youtube": self.build_dataset(Youtube.objects.all(), start_date, end_date),
-                "dailymotion": self.build_dataset(DailyMotion.objects.all(), start_date, end_date),
-                "mainstream": self.build_dataset(Mainstream.objects.all(), start_date, end_date)
-            }, start_date, end_date)
+            data = self.invert_data(
+                self.build_dataset(list(dashboard_rollup.PUBLICATION_PLATFORMS.keys()), start_date, end_date),
+                start_date, end_date)
 
             return Response(data)
         except Exception as err:
@@ -0,0 +1,14 @@
+class EagerLoadingViewMixin(object):
+    """
+    generic view mixin that applies the relations declared by the view's serializer (see
+    gnm_deliverables.serializers.EagerLoadingMixin) to its queryset.
+    Views that override get_queryset should call eager_load themselves, before slicing.
+    """
+    def eager_load(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, "setup_eager_loading"):
+            return serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+    def get_queryset(self):
+        return self.eager_load(super(EagerLoadingViewMixin, self).get_queryset())
@@ -7,7 +7,7 @@ from django.db.models.functions import Now
 from rest_framework import status
 from rest_framework.parsers import JSONParser
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from rest_framework.renderers import JSONRenderer
+from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -16,7 +16,8 @@ from django.conf import settings
 import os
 from gnm_deliverables.jwt_auth_backend import JwtRestAuth
 from gnm_deliverables.models import DeliverableAsset, GNMWebsite, Mainstream, Youtube, DailyMotion, \
-    LogEntry, Oovvuu
+    LogEntry, Oovvuu, TracksSavedValues
+from gnm_deliverables import dashboard_rollup, http_client
 import json
 from gnm_deliverables.serializers import *
 from rabbitmq.time_funcs import get_current_time
@@ -82,6 +83,10 @@ class MetadataAPIView(APIView):
                     return Response({"status": "error", "detail": "etag conflict"}, status=409)
                 elif update_count == 1:
                     updated = self.metadata_model.objects.get(pk=existing.id)
+                    # queryset updates don't send signals, so update the dashboard statistics here
+                    if isinstance(updated, TracksSavedValues):
+                        dashboard_rollup.instance_saved(updated, existing.saved_values)
+                    DeliverableAsset.update_search_documents(DeliverableAsset.objects.filter(pk=asset_id))
                     return Response(
                         {"status": "ok", "data": self.metadata_serializer(updated).data},
                         status=200)
@@ -98,6 +103,7 @@ class MetadataAPIView(APIView):
                 deliverableasset__deliverable__pluto_core_project_id__exact=project_id,
                 deliverableasset=asset_id)
             entry.delete()
+            DeliverableAsset.update_search_documents(DeliverableAsset.objects.filter(pk=asset_id))
             return Response(status=status.HTTP_204_NO_CONTENT)
         except ObjectDoesNotExist:
             return Response({"status": "error", "detail": "Asset not known"}, status=404)
@@ -119,7 +125,7 @@ class MetadataAPIView(APIView):
 
 
 class GNMWebsiteAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = GNMWebsite
     metadata_serializer = GNMWebsiteSerializer
@@ -134,7 +140,7 @@ class GNMWebsiteAPIView(MetadataAPIView):
 
 
 class MainstreamAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = Mainstream
     metadata_serializer = MainstreamSerializer
@@ -156,7 +162,7 @@ class MainstreamAPIView(MetadataAPIView):
 
 
 class YoutubeAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = Youtube
     metadata_serializer = YoutubeSerializer
@@ -178,7 +184,7 @@ class YoutubeAPIView(MetadataAPIView):
 
 
 class DailyMotionAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = DailyMotion
     metadata_serializer = DailyMotionSerializer
@@ -200,7 +206,7 @@ class DailyMotionAPIView(MetadataAPIView):
 
 
 class OovvuuAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = Oovvuu
     metadata_serializer = OovvuuSerializer
@@ -222,7 +228,7 @@ class OovvuuAPIView(MetadataAPIView):
 
 
 class ReutersConnectAPIView(MetadataAPIView):
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     metadata_model = ReutersConnect
     metadata_serializer = ReutersConnectSerializer
@@ -282,7 +288,7 @@ class PlatformLogsView(APIView):
 class PlatformLogUpdateView(APIView):
     authentication_classes = (BasicAuthentication, )
     parser_classes = (JSONParser, )
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, project_id, asset_id, platform:str):
@@ -404,18 +410,12 @@ class TriggerOutputView(APIView):
             logger.error("Could not update syndication notes for send of {0} to {1} by {2}: {3}".format(asset.filename, platform, user, e))
 
     def do_post(self, request, project_id:int, platform:str, asset_id:int):
-        from gnm_deliverables.signals import MessageRelay
+        from gnm_deliverables.signals import msgrelay
         try:
             asset:DeliverableAsset = DeliverableAsset.objects.get(pk=asset_id)
         except DeliverableAsset.DoesNotExist:
             return Response({"status":"error","details":"Asset not found"}, status=404)
 
-        try:
-            relay = MessageRelay()
-        except Exception as e:
-            logger.error("Could not initialise message relay: {0}".format(e))
-            return Response({"status":"error","details": "could not initialise message relay"}, status=500)
-
         routes_map:dict = getattr(settings, "CDS_ROUTE_MAP")
         if routes_map is None:
             logger.error("Could not find CDS_ROUTE_MAP in the configuration")
@@ -447,7 +447,7 @@ class TriggerOutputView(APIView):
             return Response({"status":"error","detail":str(e)})
 
         try:
-            relay.send_content(routing_key, encoded_payload)
+            msgrelay.publish(routing_key, encoded_payload)
             self.make_sent_note(platform, request.user.username, asset)
             return Response({"status":"ok","routing_key":routing_key})
         except Exception as e:
@@ -457,7 +457,7 @@ class TriggerOutputView(APIView):
 
 class ResyncToPublished(APIView):
     authentication_classes = (JwtRestAuth, BasicAuthentication, SessionAuthentication, )    #SessionAuthentication is needed for tests to work
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, project_id:int, asset_id:int):
@@ -472,7 +472,7 @@ class ResyncToPublished(APIView):
         try:
             url = settings.LAUNCH_DETECTOR_URL + "/update/" + str(asset.atom_id)
             logger.info("Update URL for asset {aid} on project {pid} is {url}".format(aid=asset_id,pid=project_id,url=url))
-            response = requests.put(url)
+            response = http_client.put(url)
 
             logger.info("Updating {pid}/{aid}: Launch detector said {status} {msg}".format(aid=asset_id,pid=project_id,
                                                                                            status=response.status_code,
@@ -1,17 +1,62 @@
-import json
+import decimal
 import numpy
-from rest_framework.renderers import BaseRenderer, JSONRenderer
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-class NumpyEncoder(json.JSONEncoder):
+
+class NumpyEncoder(JSONEncoder):
     """
-    Json encoder that can handle numpy arrays
+    Json encoder that can handle numpy arrays and scalars, as well as everything that the rest_framework encoder does
     """
     def default(self, obj):
         if isinstance(obj, numpy.ndarray):
             return obj.tolist()
-        return json.JSONEncoder.default(self, obj)
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+        return super(NumpyEncoder, self).default(obj)
+
+
+def orjson_default(obj):
+    """
+    handles the types that orjson can't serialise itself. numpy arrays only get here if they have an unsupported
+    dtype, e.g. object arrays
+    """
+    if isinstance(obj, decimal.Decimal):
+        # match the rest_framework encoder
+        return float(obj)
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    if isinstance(obj, numpy.generic):
+        return obj.item()
+    return NumpyEncoder().default(obj)
 
 
-class NumpyJSONRenderer(JSONRenderer):
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that encodes with orjson, which serialises numpy arrays, datetimes and UUIDs natively in C instead
+    of converting them to python objects first.
+    Falls back to the stdlib json encoder (with numpy support) if orjson is not installed, if
+    GNM_DELIVERABLES_JSON_BACKEND is set to "stdlib", or if the client asked for indented output.
+    """
     encoder_class = NumpyEncoder
+
+    @staticmethod
+    def use_orjson() -> bool:
+        return orjson is not None and getattr(settings, "GNM_DELIVERABLES_JSON_BACKEND", "orjson") == "orjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.use_orjson() or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=orjson_default,
+                           option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        # like the stock renderer, escape the unicode line terminators that aren't valid in javascript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -17,7 +17,7 @@ from rest_framework.generics import RetrieveAPIView, \
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.renderers import JSONRenderer
+from gnm_deliverables.views.numpy_json_rendered import FastJSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import gnm_deliverables.launch_detector
@@ -36,8 +36,14 @@ from gnm_deliverables.hmac_auth_backend import HmacRestAuth
 from gnm_deliverables.models import Deliverable, DeliverableAsset, YouTubeCategories, YouTubeChannels
 from gnm_deliverables.serializers import DeliverableAssetSerializer, DeliverableSerializer, DeliverableSerializerExtended, DenormalisedAssetSerializer, SearchRequestSerializer
 from gnm_deliverables.vs_notification import VSNotification
-from datetime import datetime, timedelta
-from django.db.models import Count
+from gnm_deliverables.views.eager_loading import EagerLoadingViewMixin
+from gnm_deliverables.pagination import KeysetPaginationMixin
+from gnm_deliverables import dashboard_rollup, invalid_counts
+from gnm_deliverables.change_collector import coalesce_changes
+from django.db import connection
+from django.db.models import IntegerField, Value
+from django.db.models.functions import Cast, Round
+from django.contrib.postgres.search import TrigramSimilarity
 import copy
 
 logger = logging.getLogger(__name__)
@@ -70,10 +76,10 @@ class NewDeliverableUI(TemplateView):
         }
 
 
-class NewDeliverablesAPIList(ListAPIView):
+class NewDeliverablesAPIList(KeysetPaginationMixin, ListAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     serializer_class = DeliverableSerializer
 
     def get_queryset(self):
@@ -97,7 +103,10 @@ class NewDeliverablesAPIList(ListAPIView):
                 if self.request.GET["sortOrder"] == 'asc':
                     sort_order = ''
 
-            return Deliverable.objects.all().order_by('{0}{1}'.format(sort_order, sort_by))[start_at:start_at+page_size]
+            queryset = Deliverable.objects.all().order_by('{0}{1}'.format(sort_order, sort_by))
+            if self.keyset_requested():
+                return queryset
+            return queryset[start_at:start_at+page_size]
         except ValueError:
             return Response({"status":"error","detail":"either pageSize or page was incorrectly formatted"}, status=400)
         except Exception as e:
@@ -108,7 +117,7 @@ class NewDeliverablesAPIList(ListAPIView):
 class NewDeliverabesApiBundleGet(RetrieveAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     queryset = Deliverable.objects
     serializer_class = DeliverableSerializer
     lookup_url_kwarg = "bundleId"
@@ -116,7 +125,7 @@ class NewDeliverabesApiBundleGet(RetrieveAPIView):
 class NewDeliverablesApiGet(RetrieveAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     queryset = Deliverable.objects
     serializer_class = DeliverableSerializer
     lookup_url_kwarg = "projectId"
@@ -126,7 +135,7 @@ class NewDeliverablesApiGet(RetrieveAPIView):
 class NewDeliverablesAPICreate(CreateAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
     serializer_class = DeliverableSerializer
 
@@ -180,10 +189,10 @@ class NewDeliverablesAPICreate(CreateAPIView):
         return self.attempt_create_bundle(bundle, auto_name, 1, request)
 
 
-class NewDeliverableAssetAPIList(ListAPIView):
+class NewDeliverableAssetAPIList(KeysetPaginationMixin, ListAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     serializer_class = DeliverableAssetSerializer
 
     def get_queryset(self):
@@ -214,7 +223,7 @@ class NewDeliverableAssetAPIList(ListAPIView):
 class DeliverableAPIView(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def delete(self, *args, **kwargs):
@@ -239,7 +248,7 @@ class DeliverableAPIView(APIView):
 class CountDeliverablesView(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def get(self, *args, **kwargs):
@@ -263,12 +272,16 @@ class CountDeliverablesView(APIView):
 class NewDeliverableAPIScan(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
 
     def post(self, request):
         try:
             bundle = Deliverable.objects.get(pluto_core_project_id=request.GET["project_id"])
-            results = bundle.sync_assets_from_file_system()
+            incremental = request.GET.get("incremental", "false").lower() in ["true", "t", "yes", "1"]
+            if incremental:
+                results = bundle.sync_assets_incrementally()
+            else:
+                results = bundle.sync_assets_from_file_system()
             return Response({"status": "ok", "detail": "resync performed", **results}, status=200)
         except Deliverable.DoesNotExist:
             return Response({"status": "error", "detail": "Project not known"}, status=404)
@@ -287,7 +300,7 @@ class DeliverablesTypeListAPI(APIView):
     """
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
 
     def get(self, request):
         result = functools.reduce(lambda acc, cat: {**acc, **{cat[0]: cat[1]}},
@@ -301,7 +314,7 @@ class AdoptExistingVidispineItemView(APIView):
     """
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
 
     vs_validator = re.compile(r'^\w{2}-\d+$')
 
@@ -349,7 +362,7 @@ class SetTypeView(APIView):
     """
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def put(self, request, bundleId, assetId):
@@ -368,13 +381,14 @@ class SetTypeView(APIView):
                             status=400)
 
         try:
-            item.type = request.data["type"]
-            if item.online_item_id is None:
-                logger.info("user object is {0}".format(request.user.__dict__))
-                logger.info("username is {0}".format(request.user.get_username()))
-                item.start_file_import(user=request.user.get_username())
-            else:
-                item.save()
+            with coalesce_changes():
+                item.type = request.data["type"]
+                if item.online_item_id is None:
+                    logger.info("user object is {0}".format(request.user.__dict__))
+                    logger.info("username is {0}".format(request.user.get_username()))
+                    item.start_file_import(user=request.user.get_username())
+                else:
+                    item.save()
             return Response(status=201)
         except Exception as e:
             logger.exception("Could not update item type: ", exc_info=e)
@@ -392,7 +406,8 @@ class TestCreateProxyView(APIView):
             return Response({"status": "notfound", "detail": "No such item exists"}, status=404)
 
         try:
-            job_id = item.create_proxy()
+            with coalesce_changes():
+                job_id = item.create_proxy()
             if job_id is None:
                 return Response({"status": "not_needed", "detail": "A proxy already exists"},
                                 status=409)
@@ -404,10 +419,10 @@ class TestCreateProxyView(APIView):
             return Response({"status": "error", "detail": str(e)}, status=500)
 
 
-class GetAssetView(RetrieveAPIView):
+class GetAssetView(EagerLoadingViewMixin, RetrieveAPIView):
     authentication_classes = (JwtRestAuth, )
     permission_classes = (IsAuthenticated, )
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
     queryset = DeliverableAsset.objects.all()
     serializer_class = DenormalisedAssetSerializer
 
@@ -416,7 +431,7 @@ class GetAssetView(RetrieveAPIView):
 class DeliverableAPIStarted(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def get(self, *args, **kwargs):
@@ -439,10 +454,9 @@ class LaunchDetectorUpdateView(APIView):
     authentication_classes = (HmacRestAuth, )
     permission_classes = (IsAuthenticated, )
     parser_classes = (JSONParser, )
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
 
     def post(self, request, atom_id=None):
-        from time import sleep
         logger.info("Received update from launch detector: {0}".format(request.data))
         try:
             msg = gnm_deliverables.launch_detector.LaunchDetectorUpdate(request.data)
@@ -454,48 +468,35 @@ class LaunchDetectorUpdateView(APIView):
         if msg.atom_id=="":
             logger.error("Received empty body")
             return Response({"status":"invalid_data"},status=400)
-        attempt = 1
-        while True:
+        try:
+            gnm_deliverables.launch_detector.apply_update(msg)
+            return Response({"status":"ok", "detail":"updated","atom_id":msg.atom_id}, status=200)
+        except DeliverableAsset.DoesNotExist:
+            # the asset is probably still being created, so the responder will try again in a little while
+            logger.warning("Could not find a deliverable asset matching the atom id {0}, deferring the update".format(msg.atom_id))
             try:
-                return self.try_update(request, msg)
-            except DeliverableAsset.DoesNotExist:
-                logger.error("Could not find a deliverable asset matching the atom id {0}".format(msg.atom_id))
-                if attempt>=5:
-                    return Response({"status":"not_found","atom_id":msg.atom_id}, status=404)
-                else:
-                    attempt+=1
-                    #asynchronous retries would be a LOT better. But would be a lot more work too. We'll
-                    #re-visit if this causes problems.  Max delay is 15s.
-                    logger.warning("Retrying for attempt {} after 3s...".format(attempt))
-                    sleep(3)
+                gnm_deliverables.launch_detector.defer_update(request.data)
             except Exception as e:
-                logger.exception("Could not process incoming update for {0}: ".format(atom_id), exc_info=e)
+                logger.exception("Could not defer incoming update for {0}: ".format(atom_id), exc_info=e)
                 return Response({"status":"server_error", "detail": str(e)}, status=500)
-
-    def try_update(self, request, msg):
-        asset = gnm_deliverables.launch_detector.find_asset_for(msg)
-
-        logger.info("Found asset ID {} for {}".format(asset.pk, asset.atom_id))
-        gnm_deliverables.launch_detector.update_gnmwebsite(msg, asset)
-        gnm_deliverables.launch_detector.update_dailymotion(msg, asset)
-        gnm_deliverables.launch_detector.update_mainstream(msg, asset)
-        gnm_deliverables.launch_detector.update_youtube(msg, asset)
-        asset.save()
-        return Response({"status":"ok", "detail":"updated","atom_id":msg.atom_id}, status=200)
+            return Response({"status":"deferred","atom_id":msg.atom_id}, status=202)
+        except Exception as e:
+            logger.exception("Could not process incoming update for {0}: ".format(atom_id), exc_info=e)
+            return Response({"status":"server_error", "detail": str(e)}, status=500)
 
 
-class SearchForDeliverableAPIView(RetrieveAPIView):
+class SearchForDeliverableAPIView(EagerLoadingViewMixin, RetrieveAPIView):
     """
     see if we have any deliverable assets with the given file name. This is used for tagging during the backup process.
     """
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
     authentication_classes = (JwtRestAuth, HmacRestAuth, BasicAuthentication)
     permission_classes = (IsAuthenticated, )
     serializer_class = DenormalisedAssetSerializer
 
     def get_object(self, queryset=None):
         fileName = self.request.GET["filename"]
-        return DeliverableAsset.objects.filter(filename=fileName)[0]
+        return self.eager_load(DeliverableAsset.objects.filter(filename=fileName))[0]
 
     def get(self, request, *args, **kwargs):
         try:
@@ -509,8 +510,8 @@ class SearchForDeliverableAPIView(RetrieveAPIView):
             return Response({"status":"error","detail":str(e)}, status=500)
 
 
-class GenericAssetSearchAPI(ListAPIView):
-    renderer_classes = (JSONRenderer, )
+class GenericAssetSearchAPI(KeysetPaginationMixin, ListAPIView):
+    renderer_classes = (FastJSONRenderer, )
     parser_classes = (JSONParser, )
     authentication_classes = (JwtRestAuth, HmacRestAuth, BasicAuthentication)
     permission_classes = (IsAuthenticated, )
@@ -521,17 +522,20 @@ class GenericAssetSearchAPI(ListAPIView):
         self._search_request:SearchRequestSerializer = None
 
     def get_queryset(self):
-        from django.db.models import Q
         if self._search_request is None:
             raise Exception("no search request saved")
         queryset = DeliverableAsset.objects.all()
+        ranked = False
 
         if self._search_request.validated_data["title"] and self._search_request.validated_data["title"]!="":
-            queryset = queryset.filter(Q(filename__icontains=self._search_request.validated_data["title"]) | \
-                                           Q(gnm_website_master__website_title__icontains=self._search_request.validated_data["title"]) | \
-                                           Q(mainstream_master__mainstream_title__icontains=self._search_request.validated_data["title"]) | \
-                                           Q(DailyMotion_master__daily_motion_title__icontains=self._search_request.validated_data["title"]) | \
-                                           Q(youtube_master__youtube_title__icontains=self._search_request.validated_data["title"]))
+            # search_document holds the filename and the syndication titles, and has a trigram index
+            queryset = queryset.filter(search_document__icontains=self._search_request.validated_data["title"])
+            if connection.vendor == "postgresql":
+                # the similarity is a float4, which keyset pagination can't seek on exactly, so rank on it in
+                # whole thousandths
+                similarity = TrigramSimilarity("search_document", self._search_request.validated_data["title"])
+                queryset = queryset.annotate(rank=Cast(Round(similarity * Value(1000.0)), IntegerField()))
+                ranked = True
 
         if self._search_request.validated_data["atom_id"] and self._search_request.validated_data["atom_id"]!="":
             queryset = queryset.filter(atom_id=self._search_request.validated_data["atom_id"])
@@ -541,9 +545,14 @@ class GenericAssetSearchAPI(ListAPIView):
 
         if self._search_request.validated_data["order_by"]:
             queryset = queryset.order_by(self._search_request.validated_data["order_by"])
+        elif ranked:
+            queryset = queryset.order_by("-rank", "-modified_dt")
         else:
             queryset = queryset.order_by("-modified_dt")
 
+        if self.keyset_requested():
+            return queryset
+
         if ("startAt" in self.request.GET) or ("limit" in self.request.GET):
             start_at = 0
             limit = 25
@@ -551,7 +560,7 @@ class GenericAssetSearchAPI(ListAPIView):
                 start_at = int(self.request.GET["startAt"])
             if "limit" in self.request.GET:
                 limit = int(self.request.GET["limit"])
-            queryset = queryset[start_at:limit]
+            queryset = queryset[start_at:start_at+limit]
 
         return queryset
 
@@ -574,7 +583,7 @@ class GenericAssetSearchAPI(ListAPIView):
 class BundlesForCommission(ListAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     serializer_class = DeliverableSerializerExtended
 
     def get_queryset(self):
@@ -607,7 +616,7 @@ class RetryJobForAsset(APIView):
 class InvalidAPIList(ListAPIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     serializer_class = DeliverableAssetSerializer
 
     def get_queryset(self):
@@ -636,12 +645,12 @@ class InvalidAPIList(ListAPIView):
 class CountInvalid(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def get(self, *args, **kwargs):
         try:
-            result = [ DeliverableAsset.objects.filter(access_dt__icontains=datetime.strftime((datetime.now() - timedelta(i)), '%Y-%m-%d')).exclude(status=DELIVERABLE_ASSET_STATUS_INGESTING).exclude(status=DELIVERABLE_ASSET_STATUS_INGESTED).exclude(status=DELIVERABLE_ASSET_STATUS_TRANSCODED).exclude(status=DELIVERABLE_ASSET_STATUS_TRANSCODING).count() for i in range(11, -1, -1)]
+            result = invalid_counts.count_invalid_by_day()
 
             return Response(result, status=200)
         except Exception:
@@ -651,12 +660,12 @@ class CountInvalid(APIView):
 class CountInvalidByType(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def get(self, *args, **kwargs):
         try:
-            result = [ DeliverableAsset.objects.filter(type=i).exclude(status=DELIVERABLE_ASSET_STATUS_INGESTING).exclude(status=DELIVERABLE_ASSET_STATUS_INGESTED).exclude(status=DELIVERABLE_ASSET_STATUS_TRANSCODED).exclude(status=DELIVERABLE_ASSET_STATUS_TRANSCODING).count() for i in range(1, 16, 1)]
+            result = invalid_counts.count_invalid_by_type()
 
             return Response(result, status=200)
         except Exception:
@@ -666,12 +675,14 @@ class CountInvalidByType(APIView):
 class CountInvalidByStatus(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
     parser_classes = (JSONParser,)
 
     def get(self, *args, **kwargs):
         try:
-            result = DeliverableAsset.objects.values("status").annotate(Count("id"))
+            counts = dashboard_rollup.counts_by(dashboard_rollup.asset_counts(), "status")
+            result = [{"status": status, "id__count": count} for status, count in sorted(counts.items())
+                      if count > 0]
 
             return Response(result, status=200)
         except Exception as e:
@@ -682,7 +693,7 @@ class CountInvalidByStatus(APIView):
 class TestAndFixDropfolder(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated, )
-    renderer_classes = (JSONRenderer, )
+    renderer_classes = (FastJSONRenderer, )
 
     def get(self, *args, **kwargs):
         project_id = kwargs.get("project_id")
@@ -702,7 +713,7 @@ class TestAndFixDropfolder(APIView):
 class GetYouTubeCategory(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
 
     def get(self, request, category_id):
         try:
@@ -717,7 +728,7 @@ class GetYouTubeCategory(APIView):
 class GetYouTubeChannel(APIView):
     authentication_classes = (JwtRestAuth, HmacRestAuth)
     permission_classes = (IsAuthenticated,)
-    renderer_classes = (JSONRenderer,)
+    renderer_classes = (FastJSONRenderer,)
 
     def get(self, request, channel_id):
         try:
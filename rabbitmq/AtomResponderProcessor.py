@@ -1,6 +1,5 @@
 from .MessageProcessor import MessageProcessor
-from .serializers import AtomMessageSerializer
-from .models import AtomResponderMessage
+from .messages import AtomResponderMessage
 from gnm_deliverables.models import Deliverable, DeliverableAsset
 from gnmvidispine.vs_item import VSItem
 from django.conf import settings
@@ -15,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 class AtomResponderProcessor(MessageProcessor):
     routing_key = "atomresponder.atom.#"
-    serializer = AtomMessageSerializer
+    ordering_field = "atomId"
+    decoder = AtomResponderMessage
 
     def get_or_create_bundle(self, projectid: str, commissionId:int) -> Deliverable:
         """
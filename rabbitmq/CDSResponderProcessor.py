@@ -1,8 +1,7 @@
 from .MessageProcessor import MessageProcessor
 from gnm_deliverables.models import DeliverableAsset, Mainstream, DailyMotion
 import logging
-from .serializers import CDSMessageSerializer
-from .models import CDSResponderMessage
+from .messages import CDSResponderMessage
 from gnm_deliverables.settings import CDS_ROUTE_MAP
 from .exceptions import PermanentFailure
 
@@ -59,7 +58,7 @@ def set_asset_data(routename, asset, job_id=None, upload_status=None):
 
 class CDSResponderProcessor(MessageProcessor):
     routing_key = "cds.job.started"
-    serializer = CDSMessageSerializer
+    decoder = CDSResponderMessage
 
     def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body):
         msg = CDSResponderMessage(**body)
@@ -68,7 +67,7 @@ class CDSResponderProcessor(MessageProcessor):
 
 class CDSInvalidProcessor(MessageProcessor):
     routing_key = "cds.job.invalid"
-    serializer = CDSMessageSerializer
+    decoder = CDSResponderMessage
 
     def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body):
         msg = CDSResponderMessage(**body)
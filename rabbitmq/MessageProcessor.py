@@ -1,14 +1,44 @@
-import jsonschema
 import json
 import logging
+import re
 from .exceptions import PermanentFailure
 import pika.spec
 from rest_framework.parsers import JSONParser
 import io
+from django.conf import settings
+from gnm_deliverables.schema_validation import compiled_validator, validate
+from .declaration import RETRY_COUNT_HEADER, DELAYED_HEADER, retry_delays, retry_queue_name, delay_queue_name
+from .sharding import ORIGINAL_EXCHANGE_HEADER, ORIGINAL_ROUTING_KEY_HEADER
 
 logger = logging.getLogger(__name__)
 
 
+def reject_constant(value):
+    # like rest_framework's JSONParser, don't accept NaN or Infinity
+    raise ValueError("Out of range float values are not JSON compliant: {0}".format(value))
+
+
+def message_field(content, name:str):
+    """
+    finds a field in a decoded message, either at the top level or in a Vidispine "field" list of key/value pairs.
+    If the message is a list, the first entry is used
+    :param content: decoded json content of the message
+    :param name: field name to find
+    :return: the value of the field, or None if it is not present
+    """
+    if isinstance(content, list) and len(content) > 0:
+        content = content[0]
+    if not isinstance(content, dict):
+        return None
+    if name in content:
+        return content[name]
+    if isinstance(content.get("field"), list):
+        for entry in content["field"]:
+            if isinstance(entry, dict) and entry.get("key") == name:
+                return entry.get("value")
+    return None
+
+
 class MessageProcessor(object):
     """
     MessageProcessor describes the interface that all message processor classes should implement
@@ -16,6 +46,73 @@ class MessageProcessor(object):
     schema = None       # override this in a subclass
     routing_key = None  # override this in a subclass
     serializer = None   # override this in a subclass
+    decoder = None      # or this, with a rabbitmq.messages.Message subclass
+
+    # in worker-pool mode, messages with the same value of this field (e.g. the item that they are about) are handled
+    # in the order that they arrived.  If it is None, or not in the message, messages are ordered by routing key
+    ordering_field = None
+    # number of worker threads for this handler in worker-pool mode; RABBITMQ_HANDLER_CONCURRENCY can override it
+    concurrency = 1
+    # maximum number of unacknowledged messages that the broker sends to this handler. None uses
+    # RABBITMQ_PREFETCH_COUNT, and RABBITMQ_HANDLER_PREFETCH can override it
+    prefetch_count = None
+    # set batch_size above 1 to receive up to that many messages at once through valid_batch_receive, or as many as
+    # arrived within batch_timeout_ms of the first one. RABBITMQ_HANDLER_BATCH_SIZE can override it
+    batch_size = 1
+    batch_timeout_ms = 200
+    # set this to hold each message for that many seconds before it is processed, e.g. to let a change that it races
+    # with land first. The message waits in a delay queue on the broker, so no consumer is held up
+    receive_delay = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("schema") is not None:
+            # compile the schema when the processor is defined, rather than on the first message
+            compiled_validator(cls.schema)
+
+    def queue_name(self) -> str:
+        """
+        returns the name of the queue that this handler consumes from
+        """
+        return "deliverables-{0}".format(re.sub(r'[^\w\d]', '', self.routing_key))
+
+    def ordering_key(self, routing_key:str, body:bytes) -> str:
+        """
+        returns the key that messages have to be processed in order of, see ordering_field
+        """
+        if self.ordering_field is not None:
+            try:
+                value = message_field(json.loads(body.decode("UTF-8")), self.ordering_field)
+            except ValueError:
+                value = None
+            if value is not None:
+                return "{0}={1}".format(self.ordering_field, value)
+        return routing_key
+
+    def pool_size(self) -> int:
+        """
+        returns the number of worker threads to use for this handler in worker-pool mode. RABBITMQ_HANDLER_CONCURRENCY
+        is a dictionary of handler class name to thread count, which overrides the concurrency member
+        """
+        overrides = getattr(settings, "RABBITMQ_HANDLER_CONCURRENCY", {})
+        return max(1, int(overrides.get(self.__class__.__name__, self.concurrency)))
+
+    def batch_limit(self) -> int:
+        """
+        returns the maximum number of messages in a batch, see batch_size. 1 means that batching is off.
+        """
+        overrides = getattr(settings, "RABBITMQ_HANDLER_BATCH_SIZE", {})
+        return max(1, int(overrides.get(self.__class__.__name__, self.batch_size)))
+
+    def prefetch(self) -> int:
+        """
+        returns the prefetch count to set on this handler's channel.  RABBITMQ_HANDLER_PREFETCH is a dictionary of
+        handler class name to prefetch count, which overrides the prefetch_count member
+        """
+        overrides = getattr(settings, "RABBITMQ_HANDLER_PREFETCH", {})
+        default = self.prefetch_count if self.prefetch_count is not None else getattr(settings, "RABBITMQ_PREFETCH_COUNT", 100)
+        # a batch could never fill up if the broker stopped sending before it did
+        return max(self.batch_limit(), int(overrides.get(self.__class__.__name__, default)))
 
     def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body):
         """
@@ -29,9 +126,22 @@ class MessageProcessor(object):
         logger.debug("Received validated message from {0} via {1} with {2}: {3}".format(exchange_name, routing_key, delivery_tag, body))
         pass
 
+    def valid_batch_receive(self, exchange_name, messages:list):
+        """
+        receives a batch of validated messages in batched mode. The default implementation passes them to
+        valid_message_receive one at a time; override it in a subclass to process them together, e.g. to look up all
+        of the objects that they refer to in one query.
+        The whole batch is acked if this returns, and nacked if it raises.
+        :param exchange_name:
+        :param messages: list of (routing_key, delivery_tag, body) tuples, in the order that they arrived
+        :return:
+        """
+        for routing_key, delivery_tag, body in messages:
+            self.valid_message_receive(exchange_name, routing_key, delivery_tag, body)
+
     def validate_with_schema(self, body):
         content = json.loads(body.decode('UTF-8'))
-        jsonschema.validate(content, self.schema)   # throws an exception if the content does not validate
+        validate(content, self.schema)   # throws an exception if the content does not validate
         return content  #if we get to this line, then validation was successful
 
     def validate_with_serializer(self, body):
@@ -50,6 +160,141 @@ class MessageProcessor(object):
         else:
             raise ValueError(str(serializer_inst.errors))
 
+    def validate_with_decoder(self, body):
+        """
+        validates the body with the decoder's rules, which are the same as a ModelSerializer's but much cheaper
+        :return: a dictionary of the validated fields
+        """
+        content = json.loads(body.decode('UTF-8'), parse_constant=reject_constant)
+        if isinstance(content, list):
+            if len(content)>1:
+                logger.warning("handling messages with >1 member is not implemented yet")
+            content = content[0] if len(content) > 0 else None
+        return self.decoder.validate(content)
+
+    def validate_content(self, body):
+        """
+        validates the body with whichever of the decoder, serializer or schema this processor has
+        :return: the validated content, or None if there is nothing to validate it with
+        """
+        if self.decoder:
+            return self.validate_with_decoder(body)
+        elif self.serializer:
+            return self.validate_with_serializer(body)
+        elif self.schema:
+            return self.validate_with_schema(body)
+        else:
+            return None
+
+    def retry_or_dead_letter(self, channel, method:pika.spec.Basic.Deliver, properties:pika.spec.BasicProperties, body:bytes):
+        """
+        called when a message could not be processed because of an error that might go away, e.g. a downstream
+        service being unavailable. The message is sent on to the next delayed-retry queue, which will put it back on
+        our queue after its delay, and acked. Once it has used up all of the retries it is sent to deliverables-dlq
+        instead.
+        :param channel: pika.channel.Channel object
+        :param method: pika.spec.Basic.Deliver object for the message
+        :param properties: pika.spec.BasicProperties object for the message
+        :param body: byte array of the message content
+        :return:
+        """
+        headers = dict(getattr(properties, "headers", None) or {})
+        attempt = int(headers.get(RETRY_COUNT_HEADER, 0))
+        delays = retry_delays()
+
+        if attempt < len(delays):
+            logger.warning("Retrying message with delivery tag {0} in {1}s, attempt {2} of {3}"
+                           .format(method.delivery_tag, delays[attempt], attempt + 1, len(delays)))
+            headers[RETRY_COUNT_HEADER] = attempt + 1
+            exchange = ""
+            routing_key = retry_queue_name(self.queue_name(), delays[attempt])
+        else:
+            logger.error("Message with delivery tag {0} still failed after {1} retries, sending it to the dead-letter queue"
+                         .format(method.delivery_tag, attempt))
+            exchange = "deliverables-dlx"
+            routing_key = "deliverables-dlq"
+
+        self.republish(channel, method, properties, body, exchange, routing_key, headers)
+
+    def defer_if_new(self, channel, method:pika.spec.Basic.Deliver, properties:pika.spec.BasicProperties, body:bytes) -> bool:
+        """
+        if this handler has a receive_delay and the message has not been held for it yet, sends the message to the
+        delay queue, which puts it back on our queue once the delay is up, and acks it
+        :return: True if the message was deferred, False if it should be processed now
+        """
+        if not self.receive_delay:
+            return False
+        headers = dict(getattr(properties, "headers", None) or {})
+        if headers.get(DELAYED_HEADER):
+            return False
+        logger.debug("Holding message with delivery tag {0} for {1}s".format(method.delivery_tag, self.receive_delay))
+        headers[DELAYED_HEADER] = 1
+        self.republish(channel, method, properties, body, "", delay_queue_name(self.queue_name(), self.receive_delay),
+                       headers)
+        return True
+
+    def republish(self, channel, method:pika.spec.Basic.Deliver, properties:pika.spec.BasicProperties, body:bytes,
+                  exchange:str, routing_key:str, headers:dict):
+        """
+        sends a copy of the message with the given headers, recording the exchange and routing key that it originally
+        came in on, and then acks the original
+        """
+        headers.setdefault(ORIGINAL_EXCHANGE_HEADER, method.exchange)
+        headers.setdefault(ORIGINAL_ROUTING_KEY_HEADER, method.routing_key)
+        channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body,
+                              properties=pika.BasicProperties(headers=headers,
+                                                              content_type=getattr(properties, "content_type", None),
+                                                              delivery_mode=getattr(properties, "delivery_mode", None)))
+        # the publish and the ack go over the same channel in order, so the broker has the copy before it drops
+        # the original
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+    def raw_batch_receive(self, channel, deliveries:list):
+        """
+        batched mode counterpart of raw_message_receive. Messages that don't validate are nacked individually, the
+        rest are passed to valid_batch_receive and then acked or nacked together with multiple=True, which settles
+        every outstanding delivery on the channel up to the last one. If the batch fails with an error that is not
+        a PermanentFailure, each message in it is retried on its own. Messages that still have to be held for
+        receive_delay are deferred rather than being put in the batch.
+        :param channel: pika.channel.Channel object
+        :param deliveries: list of (method, properties, body) tuples in the order that they were delivered
+        :return:
+        """
+        valid = []
+        for method, properties, body in deliveries:
+            try:
+                content = self.validate_content(body)
+                if content is None:
+                    raise ValueError("No schema nor serializer present for validation in {0}".format(self.__class__.__name__))
+            except Exception as e:
+                logger.error("Message from {0} via {1} with delivery tag {2} did not validate: {3}. Content was {4}"
+                             .format(method.routing_key, method.exchange, method.delivery_tag, str(e), body.decode('UTF-8')))
+                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                continue
+            if not self.defer_if_new(channel, method, properties, body):
+                valid.append((method, properties, body, content))
+
+        if len(valid) == 0:
+            return
+        logger.info("Received batch of {0} messages from {1}".format(len(valid), channel))
+
+        last_method = valid[-1][0]
+        last_tag = max([method.delivery_tag for method, properties, body, content in valid])
+        try:
+            self.valid_batch_receive(last_method.exchange,
+                                     [(method.routing_key, method.delivery_tag, content)
+                                      for method, properties, body, content in valid])
+            channel.basic_ack(delivery_tag=last_tag, multiple=True)
+        except PermanentFailure as e:
+            logger.error("Could not process batch: {0}".format(str(e)))
+            channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=False)
+            channel.basic_cancel(last_method.consumer_tag)
+            raise ValueError("Could not process batch")
+        except Exception as e:
+            logger.error("Could not process batch: {0}".format(str(e)))
+            for method, properties, body, content in valid:
+                self.retry_or_dead_letter(channel, method, properties, body)
+
     def raw_message_receive(self, channel, method:pika.spec.Basic.Deliver, properties:pika.spec.BasicProperties, body:bytes):
         """
         called from the pika library when data is received on our channel -
@@ -68,11 +313,8 @@ class MessageProcessor(object):
         try:
             logger.info("Received message with delivery tag {2} from {0}: {1}".format(channel, body.decode('UTF-8'), tag))
 
-            if self.serializer:
-                validated_content = self.validate_with_serializer(body)
-            elif self.schema:
-                validated_content = self.validate_with_schema(body)
-            else:
+            validated_content = self.validate_content(body)
+            if validated_content is None:
                 logger.warning("No schema nor serializer resent for validation in {0}, cannot continue".format(self.__class__.__name__))
                 channel.basic_nack(delivery_tag=tag, requeue=True)
 
@@ -86,6 +328,8 @@ class MessageProcessor(object):
             return
 
         if validated_content is not None:
+            if self.defer_if_new(channel, method, properties, body):
+                return
             try:
                 self.valid_message_receive(method.exchange, method.routing_key, method.delivery_tag, validated_content)
                 channel.basic_ack(delivery_tag=tag)
@@ -96,9 +340,7 @@ class MessageProcessor(object):
                 raise ValueError("Could not process message")
             except Exception as e:
                 logger.error("Could not process message: {0}".format(str(e)))
-                channel.basic_nack(delivery_tag=tag, requeue=True)
-                channel.basic_cancel(method.consumer_tag)
-                raise ValueError("Could not process message")
+                self.retry_or_dead_letter(channel, method, properties, body)
         else:
             logger.error("Validated content was empty but no validation error? There must be a bug")
             channel.basic_nack(delivery_tag=tag, requeue=True)
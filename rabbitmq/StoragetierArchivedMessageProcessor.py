@@ -1,6 +1,5 @@
 from .MessageProcessor import MessageProcessor
-from .serializers import StoragetierSuccessMessageSerializer
-from .models import StoragetierSuccessMessage
+from .messages import StoragetierSuccessMessage
 from gnm_deliverables.models import DeliverableAsset
 
 import logging
@@ -10,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 class StoragetierArchivedMessageProcessor(MessageProcessor):
     routing_key = "storagetier.onlinearchive.mediaingest.success"
-    serializer = StoragetierSuccessMessageSerializer
+    decoder = StoragetierSuccessMessage
 
     def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body):
         """
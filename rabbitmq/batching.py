@@ -0,0 +1,45 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCollector(object):
+    """
+    collects the messages for a batched handler until there are batch_limit() of them, or batch_timeout_ms has passed
+    since the first one arrived, and then passes them on together.
+    This runs on the connection's ioloop, so it needs no locking.
+    """
+    def __init__(self, handler, ioloop, dispatch):
+        """
+        :param handler: MessageProcessor instance
+        :param ioloop: ioloop of the connection that the messages arrive on, used for the timeout
+        :param dispatch: function that is called with the list of (method, properties, body) tuples in each batch
+        """
+        self.handler = handler
+        self.ioloop = ioloop
+        self.dispatch = dispatch
+        self.pending = []
+        self.timer = None
+
+    def on_message(self, channel, method, properties, body):
+        """
+        basic_consume callback
+        """
+        self.pending.append((method, properties, body))
+        if len(self.pending) >= self.handler.batch_limit():
+            self.flush()
+        elif self.timer is None:
+            self.timer = self.ioloop.call_later(self.handler.batch_timeout_ms / 1000.0, self.flush)
+
+    def flush(self):
+        """
+        passes on the messages collected so far, if there are any
+        """
+        if self.timer is not None:
+            self.ioloop.remove_timeout(self.timer)
+            self.timer = None
+        if len(self.pending) == 0:
+            return
+        batch = self.pending
+        self.pending = []
+        self.dispatch(batch)
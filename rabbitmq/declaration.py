@@ -10,3 +10,52 @@ def declare_rabbitmq_setup(channel: pika.channel.Channel):
     """
     channel.exchange_declare(exchange_type='topic',exchange=getattr(settings, "RABBITMQ_EXCHANGE", 'pluto-deliverables'))
     channel.exchange_declare(exchange="deliverables-dlx", exchange_type="direct")
+
+
+RETRY_COUNT_HEADER = "x-deliverables-retry-count"
+# set on messages that have already been held for their handler's receive_delay
+DELAYED_HEADER = "x-deliverables-delayed"
+
+
+def retry_delays() -> list:
+    """
+    the delays, in seconds, before each retry of a message that failed to process.  Once they have all been used up
+    the message is dead-lettered to deliverables-dlq
+    """
+    return getattr(settings, "RABBITMQ_RETRY_DELAYS", [5, 30, 300])
+
+
+def retry_queue_name(queuename: str, delay: int) -> str:
+    return "{0}-retry-{1}s".format(queuename, delay)
+
+
+def delay_queue_name(queuename: str, delay: int) -> str:
+    return "{0}-delay-{1}s".format(queuename, delay)
+
+
+def declare_holding_queue(channel: pika.channel.Channel, name: str, delay: int, queuename: str):
+    """
+    declares a queue that nothing consumes from. It holds each message for the given delay and then dead-letters it
+    back onto the original queue through the default exchange
+    :param channel: channel to declare on
+    :param name: name of the holding queue
+    :param delay: number of seconds to hold the messages for
+    :param queuename: name of the queue that the messages go back to
+    :return:
+    """
+    channel.queue_declare(name, arguments={
+        'x-message-ttl': int(delay * 1000),
+        'x-dead-letter-exchange': "",
+        'x-dead-letter-routing-key': queuename,
+    })
+
+
+def declare_retry_queues(channel: pika.channel.Channel, queuename: str):
+    """
+    declares the delayed-retry queues for the given queue, see declare_holding_queue
+    :param channel: channel to declare on
+    :param queuename: name of the queue that the messages are retried on
+    :return:
+    """
+    for delay in retry_delays():
+        declare_holding_queue(channel, retry_queue_name(queuename, delay), delay, queuename)
@@ -0,0 +1,67 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FieldNotification(object):
+    """
+    base class for the Vidispine notification documents, which carry their data as a "field" list of key/value pairs.
+    The list is indexed into a dictionary once, when the notification is constructed, so reading a field doesn't
+    scan it. Fields can be read as attributes, and are None if they are not present.
+    """
+    REQUIRED_FIELDS = []
+    invalid_message = "The provided json data is not a vidispine document"
+
+    def __init__(self, jsondict: dict):
+        self._content = jsondict
+        self._fields = self.index_fields(jsondict)
+        if jsondict is not None and not self.validate():
+            raise ValueError(self.invalid_message)
+
+    @staticmethod
+    def index_fields(jsondict: dict):
+        """
+        builds the dictionary of field values.  If a key appears more than once, the first value is used
+        :return: the dictionary, or None if the content does not have a list of key/value pairs
+        """
+        if jsondict is None:
+            return {}
+        try:
+            fields = {}
+            for entry in jsondict["field"]:
+                if entry["key"] not in fields:
+                    fields[entry["key"]] = entry["value"]
+            return fields
+        except (KeyError, TypeError):
+            return None
+
+    def __getattr__(self, item):
+        # only called for names that are not found in the normal way
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return self.get(item)
+
+    def get(self, key: str, default=None):
+        if self._fields is None:
+            return default
+        return self._fields.get(key, default)
+
+    def missing_fields(self) -> list:
+        """
+        returns the names of the REQUIRED_FIELDS that are not present
+        """
+        return [f for f in self.REQUIRED_FIELDS if f not in self._fields]
+
+    def validate(self):
+        """
+        Checks that the contained message contains the fields we are expecting, as defined by REQUIRED_FIELDS.
+        :return: a boolean indicating True for valid or False for invalid
+        """
+        if self._fields is None:
+            logger.warning("Invalid message {0}, missing required data structure".format(self._content))
+            return False
+        missing = self.missing_fields()
+        if len(missing) > 0:
+            logger.warning("Invalid message, missing field {0}".format(missing[0]))
+            return False
+        return True
@@ -1,52 +1,69 @@
 import re
 import logging
+from .field_notification import FieldNotification
 
 logger = logging.getLogger(__name__)
 
 pair_splitter = re.compile(r'^(\w{2}-\d+)=(.*)$')
 
 
-class JobNotification(object):
+class JobNotification(FieldNotification):
     """
     This class abstracts the Vidispine job notification document to allow for easier reading
     """
+    REQUIRED_FIELDS = ["jobId", "itemId", "status"]
+    invalid_message = "The provided json data is not a vidispine job document"
 
     def __init__(self, jsondict: dict):
-        self._content = jsondict
-        if jsondict is not None and not self.validate():
-            raise ValueError("The provided json data is not a vidispine job document")
-
-    def __getattr__(self, item):
-        for entry in self._content["field"]:
-            if entry["key"]==item:
-                return entry["value"]
-        return None
+        self._file_paths = None
+        self._file_paths_parsed = False
+        super(JobNotification, self).__init__(jsondict)
 
     def __str__(self):
         return "{type} job for {filename} by {user}".format(type=self.type,filename=self.originalFilename,user=self.username)
 
-    REQUIRED_FIELDS = ["jobId", "itemId", "status"]
-    def validate(self):
-        """
-        Checks that the contained message contains the fields we are expecting, as defined by the static list JobNotification.REQUIRED_FIELDS.
-        :return: a boolean indicating True for valid or False for invalid
-        """
-        try:
-            for f in self.REQUIRED_FIELDS:
-               for entry in self._content["field"]:
-                  if entry["key"] == f:
-                      return True
-               logger.warning("Invalid message, missing field {0}".format(f))
-            return False
-        except KeyError:
-            logger.warning("Invalid message {0}, missing required data structure".format(self._content))
-            return False
+    @property
+    def jobId(self) -> str:
+        return self.get("jobId")
+
+    @property
+    def itemId(self) -> str:
+        return self.get("itemId")
+
+    @property
+    def fileId(self) -> str:
+        return self.get("fileId")
+
+    @property
+    def status(self) -> str:
+        return self.get("status")
+
+    @property
+    def type(self) -> str:
+        return self.get("type")
+
+    @property
+    def filePathMap(self) -> str:
+        return self.get("filePathMap")
+
+    def missing_fields(self) -> list:
+        # a job notification has always been accepted if it carries any one of the required fields
+        if any(f in self._fields for f in self.REQUIRED_FIELDS):
+            return []
+        return list(self.REQUIRED_FIELDS)
 
     def file_paths(self):
         """
-        Returns a dictionary of relative file path/file ID pairs, from the filePathMap parameter
+        Returns a dictionary of relative file path/file ID pairs, from the filePathMap parameter.
+        This is parsed the first time that it is asked for, and the same dictionary is returned after that
         :return: dictionary
         """
+        if not self._file_paths_parsed:
+            self._file_paths = self._parse_file_paths()
+            self._file_paths_parsed = True
+        return self._file_paths
+
+    def _parse_file_paths(self):
         if self.filePathMap is None:
             return None
 
@@ -0,0 +1,26 @@
+from .MessageProcessor import MessageProcessor
+import logging
+from gnm_deliverables.launch_detector import LaunchDetectorUpdate, DEFERRED_UPDATE_ROUTING_KEY, apply_update
+from gnm_deliverables.models import DeliverableAsset
+
+logger = logging.getLogger(__name__)
+
+
+class LaunchDetectorUpdateProcessor(MessageProcessor):
+    """
+    applies the launch detector updates that LaunchDetectorUpdateView could not apply when they arrived, because
+    there was no asset for the atom yet.  If there still isn't one, the message goes round the delayed-retry queues
+    until there is, or until the retries are used up and it is dead-lettered.
+    """
+    routing_key = DEFERRED_UPDATE_ROUTING_KEY
+    schema = LaunchDetectorUpdate.schema
+    receive_delay = 3
+
+    def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body):
+        msg = LaunchDetectorUpdate(body)
+        try:
+            asset = apply_update(msg)
+        except DeliverableAsset.DoesNotExist:
+            logger.warning("Still could not find a deliverable asset matching the atom id {0}".format(msg.atom_id))
+            raise
+        logger.info("Applied deferred launch detector update for {0} to asset {1}".format(msg.atom_id, asset.pk))
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Model, TextField, IntegerField, FloatField, UUIDField
+from django.core.validators import RegexValidator
+from rest_framework.parsers import JSONParser
+from rest_framework.serializers import ModelSerializer
+from rabbitmq.messages import AtomResponderMessage
+import io
+import json
+import timeit
+import uuid
+
+
+class LegacyAtomResponderMessage(Model):
+    """
+    the model that atom responder messages used to be validated through, kept here to compare against
+    """
+    title = TextField(max_length=32768)
+    type = TextField(max_length=128)
+    projectId = TextField(max_length=128, null=True, blank=True)
+    atomId = UUIDField()
+    jobId = TextField(max_length=128, validators=[RegexValidator(r'^\w{2}-\d+')], null=True, blank=True)
+    itemId = TextField(max_length=128)
+    commissionId = IntegerField(null=True, blank=True)
+    size = IntegerField(null=True, blank=True)
+    mtime = FloatField(null=True, blank=True)
+    ctime = FloatField(null=True, blank=True)
+    atime = FloatField(null=True, blank=True)
+    path = TextField(max_length=2048)
+
+    class Meta:
+        app_label = "rabbitmq"
+        managed = False
+
+
+class LegacyAtomMessageSerializer(ModelSerializer):
+    class Meta:
+        model = LegacyAtomResponderMessage
+        fields = "__all__"
+
+
+class Command(BaseCommand):
+    """
+    Management command to compare the per-message cost of decoding atom responder messages with the
+    rabbitmq.messages decoders against the JSONParser + ModelSerializer + Model path that they replaced.  Needs no
+    database or broker.
+    """
+    help = "Benchmark message decoding"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000, help="Number of messages to decode per run")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the fastest is reported")
+
+    @staticmethod
+    def sample_messages(count: int) -> list:
+        return [json.dumps({
+            "title": "Master {0}".format(i),
+            "type": "video-upload",
+            "projectId": str(1000 + i),
+            "atomId": str(uuid.uuid4()),
+            "jobId": "VX-{0}".format(5000 + i),
+            "itemId": "VX-{0}".format(2000 + i),
+            "commissionId": 10 + i % 7,
+            "size": 1024 * 1024 * i,
+            "mtime": 1614834367.123,
+            "ctime": 1614834367.123,
+            "atime": 1614834367.123,
+            "path": "/srv/media/master{0}.mp4".format(i),
+        }).encode("UTF-8") for i in range(count)]
+
+    def handle(self, *args, **options):
+        messages = self.sample_messages(options["messages"])
+
+        def run_serializer():
+            for body in messages:
+                serializer = LegacyAtomMessageSerializer(data=JSONParser().parse(stream=io.BytesIO(body)))
+                if not serializer.is_valid():
+                    raise ValueError(str(serializer.errors))
+                LegacyAtomResponderMessage(**serializer.validated_data)
+
+        def run_decoder():
+            for body in messages:
+                AtomResponderMessage(**AtomResponderMessage.validate(json.loads(body.decode("UTF-8"))))
+
+        serializer_time = min(timeit.repeat(run_serializer, number=1, repeat=options["repeat"]))
+        decoder_time = min(timeit.repeat(run_decoder, number=1, repeat=options["repeat"]))
+        self.stdout.write("ModelSerializer: {0:.1f}us per message".format(serializer_time * 1e6 / len(messages)))
+        self.stdout.write("decoder: {0:.1f}us per message".format(decoder_time * 1e6 / len(messages)))
+        self.stdout.write("decoder is {0:.1f}x faster".format(serializer_time / decoder_time))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from gnm_deliverables.schema_validation import validate
+from rabbitmq.vidispine_message_processor import VidispineMessageProcessor
+import jsonschema
+import timeit
+
+
+class Command(BaseCommand):
+    """
+    Management command to compare the speed of jsonschema.validate, which compiles the schema every time, with the
+    cached validators in gnm_deliverables.schema_validation, on sample Vidispine job notifications.  Needs no
+    database or broker.
+    """
+    help = "Benchmark json schema validation of Vidispine job notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000, help="Number of notifications to validate per run")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the fastest is reported")
+
+    @staticmethod
+    def sample_notifications(count: int) -> list:
+        statuses = ["READY", "STARTED", "FINISHED", "FINISHED_WARNING", "FAILED_TOTAL"]
+        return [{"field": [
+            {"key": "jobId", "value": "VX-{0}".format(10000 + i)},
+            {"key": "itemId", "value": "VX-{0}".format(2000 + i % 50)},
+            {"key": "status", "value": statuses[i % len(statuses)]},
+            {"key": "type", "value": "TRANSCODE" if i % 2 else "ESSENCE_VERSION"},
+            {"key": "user", "value": "admin"},
+            {"key": "started", "value": "2021-03-04T05:06:07.123Z"},
+            {"key": "filePathMap", "value": "VX-{0}=media/file{0}.mp4".format(i)},
+            {"key": "originalFilename", "value": "file{0}.mp4".format(i)},
+        ]} for i in range(count)]
+
+    def handle(self, *args, **options):
+        schema = VidispineMessageProcessor.schema
+        messages = self.sample_notifications(options["messages"])
+
+        def run_uncached():
+            for msg in messages:
+                jsonschema.validate(msg, schema)
+
+        def run_cached():
+            for msg in messages:
+                validate(msg, schema)
+
+        uncached = min(timeit.repeat(run_uncached, number=1, repeat=options["repeat"]))
+        cached = min(timeit.repeat(run_cached, number=1, repeat=options["repeat"]))
+        self.stdout.write("jsonschema.validate: {0:.1f}us per message".format(uncached * 1e6 / len(messages)))
+        self.stdout.write("cached validator: {0:.1f}us per message".format(cached * 1e6 / len(messages)))
+        self.stdout.write("cached validator is {0:.1f}x faster".format(uncached / cached))
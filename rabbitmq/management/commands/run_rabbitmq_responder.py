@@ -2,11 +2,17 @@ from django.core.management.base import BaseCommand
 import logging
 import pika
 from django.conf import settings
-import re
+from django.db import connections
 from functools import partial
+import os
 import sys
 import signal
-from rabbitmq.declaration import declare_rabbitmq_setup
+import threading
+import time
+from rabbitmq.declaration import declare_rabbitmq_setup, declare_retry_queues, declare_holding_queue, delay_queue_name
+from rabbitmq.batching import BatchCollector
+from rabbitmq.sharding import ShardRouter, restore_delivery, shard_queue_name
+from rabbitmq.worker_pool import OrderedWorkerPool, make_dispatcher, make_batch_dispatcher
 logger = logging.getLogger(__name__)
 
 
@@ -17,35 +23,100 @@ class Command(BaseCommand):
         super(Command, self).__init__(*args,**kwargs)
         self.exit_code = 0
         self.runloop = None
+        self.connection = None
+        self.worker_pool = False
+        self.pools = []
+        self.collectors = []
+        self.consumers = []     # (channel, consumer_tag) for each queue that we consume from
+        self.shards = 0
+        self.shard = None       # the shard that this process handles, if it is a shard worker
+        self.children = []      # process ids of the shard workers, if this is the supervisor
+        self.draining = False
+
+    def add_arguments(self, parser):
+        parser.add_argument("--worker-pool", action="store_true", default=False,
+                            help="Process messages on a pool of worker threads for each handler, instead of on the "
+                                 "connection's ioloop. Set the size of each pool with RABBITMQ_HANDLER_CONCURRENCY")
+        parser.add_argument("--shards", type=int, default=0,
+                            help="Fork this many worker processes, each with its own connection. This process then "
+                                 "only routes each message to a worker by a consistent hash of its jobId, itemId or "
+                                 "atomId, so that messages about the same asset are still handled in order")
 
     @staticmethod
-    def connect_channel(exchange_name, handler, channel):
+    def queue_arguments() -> dict:
+        return {
+            'x-message-ttl': getattr(settings,"RABBITMQ_QUEUE_TTL", 5000),
+            'x-dead-letter-exchange': "deliverables-dlx"
+        }
+
+    def message_callback(self, handler, channel, pool=None):
+        """
+        returns the basic_consume callback for the given handler, which depends on whether it is batched and whether
+        it runs on a worker pool
+        :param handler: a MessageProcessor instance
+        :param channel: channel that the handler consumes from
+        :param pool: OrderedWorkerPool to run the handler on, or None to run it on the ioloop
+        :return:
+        """
+        if handler.batch_limit() > 1:
+            if pool is not None:
+                dispatch = make_batch_dispatcher(handler, pool, channel.connection, channel,
+                                                 on_failure=self.handler_failed)
+            else:
+                dispatch = partial(handler.raw_batch_receive, channel)
+            collector = BatchCollector(handler, channel.connection.ioloop, dispatch)
+            self.collectors.append(collector)
+            return collector.on_message
+        elif pool is not None:
+            return make_dispatcher(handler, pool, channel.connection, on_failure=self.handler_failed)
+        else:
+            return handler.raw_message_receive
+
+    def connect_channel(self, exchange_name, handler, channel, pool=None):
         """
         async callback that is used to connect a channel once it has been declared
         :param channel: channel to set up
         :param exchange_name: str name of the exchange to connect to
         :param handler: a MessageProcessor class (NOT instance)
+        :param pool: OrderedWorkerPool to process the messages on in worker-pool mode
         :return:
         """
         logger.info("Establishing connection to exchange {0} from {1}...".format(exchange_name, handler.__class__.__name__))
-        sanitised_routingkey = re.sub(r'[^\w\d]', '', handler.routing_key)
 
         declare_rabbitmq_setup(channel)
-        queuename = "deliverables-{0}".format(sanitised_routingkey)
+        queuename = handler.queue_name()
         channel.queue_declare("deliverables-dlq", durable=True)
         channel.queue_bind("deliverables-dlq","deliverables-dlx")
 
-        channel.queue_declare(queuename, arguments={
-            'x-message-ttl': getattr(settings,"RABBITMQ_QUEUE_TTL", 5000),
-            'x-dead-letter-exchange': "deliverables-dlx"
-        })
+        channel.queue_declare(queuename, arguments=self.queue_arguments())
         channel.queue_bind(queuename, exchange_name, routing_key=handler.routing_key)
-        channel.basic_consume(queuename,
-                              handler.raw_message_receive,
+        # messages that fail are retried through these, which return them to the handler's queue. In sharded mode
+        # that is the supervisor's queue, which routes them to the same shard again
+        declare_retry_queues(channel, queuename)
+        if handler.receive_delay:
+            declare_holding_queue(channel, delay_queue_name(queuename, handler.receive_delay), handler.receive_delay,
+                                  queuename)
+        for shard in range(self.shards):
+            channel.queue_declare(shard_queue_name(queuename, shard), arguments=self.queue_arguments())
+        channel.basic_qos(prefetch_count=handler.prefetch())
+
+        if self.shards > 0 and self.shard is None:
+            # supervisor, route the messages to the shard workers
+            callback = ShardRouter(handler, queuename, self.shards).on_message
+        else:
+            if self.shard is not None:
+                # shard worker, handle the messages that the supervisor routed to us
+                queuename = shard_queue_name(queuename, self.shard)
+            # messages that were routed to a shard or retried come back with a different exchange and routing key
+            callback = restore_delivery(self.message_callback(handler, channel, pool))
+
+        consumer_tag = channel.basic_consume(queuename,
+                              callback,
                               auto_ack=False,
                               exclusive=False,
                               callback=lambda consumer: logger.info("Consumer started for {0} from {1}".format(queuename, exchange_name)),
                               )
+        self.consumers.append((channel, consumer_tag))
 
     def channel_opened(self, connection):
         """
@@ -57,16 +128,26 @@ class Command(BaseCommand):
         from rabbitmq.mappings import EXCHANGE_MAPPINGS
         logger.info("Connection opened")
         for i in range(0, len(EXCHANGE_MAPPINGS)):
+            handler = EXCHANGE_MAPPINGS[i]["handler"]
+            pool = None
+            if self.worker_pool and not (self.shards > 0 and self.shard is None):
+                pool = OrderedWorkerPool(handler.__class__.__name__, handler.pool_size())
+                self.pools.append(pool)
+                logger.info("Processing messages for {0} on {1} threads".format(handler.__class__.__name__,
+                                                                                len(pool.lanes)))
             # partial adjusts the argument list, adding the args here onto the _start_ of the list
             # so the args are (exchange, handler, channel) not (channel, exchange, handler)
-            chl = connection.channel(on_open_callback=partial(Command.connect_channel,
+            chl = connection.channel(on_open_callback=partial(self.connect_channel,
                                                               EXCHANGE_MAPPINGS[i]["exchange"],
-                                                              EXCHANGE_MAPPINGS[i]["handler"]),
+                                                              handler,
+                                                              pool=pool),
                                      )
             chl.add_on_close_callback(self.channel_closed)
             chl.add_on_cancel_callback(self.channel_closed)
 
     def channel_closed(self, connection, error=None):
+        if self.draining:
+            return
         logger.error("RabbitMQ connection failed: {0}".format(str(error)))
         self.exit_code = 1
         self.runloop.stop()
@@ -79,11 +160,94 @@ class Command(BaseCommand):
         :param error:
         :return:
         """
-        logger.error("RabbitMQ connection failed: {0}".format(str(error)))
-        self.exit_code = 1
+        if not self.draining:
+            logger.error("RabbitMQ connection failed: {0}".format(str(error)))
+            self.exit_code = 1
         connection.ioloop.stop()
 
+    def handler_failed(self):
+        """
+        ioloop callback for when a handler on a worker pool fails permanently.  Its consumer has been cancelled, so
+        shut down with an error rather than carrying on without it; this then gets detected as a crash-loop state, as
+        it is when a handler raises on the ioloop
+        """
+        if self.draining:
+            return
+        logger.error("A message handler failed, shutting down")
+        self.exit_code = 1
+        self.begin_drain()
+
+    def check_children(self):
+        """
+        ioloop timer in the supervisor that reaps shard workers that have exited. If one exits by itself, the
+        supervisor shuts the others down and exits with an error, so that the crash-loop gets detected
+        """
+        for pid in list(self.children):
+            exited_pid, status = os.waitpid(pid, os.WNOHANG)
+            if exited_pid == 0:
+                continue
+            self.children.remove(pid)
+            if not self.draining:
+                logger.error("Shard worker {0} exited unexpectedly with status {1}".format(pid, status))
+                self.exit_code = 1
+                self.begin_drain()
+        if len(self.children) > 0:
+            self.runloop.call_later(1, self.check_children)
+
+    def begin_drain(self):
+        """
+        stops consuming, then waits in the background for the messages that have already been received to be
+        processed and acked (and for the shard workers to do the same) before closing the connection.
+        must be called on the ioloop
+        :return:
+        """
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Draining, no more messages will be accepted")
+        for channel, consumer_tag in self.consumers:
+            if channel.is_open:
+                # the broker re-queues anything it had sent us but we had not started on
+                channel.basic_cancel(consumer_tag)
+        for collector in self.collectors:
+            collector.flush()
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        threading.Thread(target=self.wait_for_drain, daemon=True).start()
+
+    def wait_for_drain(self):
+        deadline = time.monotonic() + getattr(settings, "RABBITMQ_DRAIN_TIMEOUT", 30)
+        for pool in self.pools:
+            if not pool.drain(timeout=max(0, deadline - time.monotonic())):
+                logger.warning("Timed out waiting for messages in progress to finish")
+        while len(self.children) > 0 and time.monotonic() < deadline:
+            time.sleep(0.2)
+        if len(self.children) > 0:
+            logger.warning("Timed out waiting for shard workers {0} to exit".format(self.children))
+        self.connection.add_callback_threadsafe(self.connection.close)
+
+    def fork_shard_workers(self):
+        """
+        forks the shard worker processes.  Returns in the children as well as the parent, with self.shard set in
+        the children
+        """
+        # the workers must not share the supervisor's database connections
+        connections.close_all()
+        for shard in range(self.shards):
+            pid = os.fork()
+            if pid == 0:
+                self.shard = shard
+                self.children = []
+                return
+            self.children.append(pid)
+        logger.info("Started shard workers {0}".format(self.children))
+
     def handle(self, *args, **options):
+        self.worker_pool = options.get("worker_pool", False)
+        self.shards = options.get("shards", 0)
+        if self.shards > 0:
+            self.fork_shard_workers()
+
         connection = pika.SelectConnection(
             pika.ConnectionParameters(
                 host=settings.RABBITMQ_HOST,
@@ -98,15 +262,28 @@ class Command(BaseCommand):
             on_open_error_callback=self.connection_closed,
         )
 
+        self.connection = connection
         self.runloop = connection.ioloop
 
         def on_quit(signum, frame):
             logger.info("Caught signal {0}, exiting...".format(signum))
-            connection.ioloop.stop()
+            if self.draining:
+                # the shard workers get the signal from the terminal as well as from the supervisor
+                return
+            if not connection.is_open:
+                connection.ioloop.stop()
+            else:
+                # signal handlers can run in the middle of an ioloop callback, so do the work on the ioloop
+                connection.add_callback_threadsafe(self.begin_drain)
 
         signal.signal(signal.SIGINT, on_quit)
         signal.signal(signal.SIGTERM, on_quit)
+        if len(self.children) > 0:
+            connection.ioloop.call_later(1, self.check_children)
 
         connection.ioloop.start()
+        for pool in self.pools:
+            # messages that were still waiting have not been acked, so the broker will deliver them again
+            pool.shutdown(wait=True)
         logger.info("terminated")
-        sys.exit(self.exit_code)
\ No newline at end of file
+        sys.exit(self.exit_code)
@@ -4,8 +4,9 @@ from .vidispine_message_processor import VidispineMessageProcessor
 from .StoragetierArchivedMessageProcessor import StoragetierArchivedMessageProcessor
 from .CDSResponderProcessor import CDSResponderProcessor, CDSInvalidProcessor
 from .assetsweeper_message_processor import AssetSweeperMessageProcessor
-from .vidispine_item_processor import VidispineItemProcessor
+from .vidispine_item_processor import VidispineItemProcessor, VidispineItemCacheProcessor
 from .pluto_core_message_processor import PlutoCoreMessageProcessor
+from .launch_detector_processor import LaunchDetectorUpdateProcessor
 
 ##This structure is imported by name in the run_rabbitmq_responder
 EXCHANGE_MAPPINGS = [
@@ -41,8 +42,16 @@ EXCHANGE_MAPPINGS = [
         "exchange": 'vidispine-events',
         "handler": VidispineItemProcessor(),
     },
+    {
+        "exchange": 'vidispine-events',
+        "handler": VidispineItemCacheProcessor(),
+    },
     {
         "exchange": 'pluto-deliverables',
         "handler": PlutoCoreMessageProcessor(),
     },
+    {
+        "exchange": 'pluto-deliverables',
+        "handler": LaunchDetectorUpdateProcessor(),
+    },
 ]
@@ -0,0 +1,222 @@
+"""
+lightweight decoders for the messages that we receive from other services.  They apply the same rules that
+rest_framework's ModelSerializer applied to the unsaved models that used to describe these messages, without building
+model or serializer instances for every message.
+"""
+import re
+import uuid
+
+
+class MessageField(object):
+    """
+    describes one field of a message. Subclasses implement convert(), which returns the validated value or raises
+    ValueError with the reason
+    """
+    __slots__ = ("null", "key")
+
+    def __init__(self, null=False, key=None):
+        """
+        :param null: whether the field can be null or missing. Nullable text fields can also be blank
+        :param key: the field's key in the message, if it is not the same as the attribute name
+        """
+        self.null = null
+        self.key = key
+
+    def convert(self, value):
+        raise NotImplementedError()
+
+
+class TextField(MessageField):
+    __slots__ = ("max_length", "regex")
+
+    def __init__(self, max_length:int, regex:str=None, **kwargs):
+        super(TextField, self).__init__(**kwargs)
+        self.max_length = max_length
+        self.regex = re.compile(regex) if regex is not None else None
+
+    def convert(self, value):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError("Not a valid string.")
+        value = str(value).strip()
+        if value == "":
+            if self.null:
+                return value
+            raise ValueError("This field may not be blank.")
+        if len(value) > self.max_length:
+            raise ValueError("Ensure this field has no more than {0} characters.".format(self.max_length))
+        if self.regex is not None and not self.regex.search(value):
+            raise ValueError("Enter a valid value.")
+        return value
+
+
+class IntegerField(MessageField):
+    __slots__ = ()
+    decimal_suffix = re.compile(r'\.0*\s*$')
+    # the range of a postgres integer column
+    min_value = -2147483648
+    max_value = 2147483647
+
+    def convert(self, value):
+        if isinstance(value, str) and len(value) > 1000:
+            raise ValueError("String value too large.")
+        try:
+            value = int(self.decimal_suffix.sub('', str(value)))
+        except (TypeError, ValueError):
+            raise ValueError("A valid integer is required.")
+        if value < self.min_value:
+            raise ValueError("Ensure this value is greater than or equal to {0}.".format(self.min_value))
+        if value > self.max_value:
+            raise ValueError("Ensure this value is less than or equal to {0}.".format(self.max_value))
+        return value
+
+
+class FloatField(MessageField):
+    __slots__ = ()
+
+    def convert(self, value):
+        if isinstance(value, str) and len(value) > 1000:
+            raise ValueError("String value too large.")
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError("A valid number is required.")
+
+
+class BooleanField(MessageField):
+    __slots__ = ()
+    true_values = {'t', 'T', 'y', 'Y', 'yes', 'YES', 'true', 'True', 'TRUE', 'on', 'On', 'ON', '1', 1, True}
+    false_values = {'f', 'F', 'n', 'N', 'no', 'NO', 'false', 'False', 'FALSE', 'off', 'Off', 'OFF', '0', 0, False}
+
+    def convert(self, value):
+        try:
+            if value in self.true_values:
+                return True
+            if value in self.false_values:
+                return False
+        except TypeError:   # unhashable
+            pass
+        raise ValueError("Must be a valid boolean.")
+
+
+class UUIDField(MessageField):
+    __slots__ = ()
+
+    def convert(self, value):
+        if isinstance(value, uuid.UUID):
+            return value
+        try:
+            if isinstance(value, int) and not isinstance(value, bool):
+                return uuid.UUID(int=value)
+            if isinstance(value, str):
+                return uuid.UUID(hex=value)
+        except ValueError:
+            pass
+        raise ValueError("'{0}' is not a valid UUID.".format(value))
+
+
+class Message(object):
+    """
+    base class for a decoded message.  Subclasses set `fields` to a dictionary of attribute name to MessageField,
+    and `__slots__` to its keys
+    """
+    __slots__ = ()
+    fields = {}
+
+    def __init__(self, **kwargs):
+        for name in self.fields:
+            setattr(self, name, kwargs.get(name))
+
+    def __repr__(self):
+        return "{0}({1})".format(self.__class__.__name__,
+                                 ", ".join(["{0}={1!r}".format(name, getattr(self, name)) for name in self.fields]))
+
+    @classmethod
+    def validate(cls, content) -> dict:
+        """
+        validates the decoded json content of a message
+        :param content: dictionary decoded from the message
+        :return: a dictionary of attribute name to validated value, for the fields that are present
+        :raises ValueError: if the content does not validate, with the errors for each field
+        """
+        if not isinstance(content, dict):
+            raise ValueError(str({"non_field_errors": ["Invalid data. Expected a dictionary, but got {0}."
+                                                      .format(content.__class__.__name__)]}))
+        validated = {}
+        errors = {}
+        for name, field in cls.fields.items():
+            key = field.key or name
+            if key not in content:
+                if not field.null:
+                    errors[key] = ["This field is required."]
+                continue
+            value = content[key]
+            if value is None:
+                if field.null:
+                    validated[name] = None
+                else:
+                    errors[key] = ["This field may not be null."]
+                continue
+            try:
+                validated[name] = field.convert(value)
+            except ValueError as e:
+                errors[key] = [str(e)]
+        if len(errors) > 0:
+            raise ValueError(str(errors))
+        return validated
+
+
+class AtomResponderMessage(Message):
+    """
+    represents the message coming from atom responder.
+    """
+    fields = {
+        "title": TextField(max_length=32768),
+        "type": TextField(max_length=128),
+        "projectId": TextField(max_length=128, null=True),
+        "atomId": UUIDField(),
+        # these must be blankable to handle "project reassignment" messages
+        "jobId": TextField(max_length=128, regex=r'^\w{2}-\d+', null=True),
+        "itemId": TextField(max_length=128),  #sometimes this is set to the atom uuid
+        "commissionId": IntegerField(null=True),
+        "size": IntegerField(null=True),
+        "mtime": FloatField(null=True),
+        "ctime": FloatField(null=True),
+        "atime": FloatField(null=True),
+        "path": TextField(max_length=2048),
+    }
+    __slots__ = tuple(fields)
+
+
+class StoragetierSuccessMessage(Message):
+    """
+    represents the message coming from pluto-storagetier online->archive
+    """
+    fields = {
+        "archiveHunterID": TextField(max_length=32768),
+        "archiveHunterIDValidated": BooleanField(),
+        "originalFilePath": TextField(max_length=32768),
+        "uploadedBucket": TextField(max_length=128),
+        "uploadedPath": TextField(max_length=32768),
+        "uploadedVersion": IntegerField(null=True),
+        "vidispineItemId": TextField(max_length=128, null=True),
+        "vidispineVersionId": IntegerField(null=True),
+        "proxyBucket": TextField(max_length=128, null=True),
+        "proxyPath": TextField(max_length=32768, null=True),
+        "proxyVersion": IntegerField(null=True),
+        "metadataXML": TextField(max_length=32768, null=True),   # path to the XML, not the actual content!!
+        "metadataVersion": IntegerField(null=True),
+    }
+    __slots__ = tuple(fields)
+
+
+class CDSResponderMessage(Message):
+    """
+    represents the message coming from cdsresponder
+    """
+    fields = {
+        "job_name": TextField(max_length=128, key="job-name"),
+        "routename": TextField(max_length=256),
+        "deliverable_asset": TextField(max_length=128),
+        "deliverable_bundle": TextField(max_length=128),
+    }
+    __slots__ = tuple(fields)
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    the message models were never saved, they only existed for their serializers. They are replaced by the
+    classes in rabbitmq.messages
+    """
+    dependencies = [
+        ('rabbitmq', '0011_manual'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='AtomResponderMessage',
+        ),
+        migrations.DeleteModel(
+            name='StoragetierSuccessMessage',
+        ),
+        migrations.DeleteModel(
+            name='CDSResponderMessage',
+        ),
+    ]
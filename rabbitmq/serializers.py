@@ -1,28 +1,6 @@
-from rest_framework.serializers import Serializer, ModelSerializer, CharField, IntegerField
-from .models import AtomResponderMessage, StoragetierSuccessMessage, CDSResponderMessage
+from rest_framework.serializers import Serializer, CharField, IntegerField
 
 
 class MockSerializer(Serializer):
     id = IntegerField()
     title = CharField()
-
-
-class AtomMessageSerializer(ModelSerializer):
-    class Meta:
-        model = AtomResponderMessage
-        fields = "__all__"
-
-
-class StoragetierSuccessMessageSerializer(ModelSerializer):
-    class Meta:
-        model = StoragetierSuccessMessage
-        fields = "__all__"
-
-
-class CDSMessageSerializer(ModelSerializer):
-    class Meta:
-        model = CDSResponderMessage
-        fields = 'job-name', 'routename', 'deliverable_asset', 'deliverable_bundle'
-        extra_kwargs = {
-            'job-name': {'source': 'job_name'},
-        }
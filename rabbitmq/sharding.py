@@ -0,0 +1,77 @@
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+ORIGINAL_EXCHANGE_HEADER = "x-deliverables-exchange"
+ORIGINAL_ROUTING_KEY_HEADER = "x-deliverables-routing-key"
+
+
+def jump_hash(key:int, buckets:int) -> int:
+    """
+    Lamping and Veach's "jump" consistent hash. When the number of buckets goes from n to n+1, only 1/(n+1) of the
+    keys move, and they all move to the new bucket
+    :param key: 64-bit integer key
+    :param buckets: number of buckets
+    :return: bucket number from 0 to buckets-1
+    """
+    b = -1
+    j = 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def shard_for(key:str, shards:int) -> int:
+    """
+    returns the shard that handles messages with the given ordering key
+    """
+    # not hash(), which is randomised per process
+    digest = hashlib.blake2b(key.encode("UTF-8"), digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shards)
+
+
+def shard_queue_name(queuename:str, shard:int) -> str:
+    return "{0}-shard-{1}".format(queuename, shard)
+
+
+class ShardRouter(object):
+    """
+    basic_consume callback for the supervisor, which moves each message from a handler's queue onto the shard queue
+    picked by the message's ordering key.  The exchange and routing key that the message originally came in on are
+    kept in headers so that the shard worker can restore them with restore_delivery
+    """
+    def __init__(self, handler, queuename:str, shards:int):
+        self.handler = handler
+        self.queuename = queuename
+        self.shards = shards
+
+    def on_message(self, channel, method, properties, body):
+        headers = dict(properties.headers or {})
+        # a message coming back from a retry queue already has them
+        headers.setdefault(ORIGINAL_EXCHANGE_HEADER, method.exchange)
+        headers.setdefault(ORIGINAL_ROUTING_KEY_HEADER, method.routing_key)
+        properties.headers = headers
+        shard = shard_for(self.handler.ordering_key(headers[ORIGINAL_ROUTING_KEY_HEADER], body), self.shards)
+
+        channel.basic_publish(exchange="", routing_key=shard_queue_name(self.queuename, shard), body=body,
+                              properties=properties)
+        # the publish and the ack go over the same channel in order, so the broker has queued the copy before it
+        # drops the original
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def restore_delivery(callback):
+    """
+    wraps a basic_consume callback so that it sees the exchange and routing key that the message was originally sent
+    with, rather than the ones that ShardRouter or a retry queue re-sent it with
+    """
+    def on_message(channel, method, properties, body):
+        headers = getattr(properties, "headers", None) or {}
+        if ORIGINAL_ROUTING_KEY_HEADER in headers:
+            method.exchange = headers[ORIGINAL_EXCHANGE_HEADER]
+            method.routing_key = headers[ORIGINAL_ROUTING_KEY_HEADER]
+        return callback(channel, method, properties, body)
+    return on_message
@@ -0,0 +1,65 @@
+from django.test import TestCase
+from gnm_deliverables.models import DeliverableAsset
+from rabbitmq.launch_detector_processor import LaunchDetectorUpdateProcessor
+
+
+class TestLaunchDetectorUpdateProcessor(TestCase):
+    fixtures = [
+        "users",
+        "assets",
+        "bundles",
+    ]
+
+    @staticmethod
+    def make_update(atom_id):
+        return {
+            'title': 'deferred update',
+            'category': 'News',
+            'atomId': atom_id,
+            'duration': 75,
+            'source': None,
+            'description': None,
+            'posterImage': None,
+            'trailText': None,
+            'byline': [],
+            'keywords': ["a", "b"],
+            'trailImage': None,
+            'commissionId': '10',
+            'projectId': '60',
+            'masterId': None,
+            'published': None,
+            'lastModified': None,
+            'ytMeta': {
+                'categoryId': '73',
+                'channelId': 'abcdefg',
+                'expiryDate': None,
+                'keywords': ["a", "b"],
+                'privacyStatus': 'Public',
+                'license': None,
+                'title': "Some youtube title",
+                'description': "Some youtube description"
+            },
+            'assets': [],
+        }
+
+    def test_apply(self):
+        """
+        LaunchDetectorUpdateProcessor should apply a deferred update to the asset for the atom
+        """
+        to_test = LaunchDetectorUpdateProcessor()
+        to_test.valid_message_receive("pluto-deliverables", "deliverables.launchdetector.update", 1,
+                                      self.make_update("ed94ddcb-1a9a-4081-89c2-432c7db123d9"))
+
+        updated_item = DeliverableAsset.objects.get(pk=674)
+        self.assertIsNotNone(updated_item.gnm_website_master)
+        self.assertIsNotNone(updated_item.mainstream_master)
+        self.assertEqual(updated_item.mainstream_master.mainstream_tags, ["a", "b"])
+
+    def test_still_missing(self):
+        """
+        LaunchDetectorUpdateProcessor should raise if there is still no asset, so that the message is retried
+        """
+        to_test = LaunchDetectorUpdateProcessor()
+        with self.assertRaises(DeliverableAsset.DoesNotExist):
+            to_test.valid_message_receive("pluto-deliverables", "deliverables.launchdetector.update", 1,
+                                          self.make_update("1d2fa1ae-6f63-4e5c-9b67-3d0c5b8e2f11"))
@@ -36,6 +36,32 @@ class TestMessageProcessorRawReceive(TestCase):
         mock_channel.basic_nack.assert_not_called()
         mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
 
+    def test_raw_receive_decoder(self):
+        """
+        if the processor has a decoder, raw_receive should validate the message with it and pass on the decoded fields
+        :return:
+        """
+        from rabbitmq.messages import CDSResponderMessage
+
+        class TestProcessor(MessageProcessor):
+            decoder = CDSResponderMessage
+
+        to_test = TestProcessor()
+        to_test.valid_message_receive = MagicMock()
+
+        mock_channel = MagicMock(target=pika.channel.Channel)
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = "exchange_name"
+        mock_method.delivery_tag = "deltag"
+        mock_method.routing_key = "routing.key"
+        mock_content = b"""[{"job-name":"job","routename":"route","deliverable_asset":"1","deliverable_bundle":"2"}]"""
+
+        to_test.raw_message_receive(mock_channel, mock_method, {}, mock_content)
+        to_test.valid_message_receive.assert_called_once_with("exchange_name", "routing.key", "deltag",
+                                                              {"job_name": "job", "routename": "route",
+                                                               "deliverable_asset": "1", "deliverable_bundle": "2"})
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
+
     def test_raw_receieve_invalid_commissiondata(self):
         """
         on receiving data, raw_receive should validate it with the given serializer nack the message
@@ -64,11 +90,13 @@ class TestMessageProcessorRawReceive(TestCase):
     def test_raw_receieve_processingerror(self):
         """
         on receiving data, raw_receive should validate it with the given serializer then call
-        valid_message_receive to process it; if this fails then it should nack the message with requeue
+        valid_message_receive to process it; if this fails then it should send the message to the first retry queue
+        and ack it, without cancelling the consumer
         :return:
         """
         class TestProcessor(MessageProcessor):
             serializer = MockSerializer
+            routing_key = "routing.key"
 
         to_test = TestProcessor()
         to_test.valid_message_receive = MagicMock(side_effect=ValueError("too slow!"))
@@ -81,12 +109,185 @@ class TestMessageProcessorRawReceive(TestCase):
         mock_properties = {}
         mock_content = b"""{"id":12345,"title":"Some title","junk_field":"junk"}"""
 
-        with self.assertRaises(ValueError):
-            to_test.raw_message_receive(mock_channel, mock_method, mock_properties, mock_content)
-            to_test.valid_message_receive.assert_called_once_with("exchange_name",
-                                                                  "routing.key",
-                                                                  "deltag",
-                                                                  OrderedDict([('id', 12345), ('title', 'Some title')])
-                                                                  )
-            mock_channel.basic_ack.assert_not_called()
-            mock_channel.basic_nack.assert_called_once_with(delivery_tag="deltag", requeue=True)
\ No newline at end of file
+        to_test.raw_message_receive(mock_channel, mock_method, mock_properties, mock_content)
+        to_test.valid_message_receive.assert_called_once_with("exchange_name",
+                                                              "routing.key",
+                                                              "deltag",
+                                                              OrderedDict([('id', 12345), ('title', 'Some title')])
+                                                              )
+        kwargs = mock_channel.basic_publish.call_args[1]
+        self.assertEqual(kwargs["exchange"], "")
+        self.assertEqual(kwargs["routing_key"], "deliverables-routingkey-retry-5s")
+        self.assertEqual(kwargs["body"], mock_content)
+        self.assertEqual(kwargs["properties"].headers, {"x-deliverables-retry-count": 1,
+                                                        "x-deliverables-exchange": "exchange_name",
+                                                        "x-deliverables-routing-key": "routing.key"})
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
+        mock_channel.basic_nack.assert_not_called()
+        mock_channel.basic_cancel.assert_not_called()
+
+    def test_raw_receieve_retries_used_up(self):
+        """
+        once a message has been through all of the retry queues, it should go to the dead-letter queue
+        :return:
+        """
+        class TestProcessor(MessageProcessor):
+            serializer = MockSerializer
+            routing_key = "routing.key"
+
+        to_test = TestProcessor()
+        to_test.valid_message_receive = MagicMock(side_effect=ValueError("too slow!"))
+
+        mock_channel = MagicMock(target=pika.channel.Channel)
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = "exchange_name"
+        mock_method.delivery_tag = "deltag"
+        mock_method.routing_key = "routing.key"
+        mock_properties = pika.BasicProperties(headers={"x-deliverables-retry-count": 3})
+        mock_content = b"""{"id":12345,"title":"Some title"}"""
+
+        to_test.raw_message_receive(mock_channel, mock_method, mock_properties, mock_content)
+        kwargs = mock_channel.basic_publish.call_args[1]
+        self.assertEqual(kwargs["exchange"], "deliverables-dlx")
+        self.assertEqual(kwargs["routing_key"], "deliverables-dlq")
+        self.assertEqual(kwargs["properties"].headers["x-deliverables-retry-count"], 3)
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
+        mock_channel.basic_cancel.assert_not_called()
+
+    def test_raw_receive_delayed(self):
+        """
+        with a receive_delay, a new message should be sent to the delay queue and acked without being processed,
+        and processed when it comes back
+        :return:
+        """
+        class TestProcessor(MessageProcessor):
+            serializer = MockSerializer
+            routing_key = "routing.key"
+            receive_delay = 2
+
+        to_test = TestProcessor()
+        to_test.valid_message_receive = MagicMock()
+
+        mock_channel = MagicMock(target=pika.channel.Channel)
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = "exchange_name"
+        mock_method.delivery_tag = "deltag"
+        mock_method.routing_key = "routing.key"
+        mock_content = b"""{"id":12345,"title":"Some title"}"""
+
+        to_test.raw_message_receive(mock_channel, mock_method, pika.BasicProperties(), mock_content)
+        to_test.valid_message_receive.assert_not_called()
+        kwargs = mock_channel.basic_publish.call_args[1]
+        self.assertEqual(kwargs["exchange"], "")
+        self.assertEqual(kwargs["routing_key"], "deliverables-routingkey-delay-2s")
+        headers = kwargs["properties"].headers
+        self.assertEqual(headers["x-deliverables-delayed"], 1)
+        self.assertEqual(headers["x-deliverables-routing-key"], "routing.key")
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
+
+        mock_channel.reset_mock()
+        to_test.raw_message_receive(mock_channel, mock_method, pika.BasicProperties(headers=headers), mock_content)
+        to_test.valid_message_receive.assert_called_once()
+        mock_channel.basic_publish.assert_not_called()
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag="deltag")
+
+class TestMessageProcessorBatchReceive(TestCase):
+    @staticmethod
+    def make_delivery(tag, content):
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = "exchange_name"
+        mock_method.delivery_tag = tag
+        mock_method.routing_key = "routing.key"
+        mock_method.consumer_tag = "consumer"
+        return mock_method, {}, content
+
+    def test_batch_receive_valid(self):
+        """
+        raw_batch_receive should pass the valid messages to valid_batch_receive together, nack the invalid one on its
+        own and then ack the rest with multiple=True
+        :return:
+        """
+        class TestProcessor(MessageProcessor):
+            serializer = MockSerializer
+
+        to_test = TestProcessor()
+        to_test.valid_batch_receive = MagicMock()
+        mock_channel = MagicMock(target=pika.channel.Channel)
+
+        to_test.raw_batch_receive(mock_channel, [
+            self.make_delivery(1, b"""{"id":1,"title":"first"}"""),
+            self.make_delivery(2, b"""{"commisid":2,"title":"invalid"}"""),
+            self.make_delivery(3, b"""{"id":3,"title":"third"}"""),
+        ])
+        to_test.valid_batch_receive.assert_called_once_with("exchange_name", [
+            ("routing.key", 1, OrderedDict([('id', 1), ('title', 'first')])),
+            ("routing.key", 3, OrderedDict([('id', 3), ('title', 'third')])),
+        ])
+        mock_channel.basic_nack.assert_called_once_with(delivery_tag=2, requeue=False)
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag=3, multiple=True)
+
+    def test_batch_receive_processingerror(self):
+        """
+        if valid_batch_receive fails, raw_batch_receive should retry each message in the batch
+        :return:
+        """
+        class TestProcessor(MessageProcessor):
+            serializer = MockSerializer
+            routing_key = "routing.key"
+
+        to_test = TestProcessor()
+        to_test.valid_message_receive = MagicMock(side_effect=ValueError("too slow!"))
+        mock_channel = MagicMock(target=pika.channel.Channel)
+
+        to_test.raw_batch_receive(mock_channel, [
+            self.make_delivery(1, b"""{"id":1,"title":"first"}"""),
+            self.make_delivery(2, b"""{"id":2,"title":"second"}"""),
+        ])
+        self.assertEqual([c[1]["routing_key"] for c in mock_channel.basic_publish.call_args_list],
+                         ["deliverables-routingkey-retry-5s", "deliverables-routingkey-retry-5s"])
+        self.assertEqual([c[1] for c in mock_channel.basic_ack.call_args_list],
+                         [{"delivery_tag": 1}, {"delivery_tag": 2}])
+        mock_channel.basic_nack.assert_not_called()
+        mock_channel.basic_cancel.assert_not_called()
+
+    def test_batch_collector(self):
+        """
+        BatchCollector should pass a batch on once it is full, or when the timeout fires
+        :return:
+        """
+        from rabbitmq.batching import BatchCollector
+
+        class TestProcessor(MessageProcessor):
+            batch_size = 2
+
+        mock_ioloop = MagicMock()
+        dispatch = MagicMock()
+        to_test = BatchCollector(TestProcessor(), mock_ioloop, dispatch)
+
+        to_test.on_message(None, "method1", {}, b"1")
+        to_test.on_message(None, "method2", {}, b"2")
+        dispatch.assert_called_once_with([("method1", {}, b"1"), ("method2", {}, b"2")])
+        mock_ioloop.remove_timeout.assert_called_once()
+
+        to_test.on_message(None, "method3", {}, b"3")
+        self.assertEqual(dispatch.call_count, 1)
+        delay, callback = mock_ioloop.call_later.call_args_list[-1][0]
+        self.assertEqual(delay, 0.2)
+        callback()
+        dispatch.assert_called_with([("method3", {}, b"3")])
+
+    def test_prefetch(self):
+        """
+        prefetch should never be less than the batch size
+        :return:
+        """
+        from django.test import override_settings
+
+        class TestProcessor(MessageProcessor):
+            prefetch_count = 10
+
+        self.assertEqual(TestProcessor().prefetch(), 10)
+        with override_settings(RABBITMQ_HANDLER_BATCH_SIZE={"TestProcessor": 25}):
+            self.assertEqual(TestProcessor().prefetch(), 25)
+        with override_settings(RABBITMQ_HANDLER_PREFETCH={"TestProcessor": 5}):
+            self.assertEqual(TestProcessor().prefetch(), 5)
@@ -0,0 +1,94 @@
+from django.test import TestCase
+from rabbitmq.messages import AtomResponderMessage, StoragetierSuccessMessage, CDSResponderMessage
+from uuid import UUID
+
+
+class TestAtomResponderMessage(TestCase):
+    valid_content = {
+        "title": " Some title ",
+        "type": "video-upload",
+        "projectId": "",
+        "atomId": "b98cf3c2-f56f-4a01-a2c8-acac4ad1e8d7",
+        "jobId": "VX-1234",
+        "itemId": "VX-5678",
+        "commissionId": "12.0",
+        "size": 1234,
+        "mtime": "1614834367.5",
+        "path": "/path/to/file.mp4",
+        "unknownField": "ignored",
+    }
+
+    def test_validate(self):
+        """
+        validate should convert the fields in the same way that the ModelSerializer did, and leave out the missing
+        nullable ones
+        """
+        result = AtomResponderMessage.validate(self.valid_content)
+        self.assertEqual(result, {
+            "title": "Some title",
+            "type": "video-upload",
+            "projectId": "",
+            "atomId": UUID("b98cf3c2-f56f-4a01-a2c8-acac4ad1e8d7"),
+            "jobId": "VX-1234",
+            "itemId": "VX-5678",
+            "commissionId": 12,
+            "size": 1234,
+            "mtime": 1614834367.5,
+            "path": "/path/to/file.mp4",
+        })
+
+        msg = AtomResponderMessage(**result)
+        self.assertEqual(msg.commissionId, 12)
+        self.assertIsNone(msg.ctime)
+
+    def test_invalid(self):
+        """
+        validate should report every field that is wrong
+        """
+        content = dict(self.valid_content)
+        content.update({"atomId": "not-a-uuid", "jobId": "1234", "size": 12.5, "type": None})
+        del content["path"]
+        with self.assertRaises(ValueError) as raised:
+            AtomResponderMessage.validate(content)
+        for field in ["atomId", "jobId", "size", "type", "path"]:
+            self.assertIn("'{0}'".format(field), str(raised.exception))
+
+    def test_not_a_dict(self):
+        with self.assertRaises(ValueError):
+            AtomResponderMessage.validate(["list"])
+
+
+class TestOtherMessages(TestCase):
+    def test_storagetier(self):
+        result = StoragetierSuccessMessage.validate({
+            "archiveHunterID": "abcdefg",
+            "archiveHunterIDValidated": "true",
+            "originalFilePath": "/path/to/file",
+            "uploadedBucket": "bucket",
+            "uploadedPath": "path/to/file",
+            "uploadedVersion": None,
+        })
+        self.assertTrue(result["archiveHunterIDValidated"])
+        self.assertIsNone(result["uploadedVersion"])
+
+        with self.assertRaises(ValueError):
+            StoragetierSuccessMessage.validate({
+                "archiveHunterID": "abcdefg",
+                "archiveHunterIDValidated": "maybe",
+                "originalFilePath": "/path/to/file",
+                "uploadedBucket": "bucket",
+                "uploadedPath": "path/to/file",
+            })
+
+    def test_cds(self):
+        """
+        the job-name key should be read into the job_name attribute
+        """
+        result = CDSResponderMessage.validate({
+            "job-name": "some-job",
+            "routename": "MainstreamMedia.xml",
+            "deliverable_asset": 123,
+            "deliverable_bundle": "456",
+        })
+        self.assertEqual(result, {"job_name": "some-job", "routename": "MainstreamMedia.xml",
+                                  "deliverable_asset": "123", "deliverable_bundle": "456"})
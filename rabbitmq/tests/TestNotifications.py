@@ -0,0 +1,70 @@
+from django.test import TestCase
+from rabbitmq.job_notification import JobNotification
+from rabbitmq.item_notification import ItemNotification
+
+
+def field_list(**kwargs):
+    return {"field": [{"key": k, "value": v} for k, v in kwargs.items()]}
+
+
+class TestJobNotification(TestCase):
+    def test_fields(self):
+        """
+        JobNotification should give the values of the typed fields and of any other field, and None for missing ones
+        """
+        n = JobNotification(field_list(jobId="VX-123", itemId="VX-456", status="FINISHED", type="TRANSCODE",
+                                       originalFilename="file.mp4"))
+        self.assertEqual(n.jobId, "VX-123")
+        self.assertEqual(n.itemId, "VX-456")
+        self.assertEqual(n.status, "FINISHED")
+        self.assertEqual(n.type, "TRANSCODE")
+        self.assertEqual(n.originalFilename, "file.mp4")
+        self.assertIsNone(n.fileId)
+        self.assertIsNone(n.username)
+
+    def test_first_value_wins(self):
+        """
+        if a key is repeated, the first value should be used
+        """
+        n = JobNotification({"field": [{"key": "jobId", "value": "VX-1"}, {"key": "jobId", "value": "VX-2"}]})
+        self.assertEqual(n.jobId, "VX-1")
+
+    def test_validate(self):
+        """
+        a job notification should be accepted if it has any of the required fields, and rejected if it has none of
+        them or no field list
+        """
+        JobNotification(field_list(jobId="VX-123"))
+        JobNotification(field_list(status="READY"))
+        with self.assertRaises(ValueError):
+            JobNotification(field_list(user="admin"))
+        with self.assertRaises(ValueError):
+            JobNotification({"something": "else"})
+
+    def test_file_paths(self):
+        """
+        file_paths should split the filePathMap once and return the same dictionary after that
+        """
+        n = JobNotification(field_list(jobId="VX-123", filePathMap="VX-1=media/a=b.mp4,VX-2=media/c.mp4,junk"))
+        paths = n.file_paths()
+        self.assertEqual(paths, {"VX-1": "media/a=b.mp4", "VX-2": "media/c.mp4"})
+        self.assertIs(n.file_paths(), paths)
+
+        self.assertIsNone(JobNotification(field_list(jobId="VX-123")).file_paths())
+
+
+class TestItemNotification(TestCase):
+    def test_fields(self):
+        n = ItemNotification(field_list(itemId="VX-456", action="DELETE"))
+        self.assertEqual(n.itemId, "VX-456")
+        self.assertEqual(n.action, "DELETE")
+        self.assertIsNone(n.originalFilename)
+
+    def test_validate(self):
+        """
+        an item notification should need all of the required fields
+        """
+        with self.assertRaises(ValueError):
+            ItemNotification(field_list(itemId="VX-456"))
+        with self.assertRaises(ValueError):
+            ItemNotification({"something": "else"})
@@ -0,0 +1,80 @@
+from django.test import TestCase
+from mock import MagicMock
+from rabbitmq.MessageProcessor import MessageProcessor
+from rabbitmq.sharding import shard_for, shard_queue_name, ShardRouter, restore_delivery, \
+    ORIGINAL_EXCHANGE_HEADER, ORIGINAL_ROUTING_KEY_HEADER
+import pika
+
+
+class TestShardFor(TestCase):
+    def test_stable_and_in_range(self):
+        """
+        shard_for should always give the same shard for the same key, and spread the keys over all the shards
+        """
+        keys = ["itemId=VX-{0}".format(n) for n in range(1000)]
+        shards = [shard_for(key, 4) for key in keys]
+        self.assertEqual(shards, [shard_for(key, 4) for key in keys])
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+
+    def test_consistent(self):
+        """
+        adding a shard should only move keys onto the new shard, and only about 1/n of them
+        """
+        keys = ["itemId=VX-{0}".format(n) for n in range(1000)]
+        moved = 0
+        for key in keys:
+            before = shard_for(key, 4)
+            after = shard_for(key, 5)
+            if before != after:
+                self.assertEqual(after, 4)
+                moved += 1
+        self.assertLess(moved, 300)
+
+
+class TestShardRouter(TestCase):
+    class KeyedProcessor(MessageProcessor):
+        routing_key = "vidispine.job.*.*"
+        ordering_field = "itemId"
+
+    def test_route(self):
+        """
+        ShardRouter should re-send the message to the shard queue for its key, remembering where it came from, and
+        then ack the original
+        """
+        mock_channel = MagicMock()
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = "vidispine-events"
+        mock_method.routing_key = "vidispine.job.essence_version.stop"
+        mock_method.delivery_tag = 1234
+        properties = pika.BasicProperties(headers={"existing": "header"})
+        body = b'{"field":[{"key":"itemId","value":"VX-1"}]}'
+
+        to_test = ShardRouter(self.KeyedProcessor(), "deliverables-vidispinejob", 3)
+        to_test.on_message(mock_channel, mock_method, properties, body)
+
+        expected_queue = shard_queue_name("deliverables-vidispinejob", shard_for("itemId=VX-1", 3))
+        mock_channel.basic_publish.assert_called_once()
+        kwargs = mock_channel.basic_publish.call_args[1]
+        self.assertEqual(kwargs["exchange"], "")
+        self.assertEqual(kwargs["routing_key"], expected_queue)
+        self.assertEqual(kwargs["body"], body)
+        self.assertEqual(kwargs["properties"].headers, {"existing": "header",
+                                                        ORIGINAL_EXCHANGE_HEADER: "vidispine-events",
+                                                        ORIGINAL_ROUTING_KEY_HEADER: "vidispine.job.essence_version.stop"})
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag=1234)
+
+    def test_restore_delivery(self):
+        """
+        restore_delivery should put back the exchange and routing key that the message was originally sent with
+        """
+        callback = MagicMock()
+        mock_method = MagicMock(target=pika.spec.Basic.Deliver)
+        mock_method.exchange = ""
+        mock_method.routing_key = "deliverables-vidispinejob-shard-1"
+        properties = pika.BasicProperties(headers={ORIGINAL_EXCHANGE_HEADER: "vidispine-events",
+                                                   ORIGINAL_ROUTING_KEY_HEADER: "vidispine.job.essence_version.stop"})
+
+        restore_delivery(callback)("channel", mock_method, properties, b"{}")
+        callback.assert_called_once_with("channel", mock_method, properties, b"{}")
+        self.assertEqual(mock_method.exchange, "vidispine-events")
+        self.assertEqual(mock_method.routing_key, "vidispine.job.essence_version.stop")
@@ -2,6 +2,8 @@ from django.test import TestCase
 from unittest.mock import MagicMock, patch
 from rabbitmq.job_notification import JobNotification
 import gnm_deliverables.choices as choices
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 class TestVidispineMessageProcessor(TestCase):
@@ -84,3 +86,158 @@ class TestVidispineMessageProcessor(TestCase):
 
             mock_create_proxy.assert_not_called()
             self.assertEqual(record_after.status, choices.DELIVERABLE_ASSET_STATUS_TRANSCODED)
+
+    def test_handle_notification_proxy_one_message(self):
+        """
+        when an import finishes and a proxy is requested, consumers should get one message about the asset with its
+        final state rather than one for each save
+        :return:
+        """
+        import json
+        import gnm_deliverables.signals  # connects the receivers
+        from rabbitmq.vidispine_message_processor import VidispineMessageProcessor
+        from gnm_deliverables.models import DeliverableAsset, OutboxMessage
+
+        asset = DeliverableAsset.objects.get(job_id="VX-99998")
+        asset.type = choices.DELIVERABLE_ASSET_TYPE_VIDEO_FULL_MASTER
+        asset.save()
+        OutboxMessage.objects.all().delete()
+
+        def fake_create_proxy(self, priority='MEDIUM'):
+            self.job_id = "VX-100000"
+            self.status = choices.DELIVERABLE_ASSET_STATUS_TRANSCODING
+            self.save()
+            return self.job_id
+
+        with patch("gnm_deliverables.models.DeliverableAsset.create_proxy", autospec=True,
+                   side_effect=fake_create_proxy):
+            mock_notification = MagicMock(target=JobNotification)
+            mock_notification.status = "FINISHED"
+            mock_notification.type = "ESSENCE_VERSION"
+            mock_notification.itemId = "VX-43"
+            mock_notification.jobId = "VX-99998" #corresponds to fixture
+            to_test = VidispineMessageProcessor()
+            to_test.handle_notification(mock_notification, "vidispine.job.essence_version.stop")
+
+        messages = list(OutboxMessage.objects.all())
+        self.assertEqual([m.routing_key for m in messages], ["deliverables.deliverableasset.update"])
+        payload = json.loads(bytes(messages[0].payload))
+        self.assertEqual(payload["job_id"], "VX-100000")
+        self.assertEqual(payload["online_item_id"], "VX-43")
+
+    def test_valid_batch_receive(self):
+        """
+        valid_batch_receive should look up the assets for the whole batch in one query and update each of them
+        :return:
+        """
+        from rabbitmq.vidispine_message_processor import VidispineMessageProcessor
+        from gnm_deliverables.models import DeliverableAsset
+
+        def job_message(job_id, status):
+            return {"field": [{"key": "jobId", "value": job_id},
+                              {"key": "itemId", "value": "VX-41"},
+                              {"key": "status", "value": status},
+                              {"key": "type", "value": "ESSENCE_VERSION"}]}
+
+        to_test = VidispineMessageProcessor()
+        with CaptureQueriesContext(connection) as queries:
+            to_test.valid_batch_receive("vidispine-events", [
+                ("vidispine.job.essence_version.update", 1, job_message("VX-99999", "STARTED")),
+                ("vidispine.job.essence_version.update", 2, job_message("VX-99998", "ABORTED")),
+            ])
+        lookups = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT") and "job_id" in q["sql"]]
+        self.assertEqual(len(lookups), 1)
+
+        record_after = DeliverableAsset.objects.get(job_id="VX-99998")
+        self.assertEqual(record_after.status, choices.DELIVERABLE_ASSET_STATUS_INGEST_FAILED)
+
+    def test_valid_batch_receive_prefetch(self):
+        """
+        valid_batch_receive should fetch the metadata for all of the finished transcodes in one Vidispine search
+        :return:
+        """
+        from rabbitmq.vidispine_message_processor import VidispineMessageProcessor
+        from gnm_deliverables.models import DeliverableAsset
+        from gnm_deliverables import vidispine_cache
+        import xml.etree.ElementTree as ET
+
+        def transcode_message(job_id, item_id):
+            return {"field": [{"key": "jobId", "value": job_id},
+                              {"key": "itemId", "value": item_id},
+                              {"key": "status", "value": "FINISHED"},
+                              {"key": "type", "value": "TRANSCODE"}]}
+
+        item_list = ET.fromstring("""<ItemListDocument xmlns="http://xml.vidispine.com/schema/vidispine">
+            <item id="VX-41"><metadata><timespan start="-INF" end="+INF">
+                <field><name>durationSeconds</name><value>10</value></field><field><name>__version</name><value>2</value></field>
+            </timespan></metadata></item>
+            <item id="VX-42"><metadata><timespan start="-INF" end="+INF">
+                <field><name>durationSeconds</name><value>20</value></field><field><name>__version</name><value>3</value></field>
+            </timespan></metadata></item>
+        </ItemListDocument>""")
+        mock_api = MagicMock()
+        mock_api.request = MagicMock(return_value=item_list)
+
+        vidispine_cache.cache.clear()
+        to_test = VidispineMessageProcessor()
+        with patch("gnm_deliverables.vidispine_cache.VSApi", return_value=mock_api), \
+                patch("gnm_deliverables.vidispine_cache.VSItem") as mock_item_class:
+            to_test.valid_batch_receive("vidispine-events", [
+                ("vidispine.job.transcode.stop", 1, transcode_message("VX-11111", "VX-41")),
+                ("vidispine.job.transcode.stop", 2, transcode_message("VX-99998", "VX-42")),
+            ])
+        vidispine_cache.cache.clear()
+
+        mock_api.request.assert_called_once()
+        mock_item_class.assert_not_called()
+        record_after = DeliverableAsset.objects.get(job_id="VX-99998")
+        self.assertEqual(record_after.duration_seconds, 20.0)
+        self.assertEqual(record_after.version, 3)
+
+
+class TestVidispineItemCacheProcessor(TestCase):
+    def test_invalidate(self):
+        """
+        VidispineItemCacheProcessor should drop the cached metadata for the item in the message
+        """
+        from rabbitmq.vidispine_item_processor import VidispineItemCacheProcessor
+        from gnm_deliverables import vidispine_cache
+
+        vidispine_cache.cache.put("VX-41", ("__version",), {"__version": "1"})
+        vidispine_cache.cache.put("VX-42", ("__version",), {"__version": "1"})
+        to_test = VidispineItemCacheProcessor()
+        to_test.valid_message_receive("vidispine-events", "vidispine.item.metadata", 1,
+                                      {"field": [{"key": "itemId", "value": "VX-41"}]})
+        self.assertIsNone(vidispine_cache.cache.get("VX-41", ("__version",)))
+        self.assertEqual(vidispine_cache.cache.get("VX-42", ("__version",)), {"__version": "1"})
+        vidispine_cache.cache.clear()
+
+    def test_multi_word_routing_key(self):
+        """
+        VidispineItemCacheProcessor should be bound to item events with more than one word after vidispine.item, and
+        invalidate the item when it gets one
+        """
+        import re
+        from rabbitmq.vidispine_item_processor import VidispineItemCacheProcessor
+        from gnm_deliverables import vidispine_cache
+
+        def topic_matches(binding, routing_key):
+            # AMQP topic matching: * is exactly one word, # is zero or more
+            pattern = ""
+            for word in binding.split("."):
+                if word == "#":
+                    pattern += r"(\.[^.]+)*"
+                else:
+                    pattern += r"\." + ("[^.]+" if word == "*" else re.escape(word))
+            return re.fullmatch(pattern, "." + routing_key) is not None
+
+        to_test = VidispineItemCacheProcessor()
+        for routing_key in ["vidispine.item.delete", "vidispine.item.metadata.modify", "vidispine.item.shape.create"]:
+            self.assertTrue(topic_matches(to_test.routing_key, routing_key), routing_key)
+        self.assertFalse(topic_matches(to_test.routing_key, "vidispine.job.completed"))
+
+        vidispine_cache.cache.put("VX-41", ("__version",), {"__version": "1"})
+        to_test.valid_message_receive("vidispine-events", "vidispine.item.metadata.modify", 1,
+                                      {"field": [{"key": "itemId", "value": "VX-41"}]})
+        self.assertIsNone(vidispine_cache.cache.get("VX-41", ("__version",)))
+        vidispine_cache.cache.clear()
@@ -0,0 +1,178 @@
+from django.test import TestCase, override_settings
+from mock import MagicMock
+from rabbitmq.MessageProcessor import MessageProcessor, message_field
+from rabbitmq.worker_pool import OrderedWorkerPool, ThreadsafeChannel, make_dispatcher
+from concurrent.futures import wait
+import threading
+import time
+
+
+class TestOrderedWorkerPool(TestCase):
+    def test_same_key_in_order(self):
+        """
+        jobs with the same key should run in the order that they were submitted, even if an earlier one is slower
+        """
+        pool = OrderedWorkerPool("test", 4)
+        results = []
+        lock = threading.Lock()
+
+        def job(key, n):
+            time.sleep(0.01 if n % 2 == 0 else 0)
+            with lock:
+                results.append((key, n))
+
+        futures = [pool.submit(key, job, key, n) for n in range(10) for key in ["item-a", "item-b", "item-c"]]
+        wait(futures, timeout=10)
+        pool.shutdown(wait=True)
+
+        self.assertEqual(len(results), 30)
+        for key in ["item-a", "item-b", "item-c"]:
+            self.assertEqual([n for k, n in results if k == key], list(range(10)))
+
+    def test_shutdown_drops_waiting_jobs(self):
+        """
+        shutdown should finish the job that is running but not start the ones that are waiting
+        """
+        pool = OrderedWorkerPool("test", 1)
+        started = threading.Event()
+        release = threading.Event()
+        ran = []
+
+        def blocking_job():
+            started.set()
+            release.wait(5)
+            ran.append("blocking")
+
+        pool.submit("key", blocking_job)
+        pool.submit("key", lambda: ran.append("waiting"))
+        started.wait(5)
+        threading.Timer(0.05, release.set).start()
+        pool.shutdown(wait=True)
+        self.assertEqual(ran, ["blocking"])
+
+    def test_drain(self):
+        """
+        drain should wait for the jobs that have been submitted to finish, or report that they didn't in time
+        """
+        pool = OrderedWorkerPool("test", 2)
+        release = threading.Event()
+        ran = []
+
+        pool.submit("key", lambda: (release.wait(5), ran.append("slow")))
+        self.assertFalse(pool.drain(timeout=0.05))
+        release.set()
+        self.assertTrue(pool.drain(timeout=5))
+        self.assertEqual(ran, ["slow"])
+        pool.shutdown(wait=True)
+
+
+class TestThreadsafeChannel(TestCase):
+    def test_calls_on_ioloop(self):
+        """
+        ThreadsafeChannel should not call the channel directly, but hand the call to the connection's ioloop
+        """
+        mock_connection = MagicMock()
+        mock_channel = MagicMock()
+        mock_channel.is_open = True
+
+        to_test = ThreadsafeChannel(mock_connection, mock_channel)
+        to_test.basic_ack(delivery_tag=1234)
+        mock_channel.basic_ack.assert_not_called()
+        self.assertEqual(mock_connection.add_callback_threadsafe.call_count, 1)
+
+        mock_connection.add_callback_threadsafe.call_args[0][0]()
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag=1234)
+
+    def test_channel_closed(self):
+        """
+        if the channel closed before the ioloop got to the call, it should be dropped
+        """
+        mock_connection = MagicMock()
+        mock_channel = MagicMock()
+        mock_channel.is_open = False
+
+        to_test = ThreadsafeChannel(mock_connection, mock_channel)
+        to_test.basic_nack(delivery_tag=1234, requeue=True)
+        mock_connection.add_callback_threadsafe.call_args[0][0]()
+        mock_channel.basic_nack.assert_not_called()
+
+
+class TestDispatcher(TestCase):
+    class KeyedProcessor(MessageProcessor):
+        ordering_field = "itemId"
+        concurrency = 3
+
+    def test_ordering_key(self):
+        """
+        ordering_key should use the ordering field from either a plain or a Vidispine-style message, and fall back to the
+        routing key
+        """
+        to_test = self.KeyedProcessor()
+        self.assertEqual(to_test.ordering_key("vidispine.job.update", b'{"itemId":"VX-123"}'), "itemId=VX-123")
+        self.assertEqual(to_test.ordering_key("vidispine.job.update",
+                                              b'{"field":[{"key":"jobId","value":"VX-9"},{"key":"itemId","value":"VX-4"}]}'),
+                         "itemId=VX-4")
+        self.assertEqual(to_test.ordering_key("vidispine.job.update", b'{"jobId":"VX-9"}'), "vidispine.job.update")
+        self.assertEqual(to_test.ordering_key("vidispine.job.update", b'not json'), "vidispine.job.update")
+        self.assertEqual(message_field([{"atomId": "abc"}], "atomId"), "abc")
+
+    def test_pool_size(self):
+        """
+        pool_size should use the concurrency member unless RABBITMQ_HANDLER_CONCURRENCY overrides it
+        """
+        to_test = self.KeyedProcessor()
+        self.assertEqual(to_test.pool_size(), 3)
+        with override_settings(RABBITMQ_HANDLER_CONCURRENCY={"KeyedProcessor": 8}):
+            self.assertEqual(to_test.pool_size(), 8)
+
+    def test_dispatch(self):
+        """
+        the dispatcher should run the handler on the pool with a ThreadsafeChannel, so that its ack goes via the ioloop
+        """
+        handler = self.KeyedProcessor()
+        handler.raw_message_receive = MagicMock()
+        mock_connection = MagicMock()
+        mock_channel = MagicMock()
+        mock_method = MagicMock()
+        mock_method.routing_key = "vidispine.job.update"
+        pool = OrderedWorkerPool("test", 2)
+
+        make_dispatcher(handler, pool, mock_connection)(mock_channel, mock_method, {}, b'{"itemId":"VX-1"}')
+        pool.lanes[pool.lane_for("itemId=VX-1")].submit(lambda: None).result(timeout=5)
+        pool.shutdown(wait=True)
+
+        handler.raw_message_receive.assert_called_once()
+        args = handler.raw_message_receive.call_args[0]
+        self.assertIsInstance(args[0], ThreadsafeChannel)
+        self.assertEqual(args[1:], (mock_method, {}, b'{"itemId":"VX-1"}'))
+
+
+    def test_dispatch_failure(self):
+        """
+        if the handler raises on a worker thread, on_failure should be handed to the ioloop
+        """
+        handler = self.KeyedProcessor()
+        handler.raw_message_receive = MagicMock(side_effect=ValueError("Could not process message"))
+        on_failure = MagicMock()
+        mock_connection = MagicMock()
+        mock_method = MagicMock()
+        mock_method.routing_key = "vidispine.job.update"
+        pool = OrderedWorkerPool("test", 1)
+
+        make_dispatcher(handler, pool, mock_connection, on_failure=on_failure)(MagicMock(), mock_method, {}, b'{}')
+        pool.drain(timeout=5)
+        pool.shutdown(wait=True)
+
+        on_failure.assert_not_called()
+        mock_connection.add_callback_threadsafe.assert_called_once_with(on_failure)
+
+    def test_handler_failed(self):
+        """
+        the responder should drain and exit with an error when a handler on a worker pool fails
+        """
+        from rabbitmq.management.commands.run_rabbitmq_responder import Command
+        to_test = Command()
+        to_test.begin_drain = MagicMock()
+        to_test.handler_failed()
+        self.assertEqual(to_test.exit_code, 1)
+        to_test.begin_drain.assert_called_once_with()
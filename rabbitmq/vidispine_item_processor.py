@@ -1,14 +1,18 @@
 from .MessageProcessor import MessageProcessor
 from .item_notification import ItemNotification
+from .field_notification import FieldNotification
 import logging
 from gnm_deliverables.models import DeliverableAsset
-import time
+from gnm_deliverables import vidispine_cache
 
 logger = logging.getLogger(__name__)
 
 
 class VidispineItemProcessor(MessageProcessor):
     routing_key = "vidispine.item.delete"
+    ordering_field = "itemId"
+    # give changes to the item that were made just before it was deleted time to be processed first
+    receive_delay = 2
     # see https://json-schema.org/learn/miscellaneous-examples.html for more details
     schema = {
         "type": "object",
@@ -49,8 +53,6 @@ class VidispineItemProcessor(MessageProcessor):
 
         notification = ItemNotification(body)
 
-        time.sleep(2)
-
         assets = DeliverableAsset.objects.filter(online_item_id=notification.itemId)
 
         if not assets:
@@ -67,3 +69,21 @@ class VidispineItemProcessor(MessageProcessor):
             return
 
         return notification
+
+
+class VidispineItemCacheProcessor(MessageProcessor):
+    """
+    drops the cached metadata for an item when Vidispine tells us that something has happened to it. With the same
+    ordering field as the job messages, in sharded mode the events for an item go to the shard that caches it.
+    Bound with # rather than *, so that it also gets the events with longer routing keys such as
+    vidispine.item.metadata.modify and vidispine.item.shape.*, which are the ones that change the cached fields.
+    """
+    routing_key = "vidispine.item.#"
+    ordering_field = "itemId"
+    schema = VidispineItemProcessor.schema
+
+    def valid_message_receive(self, exchange_name, routing_key, delivery_tag, body: dict):
+        item_id = FieldNotification(body).itemId
+        if item_id is not None:
+            logger.debug("{0} for {1}, dropping any cached metadata".format(routing_key, item_id))
+            vidispine_cache.cache.invalidate(item_id)
@@ -1,8 +1,6 @@
 from .MessageProcessor import MessageProcessor
 from .job_notification import JobNotification
 import logging
-from django.conf import settings
-from gnmvidispine.vs_item import VSItem
 from gnmvidispine.vidispine_api import VSException
 from gnm_deliverables.choices import DELIVERABLE_ASSET_TYPES, \
     DELIVERABLE_ASSET_STATUS_NOT_INGESTED, \
@@ -11,6 +9,8 @@ from gnm_deliverables.choices import DELIVERABLE_ASSET_TYPES, \
     DELIVERABLE_ASSET_STATUS_TRANSCODED, \
     DELIVERABLE_ASSET_STATUS_TRANSCODE_FAILED, DELIVERABLE_ASSET_STATUS_TRANSCODING
 from rabbitmq.time_funcs import get_current_time
+from gnm_deliverables import vidispine_cache
+from gnm_deliverables.change_collector import coalesce_changes
 from gnm_deliverables.models import *
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 class VidispineMessageProcessor(MessageProcessor):
     routing_key = "vidispine.job.*.*"
+    ordering_field = "itemId"
+    concurrency = 4
     # see https://json-schema.org/learn/miscellaneous-examples.html for more details
     schema = {
         "type": "object",
@@ -48,24 +50,27 @@ class VidispineMessageProcessor(MessageProcessor):
                                   DELIVERABLE_ASSET_TYPE_OTHER_SUBTITLE
                                   ]
 
+    # the item fields that a finished transcode updates the asset from
+    ITEM_METADATA_FIELDS = ["durationSeconds", "__version"]
+
     def get_item_metadata(self, item_id) -> (float, str):
         duration_seconds=None
         version=None
         if item_id is not None:
+            possibly_seconds = None
             try:
-                vs_item = VSItem(url=settings.VIDISPINE_URL,
-                                 user=settings.VIDISPINE_USER,
-                                 passwd=settings.VIDISPINE_PASSWORD)
-                vs_item.populate(item_id,specificFields=["durationSeconds","__version"])
-                version = vs_item.get("__version",allowArray=True)
+                metadata = vidispine_cache.item_metadata(item_id, self.ITEM_METADATA_FIELDS)
+                version = metadata["__version"]
                 if isinstance(version, list):
                     logger.warning("{0} has multiple versions: {1}, using the first".format(item_id, version))
                     version = version[0]
-                possibly_seconds = vs_item.get("durationSeconds")
+                possibly_seconds = metadata["durationSeconds"]
+                if isinstance(possibly_seconds, list):
+                    possibly_seconds = possibly_seconds[0]
                 if possibly_seconds is not None:
                     duration_seconds = float(possibly_seconds)
             except ValueError:
-                logger.warning("{0}: duration_seconds value '{1}' could not be converted to float".format(item_id, vs_item.get("durationSeconds")))
+                logger.warning("{0}: duration_seconds value '{1}' could not be converted to float".format(item_id, possibly_seconds))
             except VSException as e:
                 logger.warning("Could not get extra metadata for {0} from Vidispine: {1}".format(item_id, str(e)))
         if duration_seconds is not None:
@@ -96,56 +101,104 @@ class VidispineMessageProcessor(MessageProcessor):
 
         return self.handle_notification(notification, routing_key)
 
-    def handle_notification(self, notification:JobNotification, routing_key:str):
+    def valid_batch_receive(self, exchange_name, messages:list):
+        """
+        receives a batch of validated vidispine json messages, when batching is turned on with
+        RABBITMQ_HANDLER_BATCH_SIZE. The assets for all of the jobs are looked up in one query.
+        :param exchange_name:
+        :param messages: list of (routing_key, delivery_tag, body) tuples
+        :return:
+        """
+        notifications = []
+        for routing_key, delivery_tag, body in messages:
+            try:
+                notifications.append((JobNotification(body), routing_key))
+            except Exception as e:
+                logger.warning("Incoming message {0} lacked one or more required fields. {1}".format(delivery_tag, e))
+
+        # fetch the metadata for all of the finished transcodes at once, handle_notification then gets it from the cache
+        item_ids = [notification.itemId for notification, routing_key in notifications
+                    if notification.type == 'TRANSCODE' and notification.status in ['FINISHED','FINISHED_WARNING']
+                    and notification.itemId is not None]
+        if len(item_ids) > 1:
+            try:
+                vidispine_cache.items_metadata(item_ids, self.ITEM_METADATA_FIELDS)
+            except VSException as e:
+                logger.warning("Could not get metadata for {0} items from Vidispine, fetching them one at a time: {1}".format(len(item_ids), str(e)))
+
+        job_ids = set([notification.jobId for notification, routing_key in notifications])
+        assets_by_job = {}
+        for asset in DeliverableAsset.objects.filter(job_id__in=job_ids):
+            assets_by_job.setdefault(asset.job_id, []).append(asset)
+
+        for notification, routing_key in notifications:
+            matches = assets_by_job.get(notification.jobId, [])
+            if len(matches) == 0:
+                logger.warning("Received a message for job {0}. Cannot find a matching asset.".format(notification.jobId))
+            elif len(matches) > 1:
+                # let handle_notification fail in the same way that it does for a single message
+                self.handle_notification(notification, routing_key)
+            else:
+                self.handle_notification(notification, routing_key, asset=matches[0])
+
+    def handle_notification(self, notification:JobNotification, routing_key:str, asset:DeliverableAsset=None):
         """
         takes a constructed JobNotification, works out what it means and performs the relevant actions
         :param notification: JobNotification instance
         :param routing_key: routing key with which this was sent
+        :param asset: the DeliverableAsset for the notification's job, if it has been looked up already
         :return: none
         """
-        try:
-            asset = DeliverableAsset.objects.get(job_id=notification.jobId)
-        except DeliverableAsset.DoesNotExist:
-            logger.warning("Received a message for job {0}. Cannot find a matching asset.".format(notification.jobId))
-            return
+        if asset is None:
+            try:
+                asset = DeliverableAsset.objects.get(job_id=notification.jobId)
+            except DeliverableAsset.DoesNotExist:
+                logger.warning("Received a message for job {0}. Cannot find a matching asset.".format(notification.jobId))
+                return
 
-        if notification.status in ['FAILED_TOTAL', 'ABORTED_PENDING', 'ABORTED']:
-            if notification.type == 'TRANSCODE':
-                asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODE_FAILED
-            else:
-                asset.status = DELIVERABLE_ASSET_STATUS_INGEST_FAILED
-            asset.ingest_complete_dt = get_current_time()
-            asset.save()
-        elif notification.status == 'READY' or notification.status == 'STARTED' or notification.status == 'VIDINET_JOB':
-            if notification.type == 'TRANSCODE':
-                asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODING
-            else:
-                asset.status = DELIVERABLE_ASSET_STATUS_INGESTING
-            asset.save()
-        elif notification.status in ['FINISHED','FINISHED_WARNING']:
-            if notification.type == 'TRANSCODE':
-                asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODED
-                duration_seconds, version = self.get_item_metadata(notification.itemId)
-                try:
-                    asset.version = int(version)
-                except ValueError as e:
-                    logger.warning("{0}: asset version '{1}' could not be converted into number".format(notification.itemId, version))
-                asset.duration_seconds = duration_seconds
+        # create_proxy saves the asset as well, so consumers would otherwise hear about it twice
+        with coalesce_changes():
+            if notification.status in ['FAILED_TOTAL', 'ABORTED_PENDING', 'ABORTED']:
+                if notification.type == 'TRANSCODE':
+                    asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODE_FAILED
+                else:
+                    asset.status = DELIVERABLE_ASSET_STATUS_INGEST_FAILED
                 asset.ingest_complete_dt = get_current_time()
-            else:
-                asset.online_item_id = notification.itemId
-                if asset.type in self.DONT_TRANSCODE_THESE_TYPES:
+                asset.save()
+            elif notification.status == 'READY' or notification.status == 'STARTED' or notification.status == 'VIDINET_JOB':
+                if notification.type == 'TRANSCODE':
+                    asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODING
+                else:
+                    asset.status = DELIVERABLE_ASSET_STATUS_INGESTING
+                asset.save()
+            elif notification.status in ['FINISHED','FINISHED_WARNING']:
+                if notification.type == 'TRANSCODE':
                     asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODED
+                    duration_seconds, version = self.get_item_metadata(notification.itemId)
+                    try:
+                        asset.version = int(version)
+                    except ValueError as e:
+                        logger.warning("{0}: asset version '{1}' could not be converted into number".format(notification.itemId, version))
+                    asset.duration_seconds = duration_seconds
+                    asset.ingest_complete_dt = get_current_time()
                 else:
-                    asset.status = DELIVERABLE_ASSET_STATUS_INGESTED
-                    if routing_key == 'vidispine.job.essence_version.stop':
-                        try:
-                            asset.create_proxy()
-                        except Exception as e:
-                            logger.exception(
-                                "{0} for asset {1} in bundle {2}: could not create proxy due to:".format(
-                                    asset.online_item_id,
-                                    asset.id,
-                                    asset.deliverable.id),
-                                exc_info=e)
-            asset.save()
+                    # the job has changed the item, e.g. given it a new version
+                    vidispine_cache.cache.invalidate(notification.itemId)
+                    asset.online_item_id = notification.itemId
+                    if asset.type in self.DONT_TRANSCODE_THESE_TYPES:
+                        asset.status = DELIVERABLE_ASSET_STATUS_TRANSCODED
+                    else:
+                        asset.status = DELIVERABLE_ASSET_STATUS_INGESTED
+                        if routing_key == 'vidispine.job.essence_version.stop':
+                            try:
+                                # a savepoint, so that a database error in here doesn't spoil the save below
+                                with coalesce_changes():
+                                    asset.create_proxy()
+                            except Exception as e:
+                                logger.exception(
+                                    "{0} for asset {1} in bundle {2}: could not create proxy due to:".format(
+                                        asset.online_item_id,
+                                        asset.id,
+                                        asset.deliverable.id),
+                                    exc_info=e)
+                asset.save()
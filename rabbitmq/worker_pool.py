@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+import concurrent.futures
+from django.db import close_old_connections
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadsafeChannel(object):
+    """
+    stands in for a pika channel on a worker thread.  pika channels may only be used from the ioloop thread, so the
+    calls that a MessageProcessor makes are handed over to the ioloop with add_callback_threadsafe
+    """
+    def __init__(self, connection, channel):
+        self._connection = connection
+        self._channel = channel
+
+    def _call_on_ioloop(self, method_name:str, *args, **kwargs):
+        def call():
+            if not self._channel.is_open:
+                logger.warning("Channel closed before {0} {1} could be sent".format(method_name, kwargs))
+                return
+            getattr(self._channel, method_name)(*args, **kwargs)
+        self._connection.add_callback_threadsafe(call)
+
+    def basic_ack(self, *args, **kwargs):
+        self._call_on_ioloop("basic_ack", *args, **kwargs)
+
+    def basic_nack(self, *args, **kwargs):
+        self._call_on_ioloop("basic_nack", *args, **kwargs)
+
+    def basic_reject(self, *args, **kwargs):
+        self._call_on_ioloop("basic_reject", *args, **kwargs)
+
+    def basic_cancel(self, *args, **kwargs):
+        self._call_on_ioloop("basic_cancel", *args, **kwargs)
+
+    def basic_publish(self, *args, **kwargs):
+        self._call_on_ioloop("basic_publish", *args, **kwargs)
+
+    def __str__(self):
+        return str(self._channel)
+
+
+class OrderedWorkerPool(object):
+    """
+    runs jobs on a fixed number of threads.  Jobs with the same ordering key always go to the same thread so they run
+    in the order that they were submitted, while jobs with different keys can run at the same time
+    """
+    def __init__(self, name:str, size:int):
+        self.lanes = [ThreadPoolExecutor(max_workers=1, thread_name_prefix="{0}-{1}".format(name, i))
+                      for i in range(max(1, size))]
+        self.stopping = False
+
+    def lane_for(self, key:str) -> int:
+        # crc32 rather than hash(), which is randomised per process
+        return zlib.crc32(key.encode("UTF-8")) % len(self.lanes)
+
+    def submit(self, key:str, func, *args, **kwargs):
+        def run_unless_stopping():
+            if not self.stopping:
+                return func(*args, **kwargs)
+        return self.lanes[self.lane_for(key)].submit(run_unless_stopping)
+
+    def drain(self, timeout:float=None) -> bool:
+        """
+        waits for every job that has been submitted so far to finish
+        :param timeout: maximum number of seconds to wait, or None to wait for as long as it takes
+        :return: True if they all finished, False if the timeout ran out first
+        """
+        done, not_done = concurrent.futures.wait([lane.submit(lambda: None) for lane in self.lanes], timeout=timeout)
+        return len(not_done) == 0
+
+    def shutdown(self, wait=True):
+        """
+        stops the pool.  Jobs that are running are finished, but jobs that have not started yet are dropped
+        """
+        self.stopping = True
+        for lane in self.lanes:
+            lane.shutdown(wait=wait)
+
+
+def run_handler(handler, channel, method, properties, body, failed=None):
+    """
+    runs a MessageProcessor on a worker thread.  Worker threads each have their own database connection, so tidy it
+    up around the message in the same way that django does around a request.
+    If the handler raises, e.g. after a PermanentFailure, failed is called so that the responder can shut down as it
+    would if the handler had raised on the ioloop
+    """
+    close_old_connections()
+    try:
+        handler.raw_message_receive(channel, method, properties, body)
+    except Exception as e:
+        # raw_message_receive has already nacked the message and cancelled the consumer
+        logger.error("{0} could not process message {1}: {2}".format(handler.__class__.__name__, method.delivery_tag,
+                                                                     str(e)))
+        if failed is not None:
+            failed()
+    finally:
+        close_old_connections()
+
+
+def run_batch_handler(handler, channel, deliveries:list, failed=None):
+    """
+    runs a batched MessageProcessor on a worker thread, see run_handler
+    """
+    close_old_connections()
+    try:
+        handler.raw_batch_receive(channel, deliveries)
+    except Exception as e:
+        # raw_batch_receive has already nacked the batch and cancelled the consumer
+        logger.error("{0} could not process a batch of {1} messages: {2}".format(handler.__class__.__name__,
+                                                                                len(deliveries), str(e)))
+        if failed is not None:
+            failed()
+    finally:
+        close_old_connections()
+
+
+def failure_callback(connection, on_failure):
+    """
+    returns a function for a worker thread to call when its handler fails, which runs on_failure on the ioloop
+    """
+    if on_failure is None:
+        return None
+
+    def failed():
+        connection.add_callback_threadsafe(on_failure)
+    return failed
+
+
+def make_dispatcher(handler, pool:OrderedWorkerPool, connection, on_failure=None):
+    """
+    returns a basic_consume callback that hands each message for the given handler to the pool, keyed on the
+    handler's ordering_key.
+    on_failure is called on the ioloop if the handler raises
+    """
+    failed = failure_callback(connection, on_failure)
+
+    def on_message(channel, method, properties, body):
+        key = handler.ordering_key(method.routing_key, body)
+        pool.submit(key, run_handler, handler, ThreadsafeChannel(connection, channel), method, properties, body, failed)
+    return on_message
+
+
+def make_batch_dispatcher(handler, pool:OrderedWorkerPool, connection, channel, on_failure=None):
+    """
+    returns a BatchCollector dispatch function that hands each batch for the given handler to the pool.
+    A batch is acked with multiple=True, which would also ack a later batch that was still being processed, so
+    batches all go to the same thread one after another.
+    on_failure is called on the ioloop if the handler raises
+    """
+    threadsafe_channel = ThreadsafeChannel(connection, channel)
+    failed = failure_callback(connection, on_failure)
+
+    def dispatch(deliveries):
+        pool.submit(handler.routing_key, run_batch_handler, handler, threadsafe_channel, deliveries, failed)
+    return dispatch